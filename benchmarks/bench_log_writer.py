@@ -0,0 +1,107 @@
+"""Compare the synchronous chat-log insert path with the batched background writer.
+
+Both paths write the same rows into a throwaway SQLite database. Per-call
+latency is what a request handler would wait for; throughput includes the
+final flush so the writer is not credited for work it has not done yet.
+
+Usage:
+    python benchmarks/bench_log_writer.py --rows 2000 --threads 1 8
+"""
+
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from analytics.logger import init_analytics_db
+from analytics.tracing import RequestTrace
+from analytics.writer import ChatLogRow, ChatLogWriter, insert_chat_rows
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _make_row(index: int) -> ChatLogRow:
+    trace = RequestTrace()
+    trace.record("total", 100.0 + index % 7)
+    return ChatLogRow(
+        query=f"What is covered by warranty plan {index % 50}?",
+        answer="The standard warranty covers the powertrain for five years.",
+        created_at=datetime.utcnow().isoformat(),
+        trace=trace,
+    )
+
+
+def _sync_insert(db_path: Path, row: ChatLogRow) -> None:
+    """The original path: one connection and one commit per interaction."""
+    with sqlite3.connect(db_path) as conn:
+        insert_chat_rows(conn, [row])
+        conn.commit()
+
+
+def _run(label: str, rows: int, threads: int, submit, finish=None) -> None:
+    latencies: list[float] = []
+    latencies_lock = threading.Lock()
+    per_thread = rows // threads
+
+    def worker(offset: int) -> None:
+        local: list[float] = []
+        for index in range(offset, offset + per_thread):
+            started = time.perf_counter()
+            submit(_make_row(index))
+            local.append(time.perf_counter() - started)
+        with latencies_lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i * per_thread,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if finish is not None:
+        finish()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{label:<7} threads={threads:<3} rows={len(latencies):<6} inserts/s={len(latencies) / elapsed:10.1f}  "
+        f"p50={_percentile(latencies, 50) * 1000:8.3f} ms  p99={_percentile(latencies, 99) * 1000:8.3f} ms  "
+        f"max={max(latencies) * 1000:8.3f} ms  mean={statistics.mean(latencies) * 1000:8.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            sync_db = Path(tmp) / f"sync_{threads}.db"
+            init_analytics_db(sync_db)
+            _run("sync", args.rows, threads, lambda row: _sync_insert(sync_db, row))
+
+            writer_db = Path(tmp) / f"writer_{threads}.db"
+            init_analytics_db(writer_db)
+            writer = ChatLogWriter(writer_db, max_queue_size=args.rows * 2)
+            _run("writer", args.rows, threads, writer.submit, lambda: writer.flush(timeout=None))
+            writer.close()
+            if writer.dropped:
+                print(f"        dropped={writer.dropped}")
+
+
+if __name__ == "__main__":
+    main()
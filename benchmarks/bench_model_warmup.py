@@ -0,0 +1,82 @@
+"""Measure cold vs warm model latency against the local Ollama server.
+
+Three cases, each timing one query embedding plus one streamed chat answer
+(time-to-first-token and total):
+
+    cold           models evicted first, so the request pays the load
+    after warm-up  models evicted, then warm_up_models() before the request
+    warm           steady state; mean of --runs further requests
+
+Usage:
+    python benchmarks/bench_model_warmup.py --runs 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from config import EMBEDDING_MODEL_NAME, MODEL_BACKEND, OLLAMA_CHAT_MODEL, OLLAMA_KEEP_ALIVE
+from generation.prompts import build_user_prompt, get_system_prompt
+from model_backend import create_embeddings, get_chat_model, unload_models, warm_up_models
+
+
+QUESTION = "What is the standard warranty duration for a new vehicle?"
+CONTEXT = "[1] Source: doc_03_warranty.txt\nStandard Warranty:\n- Duration: 3 years or 100,000 km."
+
+
+def _request() -> dict[str, float]:
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    create_embeddings().embed_query(QUESTION)
+    timings["embed_ms"] = (time.perf_counter() - started) * 1000
+
+    messages = [
+        SystemMessage(content=get_system_prompt()),
+        HumanMessage(content=build_user_prompt(question=QUESTION, context=CONTEXT)),
+    ]
+    started = time.perf_counter()
+    for chunk in get_chat_model(temperature=0.2).stream(messages):
+        if chunk.content and "ttft_ms" not in timings:
+            timings["ttft_ms"] = (time.perf_counter() - started) * 1000
+    timings["chat_total_ms"] = (time.perf_counter() - started) * 1000
+    timings.setdefault("ttft_ms", timings["chat_total_ms"])
+    return timings
+
+
+def _print(label: str, timings: dict[str, float]) -> None:
+    print(
+        f"{label:<14} embed={timings['embed_ms']:9.1f} ms  ttft={timings['ttft_ms']:9.1f} ms  "
+        f"chat total={timings['chat_total_ms']:9.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Warm requests to average.")
+    args = parser.parse_args()
+
+    chat_model = "stub" if MODEL_BACKEND == "stub" else OLLAMA_CHAT_MODEL
+    print(f"backend={MODEL_BACKEND} chat={chat_model} embeddings={EMBEDDING_MODEL_NAME} keep_alive={OLLAMA_KEEP_ALIVE}")
+
+    unload_models()
+    _print("cold", _request())
+
+    unload_models()
+    warm_up = warm_up_models()
+    print(f"{'warm-up':<14} embed={warm_up['embedding_ms']:9.1f} ms  chat={warm_up['chat_ms']:9.1f} ms")
+    _print("after warm-up", _request())
+
+    runs = [_request() for _ in range(max(1, args.runs))]
+    _print("warm", {key: statistics.mean(run[key] for run in runs) for key in runs[0]})
+
+
+if __name__ == "__main__":
+    main()
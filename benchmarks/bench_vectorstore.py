@@ -0,0 +1,113 @@
+"""Compare per-query retrieval latency: fresh Chroma client vs shared handle.
+
+Also reports the active dense index backend (size, load time) and single vs
+batched query latency through it.
+
+Usage:
+    python benchmarks/bench_vectorstore.py --queries 50 --top-k 4
+    VECTOR_INDEX_BACKEND=flat python benchmarks/bench_vectorstore.py --batch 16
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from retrieval.vectorstore import (
+    embed_texts,
+    ensure_vectorstore_indexed,
+    get_index_stats,
+    get_vectorstore,
+    query_vectorstore,
+    query_vectorstore_batch,
+    warm_vectorstore,
+)
+
+
+SAMPLE_QUERIES = [
+    "What is the standard warranty duration for a new vehicle?",
+    "How often should I change the engine oil?",
+    "What is the charging time from 10% to 80% at a fast charger?",
+    "How do I place a vehicle order?",
+    "Is roadside assistance available 24/7?",
+]
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run(label: str, search, queries: int, top_k: int) -> None:
+    timings_ms: list[float] = []
+    for index in range(queries):
+        query = SAMPLE_QUERIES[index % len(SAMPLE_QUERIES)]
+        started = time.perf_counter()
+        search(query, top_k)
+        timings_ms.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"{label:<16} n={queries:<4} mean={statistics.mean(timings_ms):8.2f} ms  "
+        f"p50={_percentile(timings_ms, 50):8.2f} ms  p95={_percentile(timings_ms, 95):8.2f} ms"
+    )
+
+
+def _search_fresh_client(query: str, top_k: int) -> None:
+    """Baseline: the pre-pooling path that reopened Chroma on every query."""
+    ensure_vectorstore_indexed().similarity_search(query, k=top_k)
+
+
+def _search_shared_handle(query: str, top_k: int) -> None:
+    get_vectorstore().similarity_search(query, k=top_k)
+
+
+def _bench_backend(queries: int, top_k: int, batch: int) -> None:
+    """Per-query latency of the dense backend, one query at a time vs batched."""
+    texts = [SAMPLE_QUERIES[index % len(SAMPLE_QUERIES)] for index in range(queries)]
+    embeddings = embed_texts(list(dict.fromkeys(texts)))
+    by_text = dict(zip(dict.fromkeys(texts), embeddings))
+    vectors = [by_text[text] for text in texts]
+
+    started = time.perf_counter()
+    for text, vector in zip(texts, vectors):
+        query_vectorstore(text, top_k, query_embedding=vector, mode="dense")
+    single_ms = (time.perf_counter() - started) * 1000 / queries
+
+    started = time.perf_counter()
+    for offset in range(0, queries, batch):
+        query_vectorstore_batch(texts[offset : offset + batch], top_k, query_embeddings=vectors[offset : offset + batch])
+    batch_ms = (time.perf_counter() - started) * 1000 / queries
+
+    print(f"{'dense single':<16} n={queries:<4} mean={single_ms:8.2f} ms/query")
+    print(f"{'dense batch':<16} n={queries:<4} mean={batch_ms:8.2f} ms/query  (batch={batch})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=16, help="Queries per batched backend call.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    chunk_count = warm_vectorstore()
+    print(f"Warm-up: {chunk_count} chunks indexed, {(time.perf_counter() - started) * 1000:.1f} ms")
+    stats = get_index_stats()
+    print(
+        f"Index: backend={stats.backend} vectors={stats.vectors} dim={stats.dimension} "
+        f"size={stats.size_bytes / 1024:.1f} KiB load={stats.load_ms:.2f} ms"
+    )
+
+    _run("fresh client", _search_fresh_client, args.queries, args.top_k)
+    _run("shared handle", _search_shared_handle, args.queries, args.top_k)
+    _bench_backend(args.queries, args.top_k, max(1, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Load-test the async RAG pipeline at several concurrency levels.
+
+Each simulated user sends ``--requests-per-user`` questions back to back.
+Reports requests per second and p50/p95 latency per level.
+
+Usage:
+    python benchmarks/load_test.py --users 1 8 32 --requests-per-user 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from generation.chain import agenerate_chat_response
+from retrieval.vectorstore import warm_vectorstore
+
+
+SAMPLE_QUESTIONS = [
+    "What is the standard warranty duration for a new vehicle?",
+    "How often should I change the engine oil?",
+    "What is the charging time from 10% to 80% at a fast charger?",
+    "How do I place a vehicle order?",
+    "Is roadside assistance available 24/7?",
+    "What home charging options are available?",
+    "Can I modify my order after it has been placed?",
+    "What items are excluded from the standard warranty?",
+]
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _user(user_id: int, requests: int, latencies: list[float], use_cache: bool) -> None:
+    for request_index in range(requests):
+        question = SAMPLE_QUESTIONS[(user_id + request_index) % len(SAMPLE_QUESTIONS)]
+        started = time.perf_counter()
+        await agenerate_chat_response(question, [], use_cache=use_cache)
+        latencies.append(time.perf_counter() - started)
+
+
+async def _run_level(users: int, requests_per_user: int, use_cache: bool) -> None:
+    latencies: list[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(_user(user_id, requests_per_user, latencies, use_cache) for user_id in range(users)))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"users={users:<3} requests={len(latencies):<4} rps={len(latencies) / elapsed:7.2f}  "
+        f"p50={_percentile(latencies, 50) * 1000:9.1f} ms  p95={_percentile(latencies, 95) * 1000:9.1f} ms  "
+        f"mean={statistics.mean(latencies) * 1000:9.1f} ms"
+    )
+
+
+async def _main(args: argparse.Namespace) -> None:
+    warm_vectorstore()
+    for users in args.users:
+        await _run_level(users, args.requests_per_user, args.use_cache)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests-per-user", type=int, default=4)
+    parser.add_argument("--use-cache", action="store_true", help="Allow answer-cache hits (off by default).")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Run testcases/testcase.txt through retrieval and the full chat pipeline.
+
+For every question this records per-stage latency, the retrieved sources and,
+for automotive questions, whether the expected knowledge-base document was
+retrieved (recall). Results are written as JSON so runs can be compared
+across commits.
+
+Usage:
+    python benchmarks/run_testcases.py                      # real Ollama models
+    MODEL_BACKEND=stub python benchmarks/run_testcases.py   # deterministic, no server
+    python benchmarks/run_testcases.py --baseline benchmarks/reports/<old>.json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from config import EMBEDDING_MODEL_NAME, MODEL_BACKEND, OLLAMA_CHAT_MODEL, RELEVANCE_THRESHOLD, RETRIEVAL_TOP_K_MAX
+from generation.chain import stream_chat_response
+from retrieval.vectorstore import embed_query, query_vectorstore, query_vectorstore_adaptive, warm_vectorstore
+
+
+TESTCASE_PATH = ROOT_DIR / "testcases" / "testcase.txt"
+REPORT_DIR = ROOT_DIR / "benchmarks" / "reports"
+
+# "# Topic" headings inside [RAG+] map to the document that answers them.
+TOPIC_SOURCES = {
+    "Warranty": ["doc_03_warranty.txt"],
+    "Service & Maintenance": ["doc_02_service_maintenance.txt"],
+    "Electric Vehicles & Charging": ["doc_05_electric_vehicles.txt"],
+    "Ordering Process": ["doc_04_ordering_process.txt"],
+    "Customer Support": ["doc_06_customer_support.txt"],
+}
+# Cross-topic questions expect every document whose subject they mention.
+CROSS_TOPIC_KEYWORDS = {
+    "warranty": "doc_03_warranty.txt",
+    "maintenance": "doc_02_service_maintenance.txt",
+    "electric vehicle": "doc_05_electric_vehicles.txt",
+    "charging": "doc_05_electric_vehicles.txt",
+    "ordering": "doc_04_ordering_process.txt",
+    "customer support": "doc_06_customer_support.txt",
+}
+
+_CATEGORY_PATTERN = re.compile(r"^---\s*\[([A-Z+\-]+)\]")
+
+
+@dataclass
+class TestCase:
+    category: str
+    topic: str | None
+    question: str
+    expected_sources: list[str] = field(default_factory=list)
+
+
+def parse_testcases(path: Path = TESTCASE_PATH) -> list[TestCase]:
+    """Parse categorized questions; blank lines, banners and headings are skipped."""
+    cases: list[TestCase] = []
+    category: str | None = None
+    topic: str | None = None
+    for raw_line in path.read_text(encoding="utf-8").splitlines():
+        line = raw_line.strip()
+        match = _CATEGORY_PATTERN.match(line)
+        if match:
+            category, topic = match.group(1), None
+            continue
+        if line.startswith("#"):
+            topic = line.lstrip("#").strip()
+            continue
+        if not line or category is None or line.startswith("="):
+            continue
+
+        expected: list[str] = []
+        if category == "RAG+":
+            if topic in TOPIC_SOURCES:
+                expected = list(TOPIC_SOURCES[topic])
+            else:
+                lowered = line.lower()
+                expected = sorted({source for keyword, source in CROSS_TOPIC_KEYWORDS.items() if keyword in lowered})
+        cases.append(TestCase(category=category, topic=topic, question=line, expected_sources=expected))
+    return cases
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _sources(documents: list) -> list[str]:
+    return list(dict.fromkeys(document.metadata.get("source", "unknown") for document in documents))
+
+
+def _recall(expected: list[str], retrieved: list[str]) -> float | None:
+    if not expected:
+        return None
+    return len(set(expected) & set(retrieved)) / len(expected)
+
+
+def _run_case(case: TestCase, *, top_k: int, threshold: float, mode: str, rerank: bool, e2e: bool) -> dict:
+    result: dict = {**asdict(case), "stages_ms": {}}
+
+    started = time.perf_counter()
+    embedding = embed_query(case.question)
+    result["stages_ms"]["embed"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    fixed = query_vectorstore(case.question, top_k, query_embedding=embedding, mode=mode, use_rerank=rerank)
+    result["stages_ms"]["search_top_k"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    adaptive = query_vectorstore_adaptive(
+        case.question,
+        RETRIEVAL_TOP_K_MAX,
+        relevance_threshold=threshold,
+        query_embedding=embedding,
+        mode=mode,
+        use_rerank=rerank,
+    )
+    result["stages_ms"]["search_adaptive"] = (time.perf_counter() - started) * 1000
+
+    result["top_k_sources"] = _sources(fixed)
+    result["adaptive_sources"] = _sources(adaptive)
+    result["adaptive_chunks"] = len(adaptive)
+    result["recall_top_k"] = _recall(case.expected_sources, result["top_k_sources"])
+    result["recall_adaptive"] = _recall(case.expected_sources, result["adaptive_sources"])
+
+    if e2e:
+        stream = stream_chat_response(
+            case.question, [], top_k=top_k, retrieval_mode=mode, rerank=rerank, use_cache=False
+        )
+        for _ in stream:
+            pass
+        trace = stream.trace
+        result["stages_ms"].update({f"e2e_{stage}": value for stage, value in trace.stages_ms.items()})
+        result["answer"] = stream.answer
+        result["route"] = stream.route
+        result["answer_sources"] = stream.sources
+        result["prompt_tokens"] = trace.prompt_tokens
+        result["completion_tokens"] = trace.completion_tokens
+        result["recall_answer"] = _recall(case.expected_sources, stream.sources)
+    return result
+
+
+def _summarize(results: list[dict], elapsed: float) -> dict:
+    stages = sorted({stage for result in results for stage in result["stages_ms"]})
+    latency = {}
+    for stage in stages:
+        values = [result["stages_ms"][stage] for result in results if stage in result["stages_ms"]]
+        latency[stage] = {
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "mean_ms": round(statistics.mean(values), 2),
+        }
+
+    recall: dict[str, dict[str, float]] = {}
+    for key in ("recall_top_k", "recall_adaptive", "recall_answer"):
+        by_category: dict[str, list[float]] = {}
+        for result in results:
+            if result.get(key) is not None:
+                by_category.setdefault(result["topic"] or result["category"], []).append(result[key])
+        if by_category:
+            recall[key] = {name: round(statistics.mean(values), 3) for name, values in sorted(by_category.items())}
+            recall[key]["overall"] = round(statistics.mean(v for values in by_category.values() for v in values), 3)
+
+    return {
+        "cases": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "cases_per_second": round(len(results) / elapsed, 3) if elapsed else None,
+        "latency": latency,
+        "recall": recall,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_summary(summary: dict, baseline: dict | None) -> None:
+    def delta(current: float, previous: float | None) -> str:
+        return f" ({current - previous:+.2f})" if previous is not None else ""
+
+    print(f"{summary['cases']} cases in {summary['elapsed_s']} s ({summary['cases_per_second']} cases/s)")
+    for stage, stats in summary["latency"].items():
+        previous = (baseline or {}).get("latency", {}).get(stage, {})
+        print(
+            f"  {stage:<22} p50={stats['p50_ms']:9.2f} ms{delta(stats['p50_ms'], previous.get('p50_ms'))}"
+            f"  p95={stats['p95_ms']:9.2f} ms{delta(stats['p95_ms'], previous.get('p95_ms'))}"
+        )
+    for key, values in summary["recall"].items():
+        previous = (baseline or {}).get("recall", {}).get(key, {})
+        print(f"  {key:<22} overall={values['overall']:.3f}{delta(values['overall'], previous.get('overall'))}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--testcases", type=Path, default=TESTCASE_PATH)
+    parser.add_argument("--categories", nargs="*", help="Only run these categories, e.g. RAG+ OOT.")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--threshold", type=float, default=RELEVANCE_THRESHOLD)
+    parser.add_argument("--mode", default="dense", choices=["dense", "lexical", "hybrid"])
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--no-e2e", action="store_true", help="Skip generate/stream; retrieval only.")
+    parser.add_argument("--output", type=Path, help="Report path (default: benchmarks/reports/<time>_<commit>.json).")
+    parser.add_argument("--baseline", type=Path, help="Earlier report to print deltas against.")
+    args = parser.parse_args()
+
+    cases = parse_testcases(args.testcases)
+    if args.categories:
+        cases = [case for case in cases if case.category in args.categories]
+
+    warm_vectorstore()
+    started = time.perf_counter()
+    results = [
+        _run_case(
+            case,
+            top_k=args.top_k,
+            threshold=args.threshold,
+            mode=args.mode,
+            rerank=args.rerank,
+            e2e=not args.no_e2e,
+        )
+        for case in cases
+    ]
+    summary = _summarize(results, time.perf_counter() - started)
+
+    commit = _git_commit()
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "backend": MODEL_BACKEND,
+        "chat_model": "stub" if MODEL_BACKEND == "stub" else OLLAMA_CHAT_MODEL,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "options": {
+            "top_k": args.top_k,
+            "threshold": args.threshold,
+            "mode": args.mode,
+            "rerank": args.rerank,
+            "e2e": not args.no_e2e,
+        },
+        "summary": summary,
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = REPORT_DIR / f"{stamp}_{commit or 'nogit'}_{MODEL_BACKEND}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["summary"] if args.baseline else None
+    _print_summary(summary, baseline)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
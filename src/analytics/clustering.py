@@ -0,0 +1,350 @@
+"""Incremental embedding-based clustering of logged queries into topics.
+
+Run offline with ``python src/analytics/clustering.py`` (or ``make cluster-queries``)
+or from the admin dashboard. Each run only embeds and assigns normalized
+queries that have not been clustered yet.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+_SRC_DIR = Path(__file__).resolve().parents[1]
+if str(_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(_SRC_DIR))
+
+from config import ANALYTICS_DB_PATH, CLUSTER_BATCH_SIZE, CLUSTER_SIMILARITY_THRESHOLD, EMBEDDING_MODEL_NAME
+from retrieval.embedding_cache import normalize_query_text
+
+
+ProgressCallback = Callable[[float, str], None]
+
+
+def _ensure_cluster_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS query_embeddings (
+            query_hash TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            embedding BLOB NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS query_clusters (
+            cluster_id INTEGER PRIMARY KEY,
+            centroid_sum BLOB NOT NULL,
+            member_count INTEGER NOT NULL,
+            query_count INTEGER NOT NULL DEFAULT 0,
+            representative TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS query_cluster_members (
+            normalized_query TEXT PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cluster_members_cluster ON query_cluster_members(cluster_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_query_clusters_count ON query_clusters(query_count DESC)")
+
+
+def query_hash(normalized_query: str, model: str = EMBEDDING_MODEL_NAME) -> str:
+    """Cache key for a query embedding; includes the model so switching models re-embeds."""
+    return hashlib.sha256(f"{model}\0{normalize_query_text(normalized_query)}".encode("utf-8")).hexdigest()
+
+
+def _embed_with_cache(conn: sqlite3.Connection, queries: list[str]) -> np.ndarray:
+    """Return unit-normalized float32 embeddings, embedding only cache misses.
+
+    Every clustered query is kept in the unbounded ``query_embeddings`` table.
+    Misses are first looked up in the chat's query embedding cache, which is
+    only read here so a large run cannot evict the chat's entries.
+    """
+    from retrieval.vectorstore import embed_queries
+
+    hashes = [query_hash(query) for query in queries]
+    placeholders = ", ".join("?" for _ in hashes)
+    cached = {
+        row[0]: np.frombuffer(row[1], dtype=np.float32)
+        for row in conn.execute(
+            f"SELECT query_hash, embedding FROM query_embeddings WHERE query_hash IN ({placeholders})",
+            hashes,
+        )
+    }
+
+    missing = [index for index, key in enumerate(hashes) if key not in cached]
+    if missing:
+        vectors = np.asarray(embed_queries([queries[index] for index in missing], remember=False), dtype=np.float32)
+        conn.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (query_hash, model, embedding) VALUES (?, ?, ?)",
+            [(hashes[index], EMBEDDING_MODEL_NAME, vector.tobytes()) for index, vector in zip(missing, vectors)],
+        )
+        for index, vector in zip(missing, vectors):
+            cached[hashes[index]] = vector
+
+    matrix = np.stack([cached[key] for key in hashes])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _assign(
+    vectors: np.ndarray, centroid_sums: np.ndarray, threshold: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Leader clustering of one batch against the current centroids.
+
+    Vectors join their most similar centroid when cosine similarity reaches
+    ``threshold``; the rest are grouped greedily around new leaders taken
+    from the batch itself. Returns cluster indexes per vector (new clusters
+    continue after the existing ones) and the sums of the new clusters.
+    """
+    labels = np.full(len(vectors), -1, dtype=np.int64)
+    if len(centroid_sums):
+        centroids = centroid_sums / np.maximum(np.linalg.norm(centroid_sums, axis=1, keepdims=True), 1e-12)
+        similarities = vectors @ centroids.T
+        best = similarities.argmax(axis=1)
+        matched = similarities[np.arange(len(vectors)), best] >= threshold
+        labels[matched] = best[matched]
+
+    pending = np.flatnonzero(labels < 0)
+    new_sums: list[np.ndarray] = []
+    if len(pending):
+        pairwise = vectors[pending] @ vectors[pending].T
+        taken = np.zeros(len(pending), dtype=bool)
+        for row in range(len(pending)):
+            if taken[row]:
+                continue
+            members = ~taken & (pairwise[row] >= threshold)
+            members[row] = True
+            taken |= members
+            labels[pending[members]] = len(centroid_sums) + len(new_sums)
+            new_sums.append(vectors[pending[members]].sum(axis=0))
+
+    dim = vectors.shape[1]
+    return labels, np.asarray(new_sums, dtype=np.float32).reshape(-1, dim)
+
+
+def _refresh_cluster_stats(conn: sqlite3.Connection) -> None:
+    """Recompute weighted sizes and the most-asked representative of each cluster."""
+    sizes: dict[int, int] = {}
+    representatives: dict[int, tuple[int, str]] = {}
+    rows = conn.execute(
+        """
+        SELECT m.cluster_id, r.display_query, r.ask_count
+        FROM query_cluster_members m
+        JOIN query_rollup r ON r.normalized_query = m.normalized_query
+        """
+    )
+    for cluster_id, display_query, ask_count in rows:
+        sizes[cluster_id] = sizes.get(cluster_id, 0) + ask_count
+        if ask_count > representatives.get(cluster_id, (-1, ""))[0]:
+            representatives[cluster_id] = (ask_count, display_query)
+    conn.executemany(
+        "UPDATE query_clusters SET query_count = ?, representative = ? WHERE cluster_id = ?",
+        [(sizes[cluster_id], representatives[cluster_id][1], cluster_id) for cluster_id in sizes],
+    )
+
+
+def run_clustering_job(
+    *,
+    db_path: Path = ANALYTICS_DB_PATH,
+    rebuild: bool = False,
+    batch_size: int = CLUSTER_BATCH_SIZE,
+    threshold: float = CLUSTER_SIMILARITY_THRESHOLD,
+    on_progress: ProgressCallback | None = None,
+) -> dict[str, int]:
+    """Cluster every normalized query that has no cluster yet.
+
+    Embeddings are cached in SQLite by query hash and every batch is committed,
+    so an interrupted run resumes where it stopped. Centroids are kept as
+    running sums, which makes assignment one matrix product per batch.
+
+    Args:
+        rebuild: Drop existing assignments (cached embeddings are kept).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_cluster_tables(conn)
+        if rebuild:
+            conn.execute("DELETE FROM query_cluster_members")
+            conn.execute("DELETE FROM query_clusters")
+        conn.commit()
+
+        cluster_ids: list[int] = []
+        sums: list[np.ndarray] = []
+        counts: list[int] = []
+        for cluster_id, centroid_sum, member_count in conn.execute(
+            "SELECT cluster_id, centroid_sum, member_count FROM query_clusters ORDER BY cluster_id"
+        ):
+            cluster_ids.append(cluster_id)
+            sums.append(np.frombuffer(centroid_sum, dtype=np.float32))
+            counts.append(member_count)
+        centroid_sums = np.asarray(sums, dtype=np.float32)
+        member_counts = np.asarray(counts, dtype=np.int64)
+        next_id = max(cluster_ids, default=0) + 1
+
+        pending = [
+            row
+            for row in conn.execute(
+                """
+                SELECT r.normalized_query, r.display_query
+                FROM query_rollup r
+                LEFT JOIN query_cluster_members m ON m.normalized_query = r.normalized_query
+                WHERE m.normalized_query IS NULL
+                """
+            )
+        ]
+
+        now = datetime.utcnow().isoformat()
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            vectors = _embed_with_cache(conn, [normalized for normalized, _ in batch])
+            if len(centroid_sums) and centroid_sums.shape[1] != vectors.shape[1]:
+                raise ValueError("Embedding size changed since the last run; rerun with rebuild=True.")
+            if not len(centroid_sums):
+                centroid_sums = centroid_sums.reshape(0, vectors.shape[1])
+
+            labels, new_sums = _assign(vectors, centroid_sums, threshold)
+            existing = len(centroid_sums)
+            centroid_sums = np.vstack([centroid_sums, new_sums])
+            member_counts = np.concatenate([member_counts, np.zeros(len(new_sums), dtype=np.int64)])
+            old_labels = labels < existing
+            np.add.at(centroid_sums, labels[old_labels], vectors[old_labels])
+            member_counts += np.bincount(labels, minlength=len(member_counts))
+
+            cluster_ids.extend(range(next_id, next_id + len(new_sums)))
+            next_id += len(new_sums)
+            touched = np.unique(labels)
+            conn.executemany(
+                """
+                INSERT INTO query_clusters (cluster_id, centroid_sum, member_count, representative, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(cluster_id) DO UPDATE SET
+                    centroid_sum = excluded.centroid_sum,
+                    member_count = excluded.member_count,
+                    updated_at = excluded.updated_at
+                """,
+                [
+                    (
+                        cluster_ids[label],
+                        centroid_sums[label].tobytes(),
+                        int(member_counts[label]),
+                        batch[int(np.flatnonzero(labels == label)[0])][1],
+                        now,
+                    )
+                    for label in touched
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO query_cluster_members (normalized_query, cluster_id) VALUES (?, ?)",
+                [(normalized, cluster_ids[label]) for (normalized, _), label in zip(batch, labels)],
+            )
+            conn.commit()
+            if on_progress is not None:
+                done = min(start + batch_size, len(pending))
+                on_progress(done / len(pending), f"Clustered {done} of {len(pending)} new queries")
+
+        _refresh_cluster_stats(conn)
+        conn.commit()
+        return {"new_queries": len(pending), "clusters": len(cluster_ids)}
+    finally:
+        conn.close()
+
+
+def get_query_clusters(limit: int = 20, *, trend_days: int = 7, samples: int = 3) -> list[dict]:
+    """Return the largest clusters with sample questions and a recent-vs-previous trend.
+
+    The trend compares asks in the last ``trend_days`` days with the
+    ``trend_days`` before that, using the ``query_daily`` rollup.
+    """
+    today = datetime.utcnow().date()
+    recent_start = (today - timedelta(days=trend_days - 1)).isoformat()
+    previous_start = (today - timedelta(days=2 * trend_days - 1)).isoformat()
+
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        _ensure_cluster_tables(conn)
+        clusters = conn.execute(
+            """
+            SELECT cluster_id, representative, query_count, member_count
+            FROM query_clusters
+            ORDER BY query_count DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        if not clusters:
+            return []
+
+        trends: dict[int, list[int]] = {}
+        for cluster_id, day, ask_count in conn.execute(
+            """
+            SELECT m.cluster_id, d.day, d.ask_count
+            FROM query_daily d
+            JOIN query_cluster_members m ON m.normalized_query = d.normalized_query
+            WHERE d.day >= ?
+            """,
+            (previous_start,),
+        ):
+            bucket = trends.setdefault(cluster_id, [0, 0])
+            bucket[0 if day >= recent_start else 1] += ask_count
+
+        results = []
+        for cluster_id, representative, query_count, member_count in clusters:
+            examples = [
+                row[0]
+                for row in conn.execute(
+                    """
+                    SELECT r.display_query
+                    FROM query_cluster_members m
+                    JOIN query_rollup r ON r.normalized_query = m.normalized_query
+                    WHERE m.cluster_id = ? AND r.display_query != ?
+                    ORDER BY r.ask_count DESC
+                    LIMIT ?
+                    """,
+                    (cluster_id, representative, samples),
+                )
+            ]
+            recent, previous = trends.get(cluster_id, [0, 0])
+            results.append(
+                {
+                    "topic": representative,
+                    "asks": query_count,
+                    "distinct_questions": member_count,
+                    f"last_{trend_days}d": recent,
+                    f"previous_{trend_days}d": previous,
+                    "trend": f"{(recent - previous) / previous:+.0%}" if previous else ("new" if recent else "—"),
+                    "examples": " · ".join(examples),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cluster logged chat queries into topics.")
+    parser.add_argument("--rebuild", action="store_true", help="Re-cluster everything from cached embeddings.")
+    parser.add_argument("--threshold", type=float, default=CLUSTER_SIMILARITY_THRESHOLD)
+    parser.add_argument("--batch-size", type=int, default=CLUSTER_BATCH_SIZE)
+    args = parser.parse_args()
+
+    summary = run_clustering_job(
+        rebuild=args.rebuild,
+        threshold=args.threshold,
+        batch_size=args.batch_size,
+        on_progress=lambda fraction, message: print(f"[{fraction:4.0%}] {message}"),
+    )
+    print(f"{summary['new_queries']} new queries clustered; {summary['clusters']} clusters in total.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,18 @@
 
 import sqlite3
 from datetime import datetime
+from pathlib import Path
 
-from config import ANALYTICS_DB_PATH, ANALYTICS_DIR
+from analytics.rollups import create_rollup_tables, normalize_query, refresh_rollups
+from analytics.tracing import TRACE_STAGES, RequestTrace
+from analytics.writer import ChatLogRow, get_chat_log_writer, open_analytics_connection
+from config import ANALYTICS_DB_PATH
 
 
-def init_analytics_db() -> None:
+def init_analytics_db(db_path: Path = ANALYTICS_DB_PATH) -> None:
     """Create database and table if they do not exist."""
-    ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    with open_analytics_connection(db_path) as conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS chat_logs (
@@ -20,37 +24,78 @@ def init_analytics_db() -> None:
             )
             """
         )
-        conn.commit()
-
-
-def log_chat_interaction(query: str, answer: str) -> None:
-    """Insert one chat interaction row."""
-    now = datetime.utcnow().isoformat()
-    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        stage_columns = ",\n".join(f"                {stage}_ms REAL" for stage in TRACE_STAGES)
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS chat_traces (
+                log_id INTEGER PRIMARY KEY REFERENCES chat_logs(id),
+                created_at TEXT NOT NULL,
+{stage_columns},
+                prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                completion_tokens INTEGER NOT NULL DEFAULT 0,
+                chunks INTEGER NOT NULL DEFAULT 0,
+                context_tokens_saved INTEGER NOT NULL DEFAULT 0,
+                cache_hit INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        trace_columns = {row[1] for row in conn.execute("PRAGMA table_info(chat_traces)")}
+        if "context_tokens_saved" not in trace_columns:
+            conn.execute("ALTER TABLE chat_traces ADD COLUMN context_tokens_saved INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_traces_created_at ON chat_traces(created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_logs_created_at ON chat_logs(created_at)")
+        create_rollup_tables(conn)
         conn.execute(
-            "INSERT INTO chat_logs (query, answer, created_at) VALUES (?, ?, ?)",
-            (query, answer, now),
+            """
+            CREATE TABLE IF NOT EXISTS summary_cache (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                summary TEXT NOT NULL,
+                last_log_id INTEGER NOT NULL,
+                query_count INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
         )
         conn.commit()
+        # Backfill rows logged before the rollups existed.
+        refresh_rollups(conn)
+        conn.commit()
+
+
+def log_chat_interaction(query: str, answer: str, trace: RequestTrace | None = None) -> bool:
+    """Queue one chat interaction (plus its stage timings) for the background writer.
+
+    Returns:
+        False if the write queue was full and the row was dropped.
+    """
+    row = ChatLogRow(query=query, answer=answer, created_at=datetime.utcnow().isoformat(), trace=trace)
+    return get_chat_log_writer().submit(row)
+
+
+def flush_chat_logs(timeout: float | None = 5.0) -> bool:
+    """Wait until queued chat interactions are committed."""
+    return get_chat_log_writer().flush(timeout)
 
 
 def get_summary_stats() -> dict[str, int]:
-    """Return total and unique query counts."""
+    """Return total and unique (normalized) query counts from the rollups."""
     with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
-        total_queries = conn.execute("SELECT COUNT(*) FROM chat_logs").fetchone()[0]
-        unique_queries = conn.execute("SELECT COUNT(DISTINCT query) FROM chat_logs").fetchone()[0]
-    return {"total_queries": total_queries, "unique_queries": unique_queries}
+        rows = dict(
+            conn.execute(
+                "SELECT key, value FROM rollup_state WHERE key IN ('total_queries', 'unique_queries')"
+            ).fetchall()
+        )
+    return {"total_queries": rows.get("total_queries", 0), "unique_queries": rows.get("unique_queries", 0)}
 
 
 def get_top_questions(limit: int = 10) -> list[dict[str, int | str]]:
-    """Return top repeated questions by exact match."""
+    """Return top repeated questions, grouped case- and whitespace-insensitively."""
     with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
         rows = conn.execute(
             """
-            SELECT query, COUNT(*) AS ask_count
-            FROM chat_logs
-            GROUP BY query
-            ORDER BY ask_count DESC, query ASC
+            SELECT display_query, ask_count
+            FROM query_rollup
+            ORDER BY ask_count DESC, normalized_query ASC
             LIMIT ?
             """,
             (limit,),
@@ -58,6 +103,20 @@ def get_top_questions(limit: int = 10) -> list[dict[str, int | str]]:
     return [{"query": row[0], "ask_count": row[1]} for row in rows]
 
 
+def get_query_volume(granularity: str = "day", limit: int = 30) -> list[dict[str, int | str]]:
+    """Return the most recent ``limit`` hourly or daily buckets, oldest first."""
+    table, column = {"day": ("volume_daily", "day"), "hour": ("volume_hourly", "hour")}[granularity]
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        rows = conn.execute(
+            f"SELECT {column}, query_count, unique_queries FROM {table} ORDER BY {column} DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        {granularity: row[0], "queries": row[1], "unique_queries": row[2]}
+        for row in reversed(rows)
+    ]
+
+
 def get_all_queries() -> list[str]:
     """Return every logged query in chronological order."""
     with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
@@ -65,3 +124,85 @@ def get_all_queries() -> list[str]:
             "SELECT query FROM chat_logs ORDER BY created_at ASC"
         ).fetchall()
     return [row[0] for row in rows]
+
+
+def get_query_counts_since(last_log_id: int = 0) -> tuple[list[tuple[str, int]], int]:
+    """Return queries logged after ``last_log_id``, deduplicated with counts.
+
+    Queries are grouped by their normalized form and ordered by count; the
+    second value is the newest log id seen (``last_log_id`` if there are none).
+    """
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        rows = conn.execute(
+            "SELECT query, COUNT(*), MAX(id) FROM chat_logs WHERE id > ? GROUP BY query",
+            (last_log_id,),
+        ).fetchall()
+
+    counts: dict[str, list] = {}
+    newest_id = last_log_id
+    for query, count, max_id in rows:
+        entry = counts.setdefault(normalize_query(query), [query, 0])
+        entry[1] += count
+        newest_id = max(newest_id, max_id)
+    items = sorted(((query, count) for query, count in counts.values()), key=lambda item: (-item[1], item[0]))
+    return items, newest_id
+
+
+def get_cached_summary() -> dict[str, int | str] | None:
+    """Return the last saved log summary and the log id it covers up to."""
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        row = conn.execute(
+            "SELECT summary, last_log_id, query_count, created_at FROM summary_cache WHERE id = 1"
+        ).fetchone()
+    if row is None:
+        return None
+    return {"summary": row[0], "last_log_id": row[1], "query_count": row[2], "created_at": row[3]}
+
+
+def save_cached_summary(summary: str, last_log_id: int, query_count: int) -> None:
+    """Replace the cached log summary."""
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO summary_cache (id, summary, last_log_id, query_count, created_at)
+            VALUES (1, ?, ?, ?, ?)
+            """,
+            (summary, last_log_id, query_count, datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def get_stage_latency_percentiles(since: str | None = None) -> list[dict[str, float | int | str]]:
+    """Return p50/p95/p99 latency per pipeline stage for traces newer than ``since``.
+
+    Args:
+        since: ISO timestamp (UTC); None covers the whole history.
+    """
+    columns = ", ".join(f"{stage}_ms" for stage in TRACE_STAGES)
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        rows = conn.execute(
+            f"SELECT {columns} FROM chat_traces WHERE created_at >= ?",
+            (since or "",),
+        ).fetchall()
+
+    stats: list[dict[str, float | int | str]] = []
+    for index, stage in enumerate(TRACE_STAGES):
+        values = sorted(row[index] for row in rows if row[index] is not None)
+        if not values:
+            continue
+        stats.append(
+            {
+                "stage": stage,
+                "count": len(values),
+                "p50_ms": round(_percentile(values, 50), 1),
+                "p95_ms": round(_percentile(values, 95), 1),
+                "p99_ms": round(_percentile(values, 99), 1),
+            }
+        )
+    return stats
@@ -0,0 +1,123 @@
+"""Cross-process counters and gauges persisted to the analytics database."""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config import ANALYTICS_DB_PATH, ANALYTICS_DIR, METRICS_FLUSH_INTERVAL_SECONDS
+
+
+# Updates are buffered in memory and written by a background thread every
+# METRICS_FLUSH_INTERVAL_SECONDS, so recording a metric never waits on SQLite.
+_LOCK = threading.Lock()
+_PENDING_COUNTERS: dict[str, float] = {}
+_PENDING_GAUGES: dict[str, float] = {}
+_FLUSHER: threading.Thread | None = None
+
+
+def _ensure_metrics_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS runtime_metrics (
+            name TEXT PRIMARY KEY,
+            value REAL NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def _flush_periodically() -> None:
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL_SECONDS)
+        flush_metrics()
+
+
+def _ensure_flusher() -> None:
+    """Start the flush thread on first use (it is not inherited by forks)."""
+    global _FLUSHER
+    if _FLUSHER is not None:
+        return
+    with _LOCK:
+        if _FLUSHER is None:
+            _FLUSHER = threading.Thread(target=_flush_periodically, name="metrics-flusher", daemon=True)
+            _FLUSHER.start()
+
+
+def _reset_after_fork() -> None:
+    # The parent still flushes its own buffered updates.
+    global _FLUSHER, _LOCK
+    _LOCK = threading.Lock()
+    _FLUSHER = None
+    _PENDING_COUNTERS.clear()
+    _PENDING_GAUGES.clear()
+
+
+def increment_counter(name: str, amount: float = 1.0) -> None:
+    """Add ``amount`` to a counter shared by all processes."""
+    with _LOCK:
+        _PENDING_COUNTERS[name] = _PENDING_COUNTERS.get(name, 0.0) + amount
+    _ensure_flusher()
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Record the latest value of a gauge (last writer wins)."""
+    with _LOCK:
+        _PENDING_GAUGES[name] = value
+    _ensure_flusher()
+
+
+def flush_metrics() -> None:
+    """Write buffered counter deltas and gauge values to SQLite."""
+    with _LOCK:
+        counters = dict(_PENDING_COUNTERS)
+        gauges = dict(_PENDING_GAUGES)
+        _PENDING_COUNTERS.clear()
+        _PENDING_GAUGES.clear()
+    if not counters and not gauges:
+        return
+
+    now = datetime.utcnow().isoformat()
+    try:
+        ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+            _ensure_metrics_table(conn)
+            conn.executemany(
+                """
+                INSERT INTO runtime_metrics (name, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = value + excluded.value, updated_at = excluded.updated_at
+                """,
+                [(name, value, now) for name, value in counters.items()],
+            )
+            conn.executemany(
+                """
+                INSERT INTO runtime_metrics (name, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """,
+                [(name, value, now) for name, value in gauges.items()],
+            )
+            conn.commit()
+    except sqlite3.Error:
+        # Keep counter deltas for the next attempt; stale gauges are not worth keeping.
+        with _LOCK:
+            for name, value in counters.items():
+                _PENDING_COUNTERS[name] = _PENDING_COUNTERS.get(name, 0.0) + value
+
+
+def get_metrics(prefix: str = "") -> dict[str, float]:
+    """Return persisted metrics whose name starts with ``prefix``."""
+    flush_metrics()
+    with sqlite3.connect(ANALYTICS_DB_PATH) as conn:
+        _ensure_metrics_table(conn)
+        rows = conn.execute(
+            "SELECT name, value FROM runtime_metrics WHERE name LIKE ? ORDER BY name",
+            (f"{prefix}%",),
+        ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+atexit.register(flush_metrics)
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,198 @@
+"""Incrementally maintained aggregates over ``chat_logs`` for the admin dashboard."""
+
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from config import ANALYTICS_DB_PATH
+
+
+ROLLUP_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS rollup_state (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS query_rollup (
+        normalized_query TEXT PRIMARY KEY,
+        display_query TEXT NOT NULL,
+        ask_count INTEGER NOT NULL,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_query_rollup_count ON query_rollup(ask_count DESC, normalized_query)",
+    """
+    CREATE TABLE IF NOT EXISTS query_daily (
+        day TEXT NOT NULL,
+        normalized_query TEXT NOT NULL,
+        ask_count INTEGER NOT NULL,
+        PRIMARY KEY (day, normalized_query)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS query_hourly (
+        hour TEXT NOT NULL,
+        normalized_query TEXT NOT NULL,
+        ask_count INTEGER NOT NULL,
+        PRIMARY KEY (hour, normalized_query)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS volume_daily (
+        day TEXT PRIMARY KEY,
+        query_count INTEGER NOT NULL,
+        unique_queries INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS volume_hourly (
+        hour TEXT PRIMARY KEY,
+        query_count INTEGER NOT NULL,
+        unique_queries INTEGER NOT NULL
+    )
+    """,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive key used to group repeated questions."""
+    normalized = " ".join(query.lower().split()).rstrip("?!.。 ")
+    return normalized or query.strip()
+
+
+def create_rollup_tables(conn: sqlite3.Connection) -> None:
+    """Create rollup tables and their indexes if they do not exist."""
+    for statement in ROLLUP_SCHEMA:
+        conn.execute(statement)
+
+
+def _get_state(conn: sqlite3.Connection, key: str) -> int:
+    row = conn.execute("SELECT value FROM rollup_state WHERE key = ?", (key,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _add_state(conn: sqlite3.Connection, key: str, amount: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO rollup_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+        """,
+        (key, amount),
+    )
+
+
+def _bump_bucket(conn: sqlite3.Connection, table: str, column: str, counts: Counter) -> Counter:
+    """Add per-(bucket, query) counts; return how many queries are new per bucket."""
+    new_per_bucket: Counter = Counter()
+    for (bucket, key), count in counts.items():
+        inserted = conn.execute(
+            f"INSERT OR IGNORE INTO {table} ({column}, normalized_query, ask_count) VALUES (?, ?, ?)",
+            (bucket, key, count),
+        ).rowcount
+        if inserted:
+            new_per_bucket[bucket] += 1
+        else:
+            conn.execute(
+                f"UPDATE {table} SET ask_count = ask_count + ? WHERE {column} = ? AND normalized_query = ?",
+                (count, bucket, key),
+            )
+    return new_per_bucket
+
+
+def _bump_volume(conn: sqlite3.Connection, table: str, column: str, volume: Counter, unique: Counter) -> None:
+    conn.executemany(
+        f"""
+        INSERT INTO {table} ({column}, query_count, unique_queries) VALUES (?, ?, ?)
+        ON CONFLICT({column}) DO UPDATE SET
+            query_count = query_count + excluded.query_count,
+            unique_queries = unique_queries + excluded.unique_queries
+        """,
+        [(bucket, count, unique.get(bucket, 0)) for bucket, count in volume.items()],
+    )
+
+
+def refresh_rollups(conn: sqlite3.Connection) -> int:
+    """Fold every ``chat_logs`` row past the stored watermark into the rollups.
+
+    Runs inside the caller's transaction when one is open (the log writer calls
+    it right after inserting a batch), otherwise takes the write lock itself so
+    concurrent refreshers cannot count a row twice. Cost is proportional to the
+    number of new rows, not to the size of the history.
+
+    Returns:
+        Number of log rows folded in.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+    watermark = _get_state(conn, "last_log_id")
+    rows = conn.execute(
+        "SELECT id, query, created_at FROM chat_logs WHERE id > ? ORDER BY id",
+        (watermark,),
+    ).fetchall()
+    if not rows:
+        return 0
+
+    totals: Counter = Counter()
+    latest: dict[str, tuple[str, str]] = {}
+    first_seen: dict[str, str] = {}
+    daily: Counter = Counter()
+    hourly: Counter = Counter()
+    day_volume: Counter = Counter()
+    hour_volume: Counter = Counter()
+    for _, query, created_at in rows:
+        key = normalize_query(query)
+        day, hour = created_at[:10], created_at[:13]
+        totals[key] += 1
+        first_seen.setdefault(key, created_at)
+        latest[key] = (query, created_at)
+        daily[(day, key)] += 1
+        hourly[(hour, key)] += 1
+        day_volume[day] += 1
+        hour_volume[hour] += 1
+
+    new_queries = 0
+    for key, count in totals.items():
+        display_query, last_seen = latest[key]
+        inserted = conn.execute(
+            """
+            INSERT OR IGNORE INTO query_rollup (normalized_query, display_query, ask_count, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (key, display_query, count, first_seen[key], last_seen),
+        ).rowcount
+        if inserted:
+            new_queries += 1
+        else:
+            conn.execute(
+                """
+                UPDATE query_rollup
+                SET ask_count = ask_count + ?, display_query = ?, last_seen = ?
+                WHERE normalized_query = ?
+                """,
+                (count, display_query, last_seen, key),
+            )
+
+    _bump_volume(conn, "volume_daily", "day", day_volume, _bump_bucket(conn, "query_daily", "day", daily))
+    _bump_volume(conn, "volume_hourly", "hour", hour_volume, _bump_bucket(conn, "query_hourly", "hour", hourly))
+
+    _add_state(conn, "total_queries", len(rows))
+    _add_state(conn, "unique_queries", new_queries)
+    conn.execute(
+        "INSERT OR REPLACE INTO rollup_state (key, value) VALUES ('last_log_id', ?)",
+        (rows[-1][0],),
+    )
+    return len(rows)
+
+
+def compact_rollups(db_path: Path = ANALYTICS_DB_PATH) -> int:
+    """Standalone catch-up pass, e.g. after rows were inserted outside the log writer."""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            return refresh_rollups(conn)
+    finally:
+        conn.close()
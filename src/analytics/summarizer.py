@@ -1,6 +1,14 @@
-"""LLM-powered analytics summariser for chat logs."""
+"""LLM-powered analytics summariser for chat logs.
+
+Large histories are summarised map-reduce style: identical queries are
+collapsed with counts, split into token-budgeted batches that fit the
+model's context, summarised in parallel, and the partial reports merged.
+"""
 
 import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 _SRC_DIR = Path(__file__).resolve().parents[1]
@@ -8,38 +16,166 @@ if str(_SRC_DIR) not in sys.path:
     sys.path.insert(0, str(_SRC_DIR))
 
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
 
-from config import OLLAMA_CHAT_MODEL
-from generation.prompts import build_summary_user_prompt, get_summary_system_prompt
+from analytics.logger import get_cached_summary, get_query_counts_since, save_cached_summary
+from config import LLM_BACKGROUND_DEADLINE_SECONDS, SUMMARY_BATCH_TOKENS, SUMMARY_MAX_WORKERS, SUMMARY_QUERY_MAX_CHARS
+from generation.prompts import (
+    build_summary_merge_prompt,
+    build_summary_user_prompt,
+    estimate_tokens,
+    get_summary_merge_system_prompt,
+    get_summary_system_prompt,
+)
+from generation.scheduler import Priority, get_llm_scheduler
+from model_backend import get_chat_model
+
+
+ProgressCallback = Callable[[float, str], None]
+
+NO_LOGS_MESSAGE = "No chat logs found. Ask some questions in the chat first."
+
+
+def _invoke(system_prompt: str, user_prompt: str) -> str:
+    model = get_chat_model(temperature=0.2)
+    # Background priority: customer chat is always served first.
+    deadline = time.monotonic() + LLM_BACKGROUND_DEADLINE_SECONDS
+    with get_llm_scheduler().slot(Priority.BACKGROUND, deadline=deadline):
+        result = model.invoke([SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)])
+    content = result.content if isinstance(result.content, str) else str(result.content)
+    return content.strip()
+
+
+def _dedupe(queries: list[str]) -> list[tuple[str, int]]:
+    counts: dict[str, int] = {}
+    for query in queries:
+        counts[query] = counts.get(query, 0) + 1
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _batch_items(items: list[tuple[str, int]], token_budget: int) -> list[list[tuple[str, int]]]:
+    """Greedily pack (query, count) items into batches of roughly ``token_budget`` tokens."""
+    batches: list[list[tuple[str, int]]] = []
+    current: list[tuple[str, int]] = []
+    used = 0
+    for query, count in items:
+        query = query[:SUMMARY_QUERY_MAX_CHARS]
+        cost = estimate_tokens(query) + 6  # numbering and "(asked n×)"
+        if current and used + cost > token_budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append((query, count))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _group_reports(reports: list[tuple[str, int]], token_budget: int) -> list[list[tuple[str, int]]]:
+    """Group partial reports for merging; every group holds at least two so rounds shrink."""
+    groups: list[list[tuple[str, int]]] = []
+    current: list[tuple[str, int]] = []
+    used = 0
+    for report in reports:
+        cost = estimate_tokens(report[0]) + 10
+        if len(current) >= 2 and used + cost > token_budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(report)
+        used += cost
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+
+def _map_reduce(
+    items: list[tuple[str, int]],
+    *,
+    previous: tuple[str, int] | None = None,
+    token_budget: int = SUMMARY_BATCH_TOKENS,
+    max_workers: int = SUMMARY_MAX_WORKERS,
+    on_progress: ProgressCallback | None = None,
+) -> str:
+    def report(fraction: float, message: str) -> None:
+        if on_progress is not None:
+            on_progress(min(fraction, 1.0), message)
+
+    batches = _batch_items(items, token_budget)
+    system_prompt = get_summary_system_prompt()
+    reports: list[tuple[str, int]] = [previous] if previous is not None else []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [
+            (pool.submit(_invoke, system_prompt, build_summary_user_prompt(batch)), sum(c for _, c in batch))
+            for batch in batches
+        ]
+        for done, (future, covered) in enumerate(futures, start=1):
+            reports.append((future.result(), covered))
+            report(0.8 * done / len(futures), f"Summarised batch {done} of {len(futures)}")
+
+        merge_system_prompt = get_summary_merge_system_prompt()
+        while len(reports) > 1:
+            groups = _group_reports(reports, token_budget)
+            report(0.85, f"Merging {len(reports)} partial reports")
+            merged = pool.map(lambda group: _invoke(merge_system_prompt, build_summary_merge_prompt(group)), groups)
+            reports = [(text, sum(c for _, c in group)) for text, group in zip(merged, groups)]
+
+    report(1.0, "Done")
+    return reports[0][0] if reports else ""
 
 
-def summarize_chat_logs(queries: list[str]) -> str:
+def summarize_chat_logs(queries: list[str], *, on_progress: ProgressCallback | None = None) -> str:
     """Call the LLM to produce an automotive service-improvement summary.
 
     Non-automotive queries (small talk, off-topic, crisis, injection attempts)
     are filtered out by the LLM itself via the system prompt.
 
     Args:
-        queries: All raw query strings retrieved from the chat_logs table.
+        queries: Raw query strings retrieved from the chat_logs table.
+        on_progress: Optional ``(fraction, message)`` callback.
 
     Returns:
         A markdown-formatted summary string, or an error/no-data message.
     """
     if not queries:
-        return "No chat logs found. Ask some questions in the chat first."
+        return NO_LOGS_MESSAGE
+    try:
+        summary = _map_reduce(_dedupe(queries), on_progress=on_progress)
+    except Exception as exc:
+        return f"LLM call failed: {exc}\n\nPlease make sure Ollama is running and the model is available."
+    return summary or "The model returned an empty response."
 
-    system_prompt = get_summary_system_prompt()
-    user_prompt = build_summary_user_prompt(queries)
 
+def summarize_new_chat_logs(*, rebuild: bool = False, on_progress: ProgressCallback | None = None) -> str:
+    """Update the cached summary with only the logs written since it was made.
+
+    The previous summary joins the merge step as one more partial report,
+    weighted by the number of queries it covered.
+
+    Args:
+        rebuild: Ignore the cached summary and summarise the whole history.
+        on_progress: Optional ``(fraction, message)`` callback.
+    """
+    cached = None if rebuild else get_cached_summary()
+    last_log_id = int(cached["last_log_id"]) if cached else 0
+    items, newest_id = get_query_counts_since(last_log_id)
+
+    if not items:
+        if cached:
+            if on_progress is not None:
+                on_progress(1.0, "No new chat logs since the last summary")
+            return str(cached["summary"])
+        return NO_LOGS_MESSAGE
+
+    previous = (str(cached["summary"]), int(cached["query_count"])) if cached else None
     try:
-        model = ChatOllama(model=OLLAMA_CHAT_MODEL, temperature=0.2)
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt),
-        ]
-        result = model.invoke(messages)
-        content = result.content if isinstance(result.content, str) else str(result.content)
-        return content.strip() or "The model returned an empty response."
+        summary = _map_reduce(items, previous=previous, on_progress=on_progress)
     except Exception as exc:
         return f"LLM call failed: {exc}\n\nPlease make sure Ollama is running and the model is available."
+    if not summary:
+        return "The model returned an empty response."
+
+    covered = sum(count for _, count in items) + (previous[1] if previous else 0)
+    save_cached_summary(summary, newest_id, covered)
+    return summary
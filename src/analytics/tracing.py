@@ -0,0 +1,61 @@
+"""Per-request latency tracing for the RAG pipeline."""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+
+TRACE_STAGES = ("sanitize", "embed", "search", "prompt", "ttft", "generation", "total")
+
+
+@dataclass
+class RequestTrace:
+    """Stage timings (milliseconds) and sizes for one chat request.
+
+    Recording is just ``perf_counter`` arithmetic on this object; nothing is
+    written until the interaction is logged.
+    """
+
+    stages_ms: dict[str, float] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    chunks: int = 0
+    context_tokens_saved: int = 0
+    cache_hit: bool = False
+    started_at: float = field(default_factory=time.perf_counter, repr=False)
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        self.stages_ms[stage] = self.stages_ms.get(stage, 0.0) + elapsed_ms
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000)
+
+    def mark_since_start(self, stage: str) -> None:
+        """Record the time elapsed since the request started (e.g. time-to-first-token)."""
+        self.stages_ms[stage] = (time.perf_counter() - self.started_at) * 1000
+
+    def finish(self) -> None:
+        self.mark_since_start("total")
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("started_at")
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RequestTrace":
+        return cls(
+            stages_ms={str(k): float(v) for k, v in dict(data.get("stages_ms", {})).items()},
+            prompt_tokens=int(data.get("prompt_tokens", 0)),
+            completion_tokens=int(data.get("completion_tokens", 0)),
+            chunks=int(data.get("chunks", 0)),
+            context_tokens_saved=int(data.get("context_tokens_saved", 0)),
+            cache_hit=bool(data.get("cache_hit", False)),
+        )
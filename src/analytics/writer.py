@@ -0,0 +1,204 @@
+"""Background writer that batches chat log inserts into SQLite transactions."""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from analytics.metrics import increment_counter
+from analytics.rollups import refresh_rollups
+from analytics.tracing import TRACE_STAGES, RequestTrace
+from config import (
+    ANALYTICS_DB_PATH,
+    LOG_BATCH_SIZE,
+    LOG_ENQUEUE_TIMEOUT_SECONDS,
+    LOG_FLUSH_INTERVAL_SECONDS,
+    LOG_QUEUE_MAX_SIZE,
+)
+
+
+@dataclass(frozen=True)
+class ChatLogRow:
+    """One pending chat interaction; ``created_at`` is stamped at submit time."""
+
+    query: str
+    answer: str
+    created_at: str
+    trace: RequestTrace | None = None
+
+
+_STOP = object()
+
+
+def open_analytics_connection(db_path: Path = ANALYTICS_DB_PATH) -> sqlite3.Connection:
+    """Open a connection tuned for many small writes (WAL, relaxed fsync)."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def insert_chat_rows(conn: sqlite3.Connection, rows: list[ChatLogRow]) -> None:
+    """Insert chat rows (and their traces) without committing."""
+    trace_columns = ", ".join(f"{stage}_ms" for stage in TRACE_STAGES)
+    trace_placeholders = ", ".join("?" for _ in TRACE_STAGES)
+    for row in rows:
+        cursor = conn.execute(
+            "INSERT INTO chat_logs (query, answer, created_at) VALUES (?, ?, ?)",
+            (row.query, row.answer, row.created_at),
+        )
+        if row.trace is None:
+            continue
+        trace = row.trace
+        conn.execute(
+            f"""
+            INSERT INTO chat_traces (
+                log_id, created_at, {trace_columns}, prompt_tokens, completion_tokens, chunks,
+                context_tokens_saved, cache_hit
+            ) VALUES (?, ?, {trace_placeholders}, ?, ?, ?, ?, ?)
+            """,
+            (
+                cursor.lastrowid,
+                row.created_at,
+                *(trace.stages_ms.get(stage) for stage in TRACE_STAGES),
+                trace.prompt_tokens,
+                trace.completion_tokens,
+                trace.chunks,
+                trace.context_tokens_saved,
+                int(trace.cache_hit),
+            ),
+        )
+
+
+class ChatLogWriter:
+    """Single background thread that owns one SQLite connection.
+
+    ``submit`` never touches SQLite: it enqueues into a bounded queue, waiting
+    at most ``enqueue_timeout`` seconds when the queue is full (backpressure)
+    and then dropping the row and counting it. The writer thread groups
+    whatever is queued, up to ``batch_size`` rows, into one transaction that
+    also folds them into the dashboard rollups.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = ANALYTICS_DB_PATH,
+        *,
+        max_queue_size: int = LOG_QUEUE_MAX_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout: float = LOG_ENQUEUE_TIMEOUT_SECONDS,
+    ) -> None:
+        self._db_path = db_path
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue_size))
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._enqueue_timeout = enqueue_timeout
+        self._thread: threading.Thread | None = None
+        # Guards thread start-up and the counters, which several threads update.
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: ChatLogRow) -> bool:
+        """Queue a row for writing; return False if it had to be dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self._enqueue_timeout)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            increment_counter("chat_log_writer.dropped")
+            return False
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Block until everything queued so far is committed."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Flush pending rows and stop the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def _write(self, conn: sqlite3.Connection, rows: list[ChatLogRow]) -> None:
+        if not rows:
+            return
+        try:
+            with conn:
+                insert_chat_rows(conn, rows)
+                refresh_rollups(conn)
+            with self._lock:
+                self.written += len(rows)
+        except sqlite3.Error:
+            with self._lock:
+                self.dropped += len(rows)
+            increment_counter("chat_log_writer.dropped", len(rows))
+
+    def _run(self) -> None:
+        conn = open_analytics_connection(self._db_path)
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self._flush_interval)
+                except queue.Empty:
+                    continue
+
+                rows: list[ChatLogRow] = []
+                waiters: list[threading.Event] = []
+                stop = False
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        rows.append(item)
+                    if stop or len(rows) >= self._batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                self._write(conn, rows)
+                for waiter in waiters:
+                    waiter.set()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+
+_WRITER = ChatLogWriter()
+atexit.register(_WRITER.close)
+
+
+def get_chat_log_writer() -> ChatLogWriter:
+    """Return the process-wide chat log writer."""
+    return _WRITER
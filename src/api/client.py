@@ -0,0 +1,98 @@
+"""HTTP client for the chat API, mirroring the in-process chain interface."""
+
+import json
+from collections.abc import Iterator
+
+import httpx
+
+from analytics.tracing import RequestTrace
+from config import API_TIMEOUT_SECONDS, CHAT_API_URL
+
+
+LLM_UNREACHABLE_MESSAGE = "Chat service is unreachable. Please ensure the API server is running."
+
+
+class RemoteChatStream:
+    """Iterable of answer text chunks read from ``/v1/chat/stream``.
+
+    Behaves like generation.chain.ChatStream: ``answer``, ``sources``,
+    ``num_chunks`` and the server-side ``trace`` are set once iteration
+    completes. If the stream ends without a ``done`` event, ``answer`` is
+    the text streamed so far.
+    """
+
+    def __init__(self, client: "ChatApiClient", payload: dict) -> None:
+        self._client = client
+        self._payload = payload
+        self.answer = ""
+        self.sources: list[str] = []
+        self.num_chunks = 0
+        self.trace: RequestTrace | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        streamed: list[str] = []
+        finished = False
+        try:
+            with self._client._http.stream("POST", "/v1/chat/stream", json=self._payload) as response:
+                response.raise_for_status()
+                event = ""
+                for line in response.iter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[len("data: "):])
+                        if event == "token":
+                            streamed.append(data["text"])
+                            yield data["text"]
+                        elif event == "done":
+                            finished = True
+                            self.answer = data["answer"]
+                            self.sources = list(data["sources"])
+                            self.num_chunks = int(data["num_chunks"])
+                            if "trace" in data:
+                                self.trace = RequestTrace.from_dict(data["trace"])
+        except httpx.HTTPError:
+            self.answer = LLM_UNREACHABLE_MESSAGE
+            self.sources = []
+            self.num_chunks = 0
+            return
+        if not finished:
+            # The server or a proxy cut the stream; keep what the user already saw.
+            self.answer = "".join(streamed) or LLM_UNREACHABLE_MESSAGE
+
+
+class ChatApiClient:
+    """Thin synchronous client; one pooled HTTP connection set per instance."""
+
+    def __init__(self, base_url: str = CHAT_API_URL, timeout: float = API_TIMEOUT_SECONDS) -> None:
+        self._http = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def close(self) -> None:
+        self._http.close()
+
+    @staticmethod
+    def _payload(message: str, history: list[dict], **options) -> dict:
+        # UI messages carry extra keys (sources, num_chunks); only role/content go over the wire.
+        turns = [{"role": turn["role"], "content": turn["content"]} for turn in history]
+        return {"message": message, "history": turns, **{k: v for k, v in options.items() if v is not None}}
+
+    def health(self) -> dict:
+        response = self._http.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+    def chat(self, message: str, history: list[dict[str, str]], **options) -> tuple[str, list[str], int]:
+        """Return (answer, sources, num_chunks), like generate_chat_response()."""
+        response = self._http.post("/v1/chat", json=self._payload(message, history, **options))
+        response.raise_for_status()
+        data = response.json()
+        return data["answer"], data["sources"], data["num_chunks"]
+
+    def stream_chat(self, message: str, history: list[dict[str, str]], **options) -> RemoteChatStream:
+        """Return a stream, like stream_chat_response()."""
+        return RemoteChatStream(self, self._payload(message, history, **options))
+
+    def retrieve(self, message: str, **options) -> list[dict[str, str]]:
+        response = self._http.post("/v1/retrieve", json=self._payload(message, [], **options))
+        response.raise_for_status()
+        return response.json()["chunks"]
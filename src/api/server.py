@@ -0,0 +1,175 @@
+"""Headless HTTP API exposing the chat pipeline.
+
+Endpoints:
+    GET  /health           — liveness plus indexed chunk count
+    POST /v1/chat          — full answer as JSON
+    POST /v1/chat/stream   — answer as server-sent events (``token`` … ``done``)
+    POST /v1/retrieve      — retrieved chunks only, no generation
+
+Run with several worker processes (each preloads its own clients):
+    python src/api/server.py --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+_SRC_DIR = Path(__file__).resolve().parents[1]
+if str(_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(_SRC_DIR))
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from config import API_HOST, API_PORT, API_WORKERS
+from generation.chain import (
+    agenerate_chat_response,
+    aretrieve_documents,
+    astream_chat_response,
+    watch_runtime_settings,
+)
+from model_backend import aclose_chat_models, warm_up_models
+from retrieval.vectorstore import warm_vectorstore
+from runtime_settings import load_runtime_settings
+
+
+class ChatRequest(BaseModel):
+    """Chat request; omitted retrieval options fall back to the runtime settings."""
+
+    message: str
+    history: list[dict[str, str]] = Field(default_factory=list)
+    top_k: int | None = None
+    auto_top_k: bool | None = None
+    relevance_threshold: float | None = None
+    retrieval_mode: str | None = None
+    rerank: bool | None = None
+
+
+class ChatResponse(BaseModel):
+    answer: str
+    sources: list[str]
+    num_chunks: int
+
+
+class RetrievedChunk(BaseModel):
+    source: str
+    content: str
+
+
+class RetrieveResponse(BaseModel):
+    chunks: list[RetrievedChunk]
+
+
+def _retrieval_options(request: ChatRequest) -> dict:
+    """Merge per-request overrides over the persisted runtime settings."""
+    settings = load_runtime_settings()
+    options = {
+        "top_k": settings["retrieval_top_k"],
+        "auto_top_k": settings["auto_top_k"],
+        "relevance_threshold": settings["relevance_threshold"],
+        "retrieval_mode": settings["retrieval_mode"],
+        "rerank": settings["rerank"],
+    }
+    for name in options:
+        value = getattr(request, name)
+        if value is not None:
+            options[name] = value
+    return options
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Open the shared vector store and load both models before serving traffic."""
+    unwatch_settings = watch_runtime_settings()
+    try:
+        await asyncio.to_thread(warm_vectorstore)
+    except Exception:
+        # /health reports the failure; requests retry the lazy open.
+        pass
+    try:
+        await asyncio.to_thread(warm_up_models)
+    except Exception:
+        # Ollama may still be starting; the first request loads the models instead.
+        pass
+    yield
+    unwatch_settings()
+    await aclose_chat_models()
+
+
+app = FastAPI(title="Automotive RAG Chat API", lifespan=_lifespan)
+
+
+@app.get("/health")
+async def health() -> dict:
+    try:
+        chunks = await asyncio.to_thread(warm_vectorstore)
+    except Exception as exc:
+        return {"status": "degraded", "error": str(exc)}
+    return {"status": "ok", "chunks": chunks}
+
+
+@app.post("/v1/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest) -> ChatResponse:
+    answer, sources, num_chunks = await agenerate_chat_response(
+        request.message,
+        request.history,
+        **_retrieval_options(request),
+    )
+    return ChatResponse(answer=answer, sources=sources, num_chunks=num_chunks)
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    stream = astream_chat_response(request.message, request.history, **_retrieval_options(request))
+
+    async def _events() -> AsyncIterator[str]:
+        # Starlette cancels this generator when the client disconnects,
+        # which closes the stream and aborts the model request.
+        async for text in stream:
+            yield _sse_event("token", {"text": text})
+        yield _sse_event(
+            "done",
+            {
+                "answer": stream.answer,
+                "sources": stream.sources,
+                "num_chunks": stream.num_chunks,
+                "trace": stream.trace.to_dict(),
+            },
+        )
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/v1/retrieve", response_model=RetrieveResponse)
+async def retrieve(request: ChatRequest) -> RetrieveResponse:
+    documents = await aretrieve_documents(request.message, **_retrieval_options(request))
+    return RetrieveResponse(
+        chunks=[
+            RetrievedChunk(source=document.metadata.get("source", "unknown"), content=document.page_content)
+            for document in documents
+        ]
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    args = parser.parse_args()
+    uvicorn.run("api.server:app", host=args.host, port=args.port, workers=args.workers, app_dir=str(_SRC_DIR))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,127 @@
 """Global configuration for the local chatbot prototype."""
 
+import os
 from pathlib import Path
 
 
+# "stub" swaps Ollama for deterministic offline models (benchmarks, CI).
+MODEL_BACKENDS = ("ollama", "stub")
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "ollama")
+
 BASE_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BASE_DIR / "data"
 KNOWLEDGE_BASE_DIR = DATA_DIR / "knowledge_base"
-VECTORSTORE_DIR = DATA_DIR / "vectorstore"
-ANALYTICS_DIR = DATA_DIR / "analytics"
+# Stub vectors are not comparable with real ones, so they get their own index,
+# and stub runs keep their logs and metrics out of the real admin dashboard.
+VECTORSTORE_DIR = DATA_DIR / ("vectorstore_stub" if MODEL_BACKEND == "stub" else "vectorstore")
+ANALYTICS_DIR = DATA_DIR / ("analytics_stub" if MODEL_BACKEND == "stub" else "analytics")
 ANALYTICS_DB_PATH = ANALYTICS_DIR / "chat_logs.db"
+CACHE_DIR = DATA_DIR / "cache"
 
 OLLAMA_CHAT_MODEL = "qwen2.5:3b"
 OLLAMA_EMBEDDING_MODEL = "all-minilm"
+OLLAMA_MAX_CONCURRENCY = 4
+# How long Ollama keeps both models resident after a request: a duration such
+# as "30m", or seconds ("-1" keeps them loaded until the server stops).
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+EMBEDDING_MODEL_NAME = "stub-hashing" if MODEL_BACKEND == "stub" else OLLAMA_EMBEDDING_MODEL
+STUB_EMBEDDING_SIZE = 384
+STUB_CHAT_TOKEN_DELAY_SECONDS = float(os.environ.get("STUB_CHAT_TOKEN_DELAY_SECONDS", "0"))
 
 CHROMA_COLLECTION_NAME = "knowledge_base_chunks"
 RETRIEVAL_TOP_K = 4
 RETRIEVAL_TOP_K_MAX = 30
 RELEVANCE_THRESHOLD = 0.1
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+RETRIEVAL_MODE = "dense"
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+HYBRID_CANDIDATE_MULTIPLIER = 2
+LEXICAL_RELATIVE_THRESHOLD = 0.5
+# Dense search backend: "chroma" (HNSW inside Chroma) or "flat" (exact scan of
+# a memory-mapped float32 matrix exported next to the Chroma store).
+VECTOR_INDEX_BACKENDS = ("chroma", "flat")
+VECTOR_INDEX_BACKEND = os.environ.get("VECTOR_INDEX_BACKEND", "chroma")
+# After another process refreshes the index, the old Chroma handle keeps
+# serving in-flight queries for this long before it is stopped.
+VECTORSTORE_RETIRE_GRACE_SECONDS = 60.0
+
+RERANK_ENABLED = False
+RERANK_CANDIDATE_MULTIPLIER = 3
+RERANK_DENSE_WEIGHT = 0.7
+RERANK_MIN_GAP = 0.05
+RERANK_CACHE_MAX_ENTRIES = 4096
+# Optional sentence-transformers cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2".
+RERANK_CROSS_ENCODER_MODEL = os.environ.get("RERANK_CROSS_ENCODER_MODEL", "")
 CHUNK_SIZE = 300
 CHUNK_OVERLAP = 50
 
+CONTEXT_TOKEN_BUDGET = 1200
+CONTEXT_DUPLICATE_THRESHOLD = 0.8
+CONTEXT_MIN_MERGE_OVERLAP = 20
+
+LOADER_MAX_WORKERS = 4
+LOADER_MMAP_THRESHOLD_BYTES = 8 * 1024 * 1024
+LOADER_SEGMENT_BYTES = 1024 * 1024
+
+INGEST_BATCH_SIZE = 64
+INGEST_MAX_WORKERS = 4
+INGEST_MAX_RETRIES = 3
+
 MAX_INPUT_CHARS = 500
+# Answer small talk, crisis, injection and off-topic messages from templates
+# (generation/router.py) instead of running retrieval and the chat model.
+ROUTER_ENABLED = True
 MAX_HISTORY_MESSAGES = 8
+HISTORY_TOKEN_BUDGET = 600
+HISTORY_MESSAGE_MAX_TOKENS = 200
+CONTEXT_REUSE_MAX_ENTRIES = 256
+CONTEXT_REUSE_SIMILARITY_THRESHOLD = 0.9
+
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 10000
+QUERY_EMBEDDING_CACHE_SAVE_INTERVAL_SECONDS = 30.0
+
+ANSWER_CACHE_MAX_ENTRIES = 256
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+
+METRICS_FLUSH_INTERVAL_SECONDS = 5.0
+
+# How often each process checks runtime_settings.json for a new version.
+RUNTIME_SETTINGS_WATCH_INTERVAL_SECONDS = 0.5
+
+SUMMARY_BATCH_TOKENS = 1500
+SUMMARY_QUERY_MAX_CHARS = 300
+# One slot below the model concurrency: the scheduler keeps that one for chat.
+SUMMARY_MAX_WORKERS = max(1, OLLAMA_MAX_CONCURRENCY - 1)
+
+# Shared LLM scheduler: at most OLLAMA_MAX_CONCURRENCY model calls run at once,
+# chat is served before background work, background work leaves one slot
+# free for chat (when there is more than one), and a request is shed with the
+# fallback answer when this many requests of its priority or higher wait.
+LLM_MAX_QUEUE_DEPTH = 16
+# Chat deadline covers the slot wait and generation; background only the wait.
+LLM_CHAT_DEADLINE_SECONDS = 120.0
+LLM_BACKGROUND_DEADLINE_SECONDS = 600.0
+# Slots are shared by every local process (chat app, admin app, API workers)
+# through this SQLite table; waiters in other processes re-check this often.
+LLM_SCHEDULER_DB_PATH = CACHE_DIR / ("llm_scheduler_stub.db" if MODEL_BACKEND == "stub" else "llm_scheduler.db")
+LLM_SCHEDULER_POLL_SECONDS = 0.05
+
+CLUSTER_SIMILARITY_THRESHOLD = 0.75
+CLUSTER_BATCH_SIZE = 256
+
+LOG_QUEUE_MAX_SIZE = 10000
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL_SECONDS = 0.5
+LOG_ENQUEUE_TIMEOUT_SECONDS = 0.05
+
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_WORKERS = 2
+API_TIMEOUT_SECONDS = 120.0
+# When set (e.g. "http://127.0.0.1:8000"), the Streamlit apps call the HTTP API
+# instead of running the pipeline in-process.
+CHAT_API_URL = os.environ.get("CHAT_API_URL", "")
@@ -0,0 +1,121 @@
+"""Semantic answer cache keyed on query embeddings."""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass(frozen=True)
+class CachedAnswer:
+    """A previously generated answer with its retrieval metadata."""
+
+    answer: str
+    sources: list[str]
+    num_chunks: int
+
+
+@dataclass
+class _Entry:
+    cached: CachedAnswer
+    fingerprint: tuple
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """Bounded LRU cache that matches near-duplicate questions by cosine similarity.
+
+    Embeddings are kept L2-normalised in a preallocated float32 matrix, one
+    row per slot, so a lookup is a single matrix-vector product. Entries
+    expire after ``ttl_seconds``. Each entry only matches lookups with the
+    fingerprint (index version + runtime settings) it was stored under;
+    entries of an outdated fingerprint age out through LRU eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ) -> None:
+        self._max_entries = max(1, max_entries)
+        self._ttl_seconds = ttl_seconds
+        self._similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._vectors: np.ndarray | None = None
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [slot for slot, entry in self._entries.items() if now - entry.created_at > self._ttl_seconds]
+        for slot in expired:
+            del self._entries[slot]
+
+    def lookup(self, embedding: list[float], fingerprint: tuple) -> CachedAnswer | None:
+        """Return the cached answer of the most similar question, if close enough."""
+        query = _normalize(embedding)
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                return None
+            matching = [slot for slot, entry in self._entries.items() if entry.fingerprint == fingerprint]
+            if not matching:
+                return None
+
+            slots = np.asarray(matching, dtype=np.int64)
+            similarities = self._vectors[slots] @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self._similarity_threshold:
+                return None
+
+            slot = int(slots[best])
+            self._entries.move_to_end(slot)
+            return self._entries[slot].cached
+
+    def store(self, embedding: list[float], fingerprint: tuple, cached: CachedAnswer) -> None:
+        """Insert an answer, evicting the least recently used entry when full."""
+        vector = _normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self._max_entries, vector.shape[0]), dtype=np.float32)
+                self._entries.clear()
+
+            if len(self._entries) >= self._max_entries:
+                self._evict_expired(time.monotonic())
+            if len(self._entries) >= self._max_entries:
+                slot, _ = self._entries.popitem(last=False)
+            else:
+                used = set(self._entries)
+                slot = next(index for index in range(self._max_entries) if index not in used)
+
+            self._vectors[slot] = vector
+            self._entries[slot] = _Entry(cached=cached, fingerprint=fingerprint, created_at=time.monotonic())
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+_ANSWER_CACHE = SemanticAnswerCache()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """Return the process-wide answer cache."""
+    return _ANSWER_CACHE
@@ -1,30 +1,123 @@
-"""RAG generation pipeline with Chroma retrieval."""
+"""RAG generation pipeline with Chroma retrieval.
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
+The pipeline is asyncio-native (``astream_chat_response`` /
+``agenerate_chat_response``); the sync ``stream_chat_response`` and
+``generate_chat_response`` are thin wrappers that drive it on one shared
+background event loop.
+"""
 
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+from contextlib import aclosing
+from typing import Any, TypeVar
+
+from langchain_core.documents import Document
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from analytics.metrics import increment_counter
+from analytics.rollups import normalize_query
+from analytics.tracing import RequestTrace
 from config import (
-    OLLAMA_CHAT_MODEL,
+    LLM_CHAT_DEADLINE_SECONDS,
     RELEVANCE_THRESHOLD,
+    RERANK_ENABLED,
+    RETRIEVAL_MODE,
     RETRIEVAL_TOP_K,
     RETRIEVAL_TOP_K_MAX,
+    ROUTER_ENABLED,
 )
-from generation.guardrails import inspect_output, safe_fallback_response, sanitize_user_input
-from generation.prompts import build_user_prompt, get_system_prompt
-from retrieval.vectorstore import query_vectorstore, query_vectorstore_adaptive
+from generation.answer_cache import CachedAnswer, get_answer_cache
+from generation.coalescing import FlightResult, InFlight, get_request_coalescer
+from generation.context_packer import pack_context
+from generation.guardrails import StreamingOutputInspector, safe_fallback_response, sanitize_user_input
+from generation.history import (
+    get_context_cache,
+    is_follow_up,
+    previous_standalone_query,
+    select_history_window,
+    standalone_query,
+    to_chat_messages,
+)
+from generation.prompts import build_user_prompt, estimate_tokens, get_system_prompt
+from generation.router import NO_CONTEXT_RESPONSE, NO_CONTEXT_ROUTE, RAG_ROUTE, record_route, route_query
+from generation.scheduler import DeadlineExceeded, LLMUnavailable, Priority, get_llm_scheduler
+from model_backend import get_chat_model
+from retrieval.vectorstore import embed_query, get_index_version, query_vectorstore, query_vectorstore_adaptive
+from runtime_settings import subscribe_runtime_settings
+
+
+LLM_ERROR_MESSAGE = "LLM call failed. Please ensure Ollama is running and the model is available."
+
+
+def _drop_settings_dependent_caches(_settings: dict) -> None:
+    """Cached answers and reused contexts were built with the old settings."""
+    get_answer_cache().clear()
+    get_context_cache().clear()
 
 
+def watch_runtime_settings() -> Callable[[], None]:
+    """Clear settings-dependent caches whenever the runtime settings change.
 
-def _invoke_chat_model(*, system_prompt: str, user_prompt: str) -> str:
-    """Invoke chat model and return guarded text content."""
-    model = ChatOllama(model=OLLAMA_CHAT_MODEL, temperature=0.2)
+    Starts the settings watcher thread, so it is called from app and server
+    start-up rather than on import. Returns an unsubscribe function.
+    """
+    return subscribe_runtime_settings(_drop_settings_dependent_caches)
+
+
+async def _astream_chat_model(
+    *,
+    system_prompt: str,
+    user_prompt: str,
+    inspector: StreamingOutputInspector,
+    trace: RequestTrace,
+    history_messages: list[BaseMessage] | None = None,
+    deadline: float | None = None,
+) -> AsyncIterator[str]:
+    """Stream guarded text chunks from the chat model.
+
+    Runs in a chat-priority slot of the shared LLM scheduler. Stops reading
+    from the model as soon as the inspector trips. Records time-to-first-token
+    and the server-reported token counts on ``trace``.
+
+    Raises:
+        LLMUnavailable: the request was shed, or ``deadline`` passed while it
+            waited for a slot or generated.
+    """
+    model = get_chat_model(temperature=0.2)
     messages = [
         SystemMessage(content=system_prompt),
+        *(history_messages or []),
         HumanMessage(content=user_prompt),
     ]
-    result = model.invoke(messages)
-    content = result.content if isinstance(result.content, str) else str(result.content)
-    return inspect_output(content)
+    scheduler = get_llm_scheduler()
+    async with scheduler.aslot(Priority.CHAT, deadline=deadline), aclosing(model.astream(messages)) as chunks:
+        chunk_iterator = aiter(chunks)
+        while True:
+            try:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                chunk = await asyncio.wait_for(anext(chunk_iterator), timeout)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                scheduler.record_deadline_exceeded(Priority.CHAT)
+                raise DeadlineExceeded("model response exceeded the request deadline") from None
+            if chunk.usage_metadata:
+                trace.prompt_tokens = chunk.usage_metadata.get("input_tokens", trace.prompt_tokens)
+                trace.completion_tokens = chunk.usage_metadata.get("output_tokens", trace.completion_tokens)
+            content = chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+            if content and "ttft" not in trace.stages_ms:
+                trace.mark_since_start("ttft")
+            safe_text = inspector.feed(content)
+            if safe_text:
+                yield safe_text
+            if inspector.tripped:
+                return
+
+    remainder = inspector.finish()
+    if remainder:
+        yield remainder
 
 
 def _format_context_for_prompt(retrieved_documents: list) -> str:
@@ -46,50 +139,496 @@ def _extract_sources(retrieved_documents: list) -> list[str]:
     return unique_sources
 
 
-def generate_chat_response(
+def _retrieve_documents(
+    sanitized_input: str,
+    *,
+    top_k: int | None,
+    auto_top_k: bool,
+    relevance_threshold: float,
+    retrieval_mode: str,
+    rerank: bool = False,
+    query_embedding: list[float] | None = None,
+) -> list[Document]:
+    """Retrieve context chunks using manual or adaptive Top-K."""
+    if auto_top_k:
+        return query_vectorstore_adaptive(
+            sanitized_input,
+            max_top_k=RETRIEVAL_TOP_K_MAX,
+            relevance_threshold=relevance_threshold,
+            query_embedding=query_embedding,
+            mode=retrieval_mode,
+            use_rerank=rerank,
+        )
+    retrieval_k = top_k if top_k is not None else RETRIEVAL_TOP_K
+    return query_vectorstore(
+        sanitized_input,
+        top_k=retrieval_k,
+        query_embedding=query_embedding,
+        mode=retrieval_mode,
+        use_rerank=rerank,
+    )
+
+
+async def aretrieve_documents(
+    user_text: str,
+    top_k: int | None = None,
+    auto_top_k: bool = False,
+    relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
+) -> list[Document]:
+    """Run only the retrieval half of the pipeline (sanitize + search)."""
+    sanitized_input = sanitize_user_input(user_text)
+    if not sanitized_input:
+        return []
+    return await asyncio.to_thread(
+        _retrieve_documents,
+        sanitized_input,
+        top_k=top_k,
+        auto_top_k=auto_top_k,
+        relevance_threshold=relevance_threshold,
+        retrieval_mode=retrieval_mode,
+        rerank=rerank,
+    )
+
+
+class AsyncChatStream:
+    """Async iterable of answer text chunks for one chat turn.
+
+    Iterating runs the pipeline and yields text as the model produces it.
+    Once iteration completes, ``answer`` holds the final guarded answer
+    (which replaces the streamed text if the output inspector tripped),
+    and ``sources`` / ``num_chunks`` describe the retrieved context.
+    Closing the iterator early (or cancelling the task driving it) aborts
+    the model request. ``trace`` holds per-stage timings for the request.
+
+    A bounded window of ``history`` is sent to the model. Follow-up
+    questions are retrieved with a heuristically condensed standalone
+    query, skip the answer cache (their answer depends on the
+    conversation), and reuse the previous turn's chunks when the topic has
+    not changed.
+
+    Small talk, crisis, injection and off-topic messages are answered from
+    templates by the intent router, and a standalone question with no
+    retrieved context gets the no-information reply; neither calls the
+    model. ``route`` names the path the request took.
+
+    Concurrent requests with the same normalized question, history window
+    and settings share one computation: the first runs the pipeline and the
+    others replay its stream (``coalesced`` is then True).
+    """
+
+    def __init__(
+        self,
+        user_text: str,
+        *,
+        history: list[dict[str, str]] | None = None,
+        top_k: int | None,
+        auto_top_k: bool,
+        relevance_threshold: float,
+        retrieval_mode: str,
+        rerank: bool = False,
+        use_cache: bool = True,
+    ) -> None:
+        self._user_text = user_text
+        self._history = history or []
+        self._top_k = top_k
+        self._auto_top_k = auto_top_k
+        self._relevance_threshold = relevance_threshold
+        self._retrieval_mode = retrieval_mode
+        self._rerank = rerank
+        self._use_cache = use_cache
+        self.answer = ""
+        self.sources: list[str] = []
+        self.num_chunks = 0
+        self.cache_hit = False
+        self.route = RAG_ROUTE
+        self.coalesced = False
+        self.shed = False
+        self.trace = RequestTrace()
+
+    def _cache_fingerprint(self) -> tuple:
+        """Cached answers are only valid for the same index and runtime settings."""
+        return (
+            get_index_version(),
+            self._top_k,
+            self._auto_top_k,
+            self._relevance_threshold,
+            self._retrieval_mode,
+            self._rerank,
+        )
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        trace = self.trace
+        try:
+            async with aclosing(self._run(trace)) as texts:
+                async for text in texts:
+                    yield text
+        finally:
+            trace.finish()
+        # Only completed requests count, so the RAG mean is not skewed by failures.
+        if not (self.cache_hit or self.coalesced or self.shed) and self.answer != LLM_ERROR_MESSAGE:
+            record_route(self.route, trace.stages_ms["total"])
+
+    async def _run(self, trace: RequestTrace) -> AsyncIterator[str]:
+        with trace.stage("sanitize"):
+            sanitized_input = sanitize_user_input(self._user_text)
+        if not sanitized_input:
+            self.answer = safe_fallback_response()
+            yield self.answer
+            return
+
+        route = route_query(self._user_text) if ROUTER_ENABLED else None
+        if route is not None and route.response is not None:
+            self.route = route.name
+            self.answer = route.response
+            yield self.answer
+            return
+
+        window = select_history_window(self._history, self._user_text)
+        if not self._use_cache:
+            async with aclosing(self._run_pipeline(trace, sanitized_input, window)) as texts:
+                async for text in texts:
+                    yield text
+            return
+
+        try:
+            key = (
+                normalize_query(sanitized_input),
+                tuple((turn["role"], turn["content"]) for turn in window),
+                await asyncio.to_thread(self._cache_fingerprint),
+            )
+        except Exception:
+            # Without an index version the cache key is unknown; fail the turn visibly.
+            increment_counter("answer_cache.fingerprint_failed")
+            self.answer = LLM_ERROR_MESSAGE
+            yield self.answer
+            return
+
+        coalescer = get_request_coalescer()
+        while True:
+            flight, leader = coalescer.join(key)
+            if leader:
+                flight.start(self._lead(flight, key, trace, sanitized_input, window))
+            received = False
+            try:
+                async with aclosing(flight.follow()) as texts:
+                    async for text in texts:
+                        received = True
+                        yield text
+            finally:
+                # Leaving never stops the computation while others still read it.
+                flight.leave()
+            result = flight.result
+            if result is not None:
+                if not leader:
+                    increment_counter("coalescing.collapsed")
+                    self.coalesced = True
+                    self.answer, self.sources, self.num_chunks = result.answer, list(result.sources), result.num_chunks
+                    self.route, self.cache_hit = result.route, result.cache_hit
+                return
+            increment_counter("coalescing.abandoned")
+            if received:
+                # The computation stopped mid-answer; a fresh run would repeat streamed text.
+                self.answer = LLM_ERROR_MESSAGE
+                return
+
+    async def _lead(
+        self,
+        flight: InFlight,
+        key: tuple,
+        trace: RequestTrace,
+        sanitized_input: str,
+        window: list[dict[str, str]],
+    ) -> None:
+        """Run the pipeline as the flight's task and publish what it streams."""
+        result = None
+        try:
+            async with aclosing(self._run_pipeline(trace, sanitized_input, window)) as texts:
+                async for text in texts:
+                    flight.publish(text)
+            result = FlightResult(
+                answer=self.answer,
+                sources=list(self.sources),
+                num_chunks=self.num_chunks,
+                route=self.route,
+                cache_hit=self.cache_hit,
+            )
+        finally:
+            get_request_coalescer().release(key, flight, result)
+
+    async def _run_pipeline(
+        self,
+        trace: RequestTrace,
+        sanitized_input: str,
+        window: list[dict[str, str]],
+    ) -> AsyncIterator[str]:
+        follow_up = bool(window) and is_follow_up(sanitized_input)
+        retrieval_query = standalone_query(sanitized_input, window) if follow_up else sanitized_input
+        use_answer_cache = self._use_cache and not follow_up
+
+        try:
+            # Chroma's persistent client and the shared embeddings client are
+            # synchronous, so they run on worker threads.
+            answer_cache = get_answer_cache()
+            context_cache = get_context_cache()
+            cache_fingerprint = await asyncio.to_thread(self._cache_fingerprint)
+            with trace.stage("embed"):
+                query_embedding = await asyncio.to_thread(embed_query, retrieval_query)
+            cached = answer_cache.lookup(query_embedding, cache_fingerprint) if use_answer_cache else None
+            if cached is not None:
+                increment_counter("answer_cache.hits")
+                self.cache_hit = trace.cache_hit = True
+                self.answer, self.sources, self.num_chunks = cached.answer, list(cached.sources), cached.num_chunks
+                trace.chunks = cached.num_chunks
+                yield self.answer
+                return
+            if use_answer_cache:
+                increment_counter("answer_cache.misses")
+
+            with trace.stage("search"):
+                previous_query = previous_standalone_query(window) if follow_up else None
+                retrieved_documents = (
+                    context_cache.lookup(previous_query, query_embedding, cache_fingerprint)
+                    if previous_query is not None
+                    else None
+                )
+                if retrieved_documents is not None:
+                    increment_counter("context_reuse.hits")
+                else:
+                    retrieved_documents = await asyncio.to_thread(
+                        _retrieve_documents,
+                        retrieval_query,
+                        top_k=self._top_k,
+                        auto_top_k=self._auto_top_k,
+                        relevance_threshold=self._relevance_threshold,
+                        retrieval_mode=self._retrieval_mode,
+                        rerank=self._rerank,
+                        query_embedding=query_embedding,
+                    )
+                context_cache.store(retrieval_query, query_embedding, retrieved_documents, cache_fingerprint)
+            trace.chunks = len(retrieved_documents)
+            # Follow-ups may still be answerable from the conversation itself.
+            if not retrieved_documents and not follow_up:
+                self.route = NO_CONTEXT_ROUTE
+                self.answer = NO_CONTEXT_RESPONSE
+                yield self.answer
+                return
+            with trace.stage("prompt"):
+                system_prompt = get_system_prompt()
+                packed = pack_context(retrieved_documents)
+                context = _format_context_for_prompt(packed.documents)
+                user_prompt = build_user_prompt(question=sanitized_input, context=context)
+                history_messages = to_chat_messages(window)
+            trace.context_tokens_saved = packed.tokens_saved
+            if packed.tokens_saved:
+                increment_counter("context_packer.tokens_saved", packed.tokens_saved)
+            if packed.tokens_over_budget:
+                increment_counter("context_packer.tokens_over_budget", packed.tokens_over_budget)
+            # Replaced by the server-reported counts when Ollama provides them.
+            trace.prompt_tokens = (
+                estimate_tokens(system_prompt)
+                + estimate_tokens(user_prompt)
+                + sum(estimate_tokens(turn["content"]) for turn in window)
+            )
+
+            inspector = StreamingOutputInspector()
+            model_stream = _astream_chat_model(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                inspector=inspector,
+                trace=trace,
+                history_messages=history_messages,
+                deadline=time.monotonic() + LLM_CHAT_DEADLINE_SECONDS,
+            )
+            with trace.stage("generation"):
+                async with aclosing(model_stream):
+                    async for text in model_stream:
+                        yield text
+            self.answer = inspector.text
+            if not trace.completion_tokens:
+                trace.completion_tokens = estimate_tokens(self.answer)
+            if retrieved_documents and not inspector.tripped:
+                self.sources = _extract_sources(retrieved_documents)
+                self.num_chunks = len(retrieved_documents)
+            if use_answer_cache and not inspector.tripped:
+                answer_cache.store(
+                    query_embedding,
+                    cache_fingerprint,
+                    CachedAnswer(answer=self.answer, sources=list(self.sources), num_chunks=self.num_chunks),
+                )
+        except LLMUnavailable:
+            self.shed = True
+            self.answer = safe_fallback_response()
+            self.sources = []
+            self.num_chunks = 0
+        except Exception:
+            self.answer = LLM_ERROR_MESSAGE
+            self.sources = []
+            self.num_chunks = 0
+
+
+T = TypeVar("T")
+
+_LOOP_LOCK = threading.Lock()
+_BACKGROUND_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """Return the long-lived event loop that runs the pipeline for sync callers.
+
+    One loop per process means one pooled async model client, reused by
+    every Streamlit session instead of rebuilt per request.
+    """
+    global _BACKGROUND_LOOP
+    with _LOOP_LOCK:
+        if _BACKGROUND_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="chat-event-loop", daemon=True).start()
+            _BACKGROUND_LOOP = loop
+        return _BACKGROUND_LOOP
+
+
+def _run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Run ``coroutine`` on the background loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coroutine, _background_loop()).result()
+
+
+class ChatStream:
+    """Sync iterable over an AsyncChatStream, driven on the shared background loop.
+
+    Exposes the same ``answer`` / ``sources`` / ``num_chunks`` attributes.
+    If the consumer stops iterating early (e.g. the Streamlit session goes
+    away), the underlying async stream is closed and the model request is
+    aborted.
+    """
+
+    def __init__(self, async_stream: AsyncChatStream) -> None:
+        self._async_stream = async_stream
+
+    def __getattr__(self, name: str):
+        return getattr(self._async_stream, name)
+
+    def __iter__(self) -> Iterator[str]:
+        iterator = self._async_stream.__aiter__()
+        try:
+            while True:
+                try:
+                    text = _run_sync(iterator.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield text
+        finally:
+            _run_sync(iterator.aclose())
+
+
+def astream_chat_response(
     user_text: str,
     history: list[dict[str, str]],
     top_k: int | None = None,
     auto_top_k: bool = False,
     relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
+    use_cache: bool = True,
+) -> AsyncChatStream:
+    """Return an AsyncChatStream that yields the RAG answer incrementally."""
+    return AsyncChatStream(
+        user_text,
+        history=history,
+        top_k=top_k,
+        auto_top_k=auto_top_k,
+        relevance_threshold=relevance_threshold,
+        retrieval_mode=retrieval_mode,
+        rerank=rerank,
+        use_cache=use_cache,
+    )
+
+
+async def agenerate_chat_response(
+    user_text: str,
+    history: list[dict[str, str]],
+    top_k: int | None = None,
+    auto_top_k: bool = False,
+    relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
+    use_cache: bool = True,
 ) -> tuple[str, list[str], int]:
-    """Generate a RAG answer from local Ollama model and retrieved context.
+    """Generate a RAG answer asynchronously.
+
+    Cancelling the awaiting task aborts retrieval waits and the model request.
 
     Returns:
         (answer, unique_sources, num_chunks_retrieved)
     """
-    _ = history
-    sanitized_input = sanitize_user_input(user_text)
-    if not sanitized_input:
-        return safe_fallback_response(), [], 0
+    stream = astream_chat_response(
+        user_text,
+        history,
+        top_k=top_k,
+        auto_top_k=auto_top_k,
+        relevance_threshold=relevance_threshold,
+        retrieval_mode=retrieval_mode,
+        rerank=rerank,
+        use_cache=use_cache,
+    )
+    async for _ in stream:
+        pass
+    return stream.answer, stream.sources, stream.num_chunks
+
+
+def stream_chat_response(
+    user_text: str,
+    history: list[dict[str, str]],
+    top_k: int | None = None,
+    auto_top_k: bool = False,
+    relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
+    use_cache: bool = True,
+) -> ChatStream:
+    """Return a ChatStream that yields the RAG answer incrementally."""
+    return ChatStream(
+        astream_chat_response(
+            user_text,
+            history,
+            top_k=top_k,
+            auto_top_k=auto_top_k,
+            relevance_threshold=relevance_threshold,
+            retrieval_mode=retrieval_mode,
+            rerank=rerank,
+            use_cache=use_cache,
+        )
+    )
 
-    retrieval_k = top_k if top_k is not None else RETRIEVAL_TOP_K
-    if auto_top_k:
-        retrieval_k = RETRIEVAL_TOP_K_MAX
-    try:
-        if auto_top_k:
-            retrieved_documents = query_vectorstore_adaptive(
-                sanitized_input,
-                max_top_k=retrieval_k,
-                relevance_threshold=relevance_threshold,
-            )
-        else:
-            retrieved_documents = query_vectorstore(sanitized_input, top_k=retrieval_k)
-
-        if not retrieved_documents:
-            no_context_prompt = build_user_prompt(question=sanitized_input, context="")
-            no_context_answer = _invoke_chat_model(
-                system_prompt=get_system_prompt(),
-                user_prompt=no_context_prompt,
-            )
-            return no_context_answer or safe_fallback_response(), [], 0
 
-        context = _format_context_for_prompt(retrieved_documents)
-        user_prompt = build_user_prompt(question=sanitized_input, context=context)
-        answer = _invoke_chat_model(
-            system_prompt=get_system_prompt(),
-            user_prompt=user_prompt,
+def generate_chat_response(
+    user_text: str,
+    history: list[dict[str, str]],
+    top_k: int | None = None,
+    auto_top_k: bool = False,
+    relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
+    use_cache: bool = True,
+) -> tuple[str, list[str], int]:
+    """Generate a RAG answer from local Ollama model and retrieved context.
+
+    Thin sync wrapper around agenerate_chat_response(), run on the shared
+    background loop.
+
+    Returns:
+        (answer, unique_sources, num_chunks_retrieved)
+    """
+    return _run_sync(
+        agenerate_chat_response(
+            user_text,
+            history,
+            top_k=top_k,
+            auto_top_k=auto_top_k,
+            relevance_threshold=relevance_threshold,
+            retrieval_mode=retrieval_mode,
+            rerank=rerank,
+            use_cache=use_cache,
         )
-        return answer, _extract_sources(retrieved_documents), len(retrieved_documents)
-    except Exception:
-        return "LLM call failed. Please ensure Ollama is running and the model is available.", [], 0
+    )
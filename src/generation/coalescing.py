@@ -0,0 +1,153 @@
+"""Single-flight coalescing of identical concurrent chat requests."""
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Coroutine
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class FlightResult:
+    """Final state of a finished computation, copied onto every follower."""
+
+    answer: str
+    sources: list[str]
+    num_chunks: int
+    route: str
+    cache_hit: bool
+
+
+class InFlight:
+    """One running computation whose streamed text is replayed to its consumers.
+
+    The computation runs as a task owned by the flight, detached from every
+    request, so a consumer that disconnects or is cancelled only stops
+    reading. The task is cancelled once no consumer is left. Consumers may
+    live on other threads and event loops (the API server's loop, or the
+    background loop behind the sync wrappers), so the buffer is guarded by a
+    thread lock and waiters are woken with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._chunks: list[str] = []
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self._consumers = 0
+        self._task: asyncio.Task | None = None
+        self._done = False
+        self.result: FlightResult | None = None
+
+    @property
+    def consumers(self) -> int:
+        with self._lock:
+            return self._consumers
+
+    def _add_consumer(self) -> None:
+        with self._lock:
+            self._consumers += 1
+
+    def start(self, computation: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run ``computation`` as the flight's task on the running loop."""
+        task = asyncio.get_running_loop().create_task(computation)
+        with self._lock:
+            self._task = task
+            cancel = self._consumers == 0
+        if cancel:
+            task.cancel()
+        return task
+
+    def leave(self) -> None:
+        """Stop consuming; the last consumer to leave cancels the computation."""
+        with self._lock:
+            self._consumers -= 1
+            task = self._task if self._consumers == 0 and not self._done else None
+        if task is not None:
+            try:
+                task.get_loop().call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # The task's loop is closed, so the task is gone already.
+                pass
+
+    def _wake_locked(self) -> None:
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The follower's loop is already closed; nothing to wake.
+                pass
+
+    def publish(self, text: str) -> None:
+        """Append a streamed chunk and wake followers."""
+        with self._lock:
+            self._chunks.append(text)
+            self._wake_locked()
+
+    def finish(self, result: FlightResult | None) -> None:
+        """Mark the computation finished; ``None`` means it failed or was cancelled."""
+        with self._lock:
+            self.result = result
+            self._done = True
+            self._wake_locked()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Yield every chunk published so far and then live ones until finished."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.append(waiter)
+        position = 0
+        try:
+            while True:
+                waiter[1].clear()
+                with self._lock:
+                    pending = self._chunks[position:]
+                    done = self._done
+                position += len(pending)
+                for text in pending:
+                    yield text
+                if done:
+                    return
+                await waiter[1].wait()
+        finally:
+            with self._lock:
+                self._waiters.remove(waiter)
+
+
+class RequestCoalescer:
+    """Maps a request key to its in-flight computation, if any."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, InFlight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: tuple) -> tuple[InFlight, bool]:
+        """Register a consumer of the flight for ``key``.
+
+        Returns the flight and whether the caller must start its computation.
+        Every caller must call ``flight.leave()`` when it stops reading.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = InFlight()
+            flight._add_consumer()
+            return flight, leader
+
+    def release(self, key: tuple, flight: InFlight, result: FlightResult | None) -> None:
+        """Publish the leader's result; later requests start a new computation."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish(result)
+
+
+_COALESCER = RequestCoalescer()
+
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Return the process-wide request coalescer."""
+    return _COALESCER
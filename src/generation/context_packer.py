@@ -0,0 +1,136 @@
+"""Pack retrieved chunks into a token-budgeted prompt context."""
+
+import re
+from dataclasses import dataclass, field
+
+from langchain_core.documents import Document
+
+from config import CONTEXT_DUPLICATE_THRESHOLD, CONTEXT_MIN_MERGE_OVERLAP, CONTEXT_TOKEN_BUDGET
+from generation.prompts import estimate_tokens
+
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class PackedContext:
+    """Chunks selected for the prompt and what packing saved or cut.
+
+    ``tokens_saved`` counts only redundant text removed by merges and
+    duplicate drops; ``tokens_over_budget`` counts text left out because it
+    did not fit the budget.
+    """
+
+    documents: list[Document] = field(default_factory=list)
+    tokens: int = 0
+    tokens_saved: int = 0
+    tokens_over_budget: int = 0
+    merged: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+
+@dataclass
+class _Slot:
+    source: str
+    text: str
+    metadata: dict
+    words: set[str]
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _containment(words: set[str], selected: set[str]) -> float:
+    """Share of ``words`` already present in a selected chunk."""
+    if not words:
+        return 1.0
+    return len(words & selected) / len(words)
+
+
+def _merge(slot: _Slot, text: str, min_overlap: int) -> str | None:
+    """Splice ``text`` onto a same-source slot when they overlap; None if they do not."""
+    if text in slot.text:
+        return slot.text
+    if slot.text in text:
+        return text
+    tail = _overlap(slot.text, text, min_overlap)
+    if tail:
+        return slot.text + text[tail:]
+    head = _overlap(text, slot.text, min_overlap)
+    if head:
+        return text + slot.text[head:]
+    return None
+
+
+def pack_context(
+    documents: list[Document],
+    *,
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    duplicate_threshold: float = CONTEXT_DUPLICATE_THRESHOLD,
+    min_overlap: int = CONTEXT_MIN_MERGE_OVERLAP,
+) -> PackedContext:
+    """Merge overlapping neighbours, drop near-duplicates and fill ``token_budget``.
+
+    Documents are taken in the given (relevance) order. A chunk from the same
+    source that overlaps an already selected chunk by at least
+    ``min_overlap`` characters is spliced onto it; a chunk whose words are
+    at least ``duplicate_threshold`` contained in a selected chunk (from any
+    source) is dropped. Chunks that no longer fit the budget are skipped so
+    that smaller, less relevant ones can still fill the remaining space.
+    """
+    packed = PackedContext()
+    slots: list[_Slot] = []
+    used = 0
+
+    for document in documents:
+        text = document.page_content.strip()
+        if not text:
+            continue
+        source = document.metadata.get("source", "unknown")
+        words = set(_WORD_PATTERN.findall(text.lower()))
+
+        merged = False
+        for slot in slots:
+            if slot.source != source:
+                continue
+            combined = _merge(slot, text, min_overlap)
+            if combined is None:
+                continue
+            extra = estimate_tokens(combined) - estimate_tokens(slot.text)
+            # The overlap with the selected chunk is redundant either way.
+            packed.tokens_saved += max(0, estimate_tokens(text) - extra)
+            if used + extra <= token_budget:
+                used += extra
+                slot.text = combined
+                slot.words |= words
+                packed.merged += 1
+            else:
+                packed.over_budget += 1
+                packed.tokens_over_budget += extra
+            merged = True
+            break
+        if merged:
+            continue
+
+        if any(text in slot.text or _containment(words, slot.words) >= duplicate_threshold for slot in slots):
+            packed.duplicates += 1
+            packed.tokens_saved += estimate_tokens(text)
+            continue
+
+        cost = estimate_tokens(text)
+        if used + cost > token_budget:
+            packed.over_budget += 1
+            packed.tokens_over_budget += cost
+            continue
+        used += cost
+        slots.append(_Slot(source=source, text=text, metadata=dict(document.metadata), words=words))
+
+    packed.documents = [Document(page_content=slot.text, metadata=slot.metadata) for slot in slots]
+    packed.tokens = used
+    return packed
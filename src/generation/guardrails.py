@@ -13,6 +13,8 @@ SUSPICIOUS_PATTERNS = [
     r"developer\s+message",
 ]
 
+OUTPUT_LEAK_PATTERNS = ["system prompt", "developer message"]
+
 
 def sanitize_user_input(user_text: str) -> str:
     """Trim length and redact common prompt-injection phrases."""
@@ -30,6 +32,54 @@ def safe_fallback_response() -> str:
 def inspect_output(output_text: str) -> str:
     """Replace suspicious model output with a safe fallback."""
     lower_output = output_text.lower()
-    if "system prompt" in lower_output or "developer message" in lower_output:
+    if any(pattern in lower_output for pattern in OUTPUT_LEAK_PATTERNS):
         return safe_fallback_response()
     return output_text.strip() or safe_fallback_response()
+
+
+class StreamingOutputInspector:
+    """Incremental counterpart of inspect_output for streamed model output.
+
+    The last few characters are held back until more text arrives, so a leak
+    phrase split across chunks is detected before any part of it is emitted.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._emitted = 0
+        self._holdback = max(len(pattern) for pattern in OUTPUT_LEAK_PATTERNS) - 1
+        self.tripped = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a streamed chunk and return the text that is safe to display."""
+        if self.tripped or not chunk:
+            return ""
+
+        self._text += chunk
+        window_start = max(0, len(self._text) - len(chunk) - self._holdback)
+        window = self._text[window_start:].lower()
+        if any(pattern in window for pattern in OUTPUT_LEAK_PATTERNS):
+            self.tripped = True
+            return ""
+
+        safe_end = len(self._text) - self._holdback
+        if safe_end <= self._emitted:
+            return ""
+        safe_text = self._text[self._emitted:safe_end]
+        self._emitted = safe_end
+        return safe_text
+
+    def finish(self) -> str:
+        """Release any held-back text once the stream has ended."""
+        if self.tripped:
+            return ""
+        remainder = self._text[self._emitted:]
+        self._emitted = len(self._text)
+        return remainder
+
+    @property
+    def text(self) -> str:
+        """Return the guarded full answer, as inspect_output would."""
+        if self.tripped:
+            return safe_fallback_response()
+        return self._text.strip() or safe_fallback_response()
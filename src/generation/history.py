@@ -0,0 +1,196 @@
+"""Conversation history: bounded prompt windows, standalone retrieval queries and context reuse."""
+
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from config import (
+    CONTEXT_REUSE_MAX_ENTRIES,
+    CONTEXT_REUSE_SIMILARITY_THRESHOLD,
+    HISTORY_MESSAGE_MAX_TOKENS,
+    HISTORY_TOKEN_BUDGET,
+    MAX_HISTORY_MESSAGES,
+    MAX_INPUT_CHARS,
+)
+from generation.guardrails import sanitize_user_input
+from generation.prompts import estimate_tokens
+
+
+FOLLOW_UP_PREFIXES = ("and ", "but ", "or ", "also ", "what about ", "how about ", "same for ", "what if ", "then ")
+FOLLOW_UP_MAX_WORDS = 4
+_CONNECTOR_PATTERN = re.compile(r"^(?:and|but|or|also|then|what about|how about|same for)\b[\s,]*", re.IGNORECASE)
+_REFERENCE_PATTERN = re.compile(r"\b(?:it|its|that|this|these|those|they|them|their|ones?)\b", re.IGNORECASE)
+# Fragments that lean on the previous question: "for EVs?", "how much?", "why?".
+_ELLIPSIS_PATTERN = re.compile(
+    r"(?:for|with|without|in|on|at|about|during|after|before|from|than)\b"
+    r"|(?:how\s+(?:much|many|long|often|far|soon)|why|when|where|which|who|what\s+else)\W*$",
+    re.IGNORECASE,
+)
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    return text if len(text) <= max_chars else text[: max_chars - 1].rstrip() + "…"
+
+
+def select_history_window(
+    history: list[dict[str, str]],
+    current_text: str,
+    *,
+    max_messages: int = MAX_HISTORY_MESSAGES,
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+) -> list[dict[str, str]]:
+    """Return the most recent turns that fit ``max_messages`` and ``token_budget``.
+
+    The current question is dropped if the caller already appended it to
+    ``history``. Long messages are clipped to HISTORY_MESSAGE_MAX_TOKENS and
+    user turns are sanitized like fresh input.
+    """
+    turns = [turn for turn in history if turn.get("role") in ("user", "assistant") and turn.get("content")]
+    if turns and turns[-1]["role"] == "user" and turns[-1]["content"].strip() == current_text.strip():
+        turns = turns[:-1]
+
+    window: list[dict[str, str]] = []
+    used = 0
+    for turn in reversed(turns[-max_messages:] if max_messages > 0 else []):
+        content = turn["content"] if turn["role"] == "assistant" else sanitize_user_input(turn["content"])
+        content = _clip(content, HISTORY_MESSAGE_MAX_TOKENS)
+        cost = estimate_tokens(content)
+        if used + cost > token_budget:
+            break
+        window.append({"role": turn["role"], "content": content})
+        used += cost
+    window.reverse()
+    # A window that opens with an assistant reply has lost its question.
+    while window and window[0]["role"] == "assistant":
+        window.pop(0)
+    return window
+
+
+def to_chat_messages(window: list[dict[str, str]]) -> list[BaseMessage]:
+    """Convert a history window into chat model messages."""
+    return [
+        HumanMessage(content=turn["content"]) if turn["role"] == "user" else AIMessage(content=turn["content"])
+        for turn in window
+    ]
+
+
+def is_follow_up(text: str) -> bool:
+    """Heuristic: does this question only make sense with the previous turn?
+
+    True for questions opening with a connector ("and for EVs?"), short
+    questions with a back-reference ("does it cover paint?") and short
+    elliptical fragments ("how much?"). Being short alone is not enough:
+    "What is the warranty?" is a new topic.
+    """
+    lowered = " ".join(text.lower().split())
+    if lowered.startswith(FOLLOW_UP_PREFIXES):
+        return True
+    words = lowered.split()
+    if len(words) > 12:
+        return False
+    if _REFERENCE_PATTERN.search(lowered):
+        return True
+    return len(words) <= FOLLOW_UP_MAX_WORDS and bool(_ELLIPSIS_PATTERN.match(lowered))
+
+
+@lru_cache(maxsize=1024)
+def _condense(previous: str, text: str) -> str:
+    follow_up = _CONNECTOR_PATTERN.sub("", text.strip()) or text.strip()
+    condensed = f"{previous.rstrip(' ?.!')} {follow_up}".strip()
+    return condensed[-MAX_INPUT_CHARS:]
+
+
+def standalone_query(text: str, window: list[dict[str, str]]) -> str:
+    """Rewrite a follow-up into a standalone retrieval query without an LLM call.
+
+    Follow-ups are prefixed with the (recursively condensed) previous user
+    question, e.g. "and for EVs?" after "How long is the warranty?" becomes
+    "How long is the warranty for EVs?". Other questions pass through.
+    """
+    if not is_follow_up(text):
+        return text
+    for index in range(len(window) - 1, -1, -1):
+        if window[index]["role"] == "user":
+            return _condense(standalone_query(window[index]["content"], window[:index]), text)
+    return text
+
+
+def previous_standalone_query(window: list[dict[str, str]]) -> str | None:
+    """Standalone form of the last user question in the window, if any."""
+    for index in range(len(window) - 1, -1, -1):
+        if window[index]["role"] == "user":
+            return standalone_query(window[index]["content"], window[:index])
+    return None
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class ContextReuseCache:
+    """Remembers the chunks retrieved for recent standalone queries.
+
+    A follow-up whose standalone query embeds close enough to the previous
+    turn's query reuses that turn's chunks instead of searching again.
+    Cleared when the fingerprint (index version + runtime settings) changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = CONTEXT_REUSE_MAX_ENTRIES,
+        similarity_threshold: float = CONTEXT_REUSE_SIMILARITY_THRESHOLD,
+    ) -> None:
+        self._max_entries = max(1, max_entries)
+        self._similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[np.ndarray, list[Document]]] = OrderedDict()
+        self._fingerprint: tuple | None = None
+
+    def clear(self) -> None:
+        """Forget every remembered context."""
+        with self._lock:
+            self._entries.clear()
+
+    def _sync_fingerprint(self, fingerprint: tuple) -> None:
+        if fingerprint != self._fingerprint:
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def lookup(self, previous_query: str, embedding: list[float], fingerprint: tuple) -> list[Document] | None:
+        """Return the previous turn's chunks if the topic has not changed."""
+        with self._lock:
+            self._sync_fingerprint(fingerprint)
+            entry = self._entries.get(previous_query)
+            if entry is None:
+                return None
+            previous_vector, documents = entry
+            query = _normalize(embedding)
+            if previous_vector.shape != query.shape or float(previous_vector @ query) < self._similarity_threshold:
+                return None
+            self._entries.move_to_end(previous_query)
+            return list(documents)
+
+    def store(self, query: str, embedding: list[float], documents: list[Document], fingerprint: tuple) -> None:
+        """Remember the chunks retrieved for a standalone query."""
+        with self._lock:
+            self._sync_fingerprint(fingerprint)
+            self._entries[query] = (_normalize(embedding), list(documents))
+            self._entries.move_to_end(query)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_CONTEXT_CACHE = ContextReuseCache()
+
+
+def get_context_cache() -> ContextReuseCache:
+    """Return the process-wide context reuse cache."""
+    return _CONTEXT_CACHE
@@ -1,8 +1,21 @@
 """Prompt templates for chat generation."""
 
+from functools import cache
 
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for budgeting and metrics."""
+    return (len(text) + 3) // 4
+
+
+@cache
 def get_system_prompt() -> str:
-    """Return a hardened system prompt for RAG behavior."""
+    """Return a hardened system prompt for RAG behavior.
+
+    Keep it static: every chat request starts with these exact bytes, which
+    lets Ollama reuse its cached prompt prefix. Per-request text belongs in
+    the user prompt.
+    """
     return (
         "You are a warm and professional automotive customer-service assistant. "
 
@@ -79,11 +92,38 @@ def get_summary_system_prompt() -> str:
     )
 
 
-def build_summary_user_prompt(queries: list[str]) -> str:
-    """Build the user prompt for the analytics summarisation task."""
-    numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(queries))
+def build_summary_user_prompt(items: list[tuple[str, int]]) -> str:
+    """Build the user prompt for one batch of deduplicated queries and their counts."""
+    total = sum(count for _, count in items)
+    numbered = "\n".join(
+        f"{i + 1}. {query}" + (f" (asked {count}×)" if count > 1 else "")
+        for i, (query, count) in enumerate(items)
+    )
     return (
-        f"Below are {len(queries)} customer queries logged by the chatbot.\n\n"
+        f"Below are {len(items)} distinct customer queries ({total} in total) logged by the chatbot. "
+        "Repeat counts are shown in brackets.\n\n"
         f"{numbered}\n\n"
         "Please produce the automotive service-improvement summary as instructed."
     )
+
+
+def get_summary_merge_system_prompt() -> str:
+    """Return the system prompt for merging partial analytics reports."""
+    return (
+        "You are an automotive business analyst. You will receive several partial service-improvement "
+        "reports, each written from a different slice of the same customer chat logs, with the number "
+        "of queries each one covers. Merge them into ONE concise, structured report (bullet points or "
+        "numbered sections) that highlights: the most frequently asked topics, notable knowledge gaps or "
+        "pain points, and concrete recommendations. Combine overlapping topics instead of listing them "
+        "twice, and weigh each report by how many queries it covers. "
+        "Write in clear, professional English."
+    )
+
+
+def build_summary_merge_prompt(reports: list[tuple[str, int]]) -> str:
+    """Build the user prompt that merges partial reports (text, queries covered)."""
+    sections = "\n\n".join(
+        f"### Report {i + 1} (covers {count} queries)\n{text.strip()}"
+        for i, (text, count) in enumerate(reports)
+    )
+    return f"{sections}\n\nPlease merge these into a single service-improvement summary."
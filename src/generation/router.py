@@ -0,0 +1,184 @@
+"""Cheap intent routing that answers non-RAG messages from templates.
+
+Greetings, crisis messages, prompt-injection attempts and clearly
+off-topic questions are matched with precompiled patterns before any
+embedding, retrieval or model call. Everything else takes the RAG route.
+"""
+
+import re
+from dataclasses import dataclass
+
+from analytics.metrics import get_metrics, increment_counter
+
+
+CONTACT_DETAILS = "📧 example@gmail.com | 📞 +49-12345678 (Mon–Fri 08:00–20:00, Sat 09:00–17:00)"
+
+GREETING_RESPONSE = "Hello! 👋 I'm your automotive service assistant. How can I help you with your vehicle today?"
+THANKS_RESPONSE = "You're very welcome! If there's anything else about your vehicle I can help with, just ask."
+WELLBEING_RESPONSE = "I'm doing well, thank you for asking! How can I help you with your vehicle today?"
+GOODBYE_RESPONSE = "Goodbye, and drive safely! Feel free to come back any time."
+CRISIS_RESPONSE = (
+    "I hear that you're going through something really difficult right now. "
+    "Please reach out to a crisis helpline or someone you trust — you don't have to face this alone. "
+    "If there's anything I can help you with regarding our vehicles, I'm here for you too."
+)
+INJECTION_RESPONSE = (
+    "I'm sorry, but I can't change how I work or share my internal instructions. "
+    "I'm happy to help with questions about our vehicles, services, warranties or ordering."
+)
+OFF_TOPIC_RESPONSE = (
+    "That's a bit outside my area of expertise as an automotive assistant! "
+    f"For further help, feel free to contact our team: {CONTACT_DETAILS}, "
+    "or stop by any of our authorised dealerships in person."
+)
+NO_CONTEXT_RESPONSE = (
+    "I'm sorry, I don't have enough information on that topic in our documents. "
+    f"For more detailed assistance, please feel free to reach out to our customer service team: {CONTACT_DETAILS}. "
+    "You're also welcome to visit one of our authorised dealerships in person — they'll be happy to help!"
+)
+
+RAG_ROUTE = "rag"
+NO_CONTEXT_ROUTE = "no_context"
+ROUTES = ("smalltalk", "crisis", "injection", "off_topic", NO_CONTEXT_ROUTE, RAG_ROUTE)
+
+
+def _compile(*patterns: str) -> re.Pattern:
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+# Checked in order; crisis wins over everything else. Only unambiguous
+# self-harm and instruction-override wording is matched here; anything
+# subtler goes to RAG, where sanitize_user_input and the system prompt apply.
+_CRISIS = _compile(
+    r"\b(?:hurt|harm|kill)\s+myself\b",
+    r"\bsuicid",
+    r"\bself[-\s]?harm",
+    r"\bend\s+(?:my\s+life|it\s+all)\b",
+    r"\bwant\s+to\s+die\b",
+    r"\bcan'?t\s+go\s+on\s+(?:living|like\s+this|any\s?more)\b",
+    r"\b(?:no|the)\s+point\s+in\s+living\b",
+    r"\bfeel(?:ing)?\s+(?:\w+\s+)?hopeless\b",
+)
+_INJECTION = _compile(
+    r"\bignore\s+(?:all\s+)?(?:the\s+)?(?:previous|prior|above)\s+(?:instructions|rules)",
+    r"\bforget\s+(?:everything|all)\s+(?:above|before|you)",
+    r"\bsystem\s+prompt\b",
+    r"\b(?:hidden|internal|secret)\s+instructions\b",
+    r"\binstructions\s+(?:were\s+)?you\s+(?:were\s+)?given\b",
+    r"\brepeat\s+(?:them|it|everything)\s+word\s+for\s+word\b",
+    r"\bdisable\s+(?:all\s+)?(?:your\s+)?safety\s+(?:rules|filters|guidelines)\b",
+    r"^\s*(?:system|developer)\s*:",
+    r"\bjailbreak",
+)
+# Phrases that are also ordinary customer wording ("drive without restrictions",
+# "you are now my favourite dealer"); they only count without automotive terms.
+_ROLE_PLAY = _compile(
+    r"\byou\s+are\s+now\b",
+    r"\bpretend\s+(?:you\s+are|to\s+be)\b",
+    r"\b(?:no|without)\s+(?:restrictions|limitations|rules)\b",
+)
+# Small talk must make up the whole message, so "hi, how long is the warranty?" still goes to RAG.
+_SMALLTALK = (
+    (
+        re.compile(
+            r"(?:hi|hello|hey|hiya|greetings|good\s+(?:morning|afternoon|evening|day))(?:\s+there)?",
+            re.IGNORECASE,
+        ),
+        GREETING_RESPONSE,
+    ),
+    (
+        re.compile(
+            r"(?:many\s+)?(?:thanks|thank\s+you|thx|cheers)(?:\s+(?:so|very)\s+much)?(?:\s+a\s+lot)?"
+            r"(?:\s+for\s+(?:your|the|all\s+(?:your|the))\s+help)?",
+            re.IGNORECASE,
+        ),
+        THANKS_RESPONSE,
+    ),
+    (
+        re.compile(r"how\s+are\s+(?:you|things)(?:\s+doing)?(?:\s+today)?", re.IGNORECASE),
+        WELLBEING_RESPONSE,
+    ),
+    (
+        re.compile(r"(?:good)?bye|see\s+you(?:\s+later)?|have\s+a\s+(?:good|nice)\s+day", re.IGNORECASE),
+        GOODBYE_RESPONSE,
+    ),
+)
+_SMALLTALK_TRIM = re.compile(r"^[\s\W]+|[\s\W]+$")
+_OFF_TOPIC = _compile(
+    r"\bweather\b",
+    r"\brestaurants?\b",
+    r"\brecipes?\b",
+    r"\bfootball\b|\bsoccer\b|\bworld\s+cup\b|\bbasketball\b",
+    r"\bmovies?\b|\bfilms?\b|\bsongs?\b",
+    r"\bstock\s+(?:market|price)s?\b|\bcrypto",
+    r"\bhoroscope\b|\bjoke\b",
+    r"\bcapital\s+of\b",
+)
+# Any automotive term keeps a message on the RAG route even if it also matches _OFF_TOPIC.
+_AUTOMOTIVE = _compile(
+    r"\b(?:car|cars|vehicle|vehicles|ev|evs|sedan|suv|model)\b",
+    r"\bwarrant",
+    r"\bcharg",
+    r"\bbatter",
+    r"\bservic",
+    r"\bmaintenan",
+    r"\b(?:engine|brake|tyre|tire|oil|infotainment)",
+    r"\b(?:order|deposit|financ|leas|trade-?in|dealer|delivery)",
+    r"\b(?:roadside|hotline|complaint|support)",
+    r"\b(?:drive|driving|range)\b",
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Routing decision; ``response`` is None for the RAG route."""
+
+    name: str
+    response: str | None = None
+
+
+def route_query(text: str) -> Route:
+    """Classify a user message and return its route and templated response."""
+    if _CRISIS.search(text):
+        return Route("crisis", CRISIS_RESPONSE)
+    automotive = _AUTOMOTIVE.search(text) is not None
+    if _INJECTION.search(text) or (_ROLE_PLAY.search(text) and not automotive):
+        return Route("injection", INJECTION_RESPONSE)
+
+    trimmed = _SMALLTALK_TRIM.sub("", text)
+    for pattern, response in _SMALLTALK:
+        if pattern.fullmatch(trimmed):
+            return Route("smalltalk", response)
+
+    if _OFF_TOPIC.search(text) and not automotive:
+        return Route("off_topic", OFF_TOPIC_RESPONSE)
+    return Route(RAG_ROUTE)
+
+
+def record_route(name: str, latency_ms: float) -> None:
+    """Count a routed request and add its end-to-end latency."""
+    increment_counter(f"router.{name}.requests")
+    increment_counter(f"router.{name}.latency_ms", latency_ms)
+
+
+def get_route_stats() -> list[dict]:
+    """Per-route request counts, mean latency and estimated time saved.
+
+    Savings compare each fast route's mean latency with the mean of requests
+    that went through retrieval and generation.
+    """
+    metrics = get_metrics("router.")
+    stats = []
+    for name in ROUTES:
+        requests = int(metrics.get(f"router.{name}.requests", 0))
+        latency_ms = metrics.get(f"router.{name}.latency_ms", 0.0)
+        stats.append({"route": name, "requests": requests, "mean_ms": latency_ms / requests if requests else 0.0})
+
+    rag_mean_ms = next(row["mean_ms"] for row in stats if row["route"] == RAG_ROUTE)
+    for row in stats:
+        saved_ms = 0.0
+        if row["route"] != RAG_ROUTE and rag_mean_ms:
+            saved_ms = max(0.0, rag_mean_ms - row["mean_ms"]) * row["requests"]
+        row["saved_s"] = round(saved_ms / 1000, 1)
+        row["mean_ms"] = round(row["mean_ms"], 1)
+    return [row for row in stats if row["requests"]]
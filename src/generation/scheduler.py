@@ -0,0 +1,369 @@
+"""Admission control and priority scheduling for local chat model calls.
+
+Every model call, streamed customer chat as well as background work such as
+the admin summary, takes a slot from one scheduler shared by all processes
+on the machine: the chat app, the admin app and the API workers each run
+in their own process but talk to the same Ollama server. Slots live in a
+small SQLite table, so at most ``max_concurrency`` calls run at once
+machine-wide, waiting callers are served by priority and then arrival
+order, and a request is shed immediately when too many callers of its
+priority or higher are already queued.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from pathlib import Path
+
+from analytics.metrics import get_metrics, increment_counter
+from config import (
+    LLM_MAX_QUEUE_DEPTH,
+    LLM_SCHEDULER_DB_PATH,
+    LLM_SCHEDULER_POLL_SECONDS,
+    OLLAMA_MAX_CONCURRENCY,
+)
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    CHAT = 0
+    BACKGROUND = 1
+
+
+class LLMUnavailable(Exception):
+    """A model call was not admitted; callers answer with a fallback."""
+
+
+class QueueFull(LLMUnavailable):
+    """Too many requests are already waiting for a model slot."""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The request's deadline passed while it waited or generated."""
+
+
+_RELEASE_ATTEMPTS = 5
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LLMScheduler:
+    """Bounded, priority-ordered admission to the chat model across processes.
+
+    Each request is a row in the ``llm_tickets`` table, either waiting or
+    active. A waiter is granted a slot once fewer than ``max_concurrency``
+    tickets are active and it is among the first waiting tickets in
+    (priority, arrival) order. Background work never takes the last slot,
+    so a chat request does not have to wait for background calls to end. Releasing a slot wakes waiters of the same
+    process at once; waiters in other processes notice within
+    ``LLM_SCHEDULER_POLL_SECONDS``. Tickets of processes that died without
+    releasing them are purged on the next enqueue. The async API runs every
+    SQLite call on a worker thread, so a locked database never stalls the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+        max_queue_depth: int = LLM_MAX_QUEUE_DEPTH,
+        db_path: Path = LLM_SCHEDULER_DB_PATH,
+    ) -> None:
+        self._max_concurrency = max(1, max_concurrency)
+        self._max_queue_depth = max(0, max_queue_depth)
+        self._db_path = db_path
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._wakers: dict[int, Callable[[], None]] = {}
+        # Tickets whose release failed; deleted again with the next enqueue.
+        self._unreleased: set[int] = set()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self._db_path, timeout=5.0, isolation_level=None)
+        try:
+            if not self._initialized:
+                self._init_table(conn)
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_table(self, conn: sqlite3.Connection) -> None:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pid INTEGER NOT NULL,
+                priority INTEGER NOT NULL,
+                active INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._initialized = True
+
+    @property
+    def queue_depth(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_tickets WHERE active = 0").fetchone()[0]
+
+    @property
+    def active(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM llm_tickets WHERE active = 1").fetchone()[0]
+
+    @staticmethod
+    def _purge_dead_processes(conn: sqlite3.Connection) -> None:
+        pids = [row[0] for row in conn.execute("SELECT DISTINCT pid FROM llm_tickets")]
+        dead = [(pid,) for pid in pids if pid != os.getpid() and not _process_alive(pid)]
+        if dead:
+            conn.executemany("DELETE FROM llm_tickets WHERE pid = ?", dead)
+
+    def _slots_for(self, priority: int) -> int:
+        """Slots a priority may fill; one is kept free for chat when there are several."""
+        if priority == Priority.CHAT or self._max_concurrency == 1:
+            return self._max_concurrency
+        return self._max_concurrency - 1
+
+    def _grant_locked(self, conn: sqlite3.Connection, ticket: int) -> bool:
+        row = conn.execute("SELECT priority FROM llm_tickets WHERE id = ?", (ticket,)).fetchone()
+        if row is None:
+            return False
+        active = conn.execute("SELECT COUNT(*) FROM llm_tickets WHERE active = 1").fetchone()[0]
+        free = self._slots_for(row[0]) - active
+        if free <= 0:
+            return False
+        eligible = conn.execute(
+            "SELECT id FROM llm_tickets WHERE active = 0 ORDER BY priority, id LIMIT ?", (free,)
+        ).fetchall()
+        if (ticket,) not in eligible:
+            return False
+        conn.execute("UPDATE llm_tickets SET active = 1 WHERE id = ?", (ticket,))
+        return True
+
+    def _enqueue(self, priority: Priority) -> tuple[int, bool]:
+        """Queue a ticket and try to take a slot; raises QueueFull.
+
+        Returns:
+            (ticket id, whether the slot was granted immediately)
+        """
+        with self._lock:
+            unreleased = list(self._unreleased)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._purge_dead_processes(conn)
+                conn.executemany("DELETE FROM llm_tickets WHERE id = ?", [(ticket,) for ticket in unreleased])
+                ahead = conn.execute(
+                    "SELECT COUNT(*) FROM llm_tickets WHERE active = 0 AND priority <= ?", (int(priority),)
+                ).fetchone()[0]
+                if ahead >= self._max_queue_depth:
+                    conn.execute("COMMIT")
+                else:
+                    ticket = conn.execute(
+                        "INSERT INTO llm_tickets (pid, priority, created_at) VALUES (?, ?, ?)",
+                        (os.getpid(), int(priority), time.time()),
+                    ).lastrowid
+                    granted = self._grant_locked(conn, ticket)
+                    conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        with self._lock:
+            self._unreleased.difference_update(unreleased)
+        if ahead < self._max_queue_depth:
+            return ticket, granted
+        increment_counter(f"llm_scheduler.shed.{priority.name.lower()}")
+        raise QueueFull(f"{ahead} model requests already queued")
+
+    def _try_grant(self, ticket: int) -> bool:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                granted = self._grant_locked(conn, ticket)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+        return granted
+
+    def _release(self, ticket: int) -> None:
+        """Drop a ticket, waiting or active, and let local waiters retry.
+
+        A locked database is retried with backoff; if it stays locked the
+        ticket is remembered and deleted by this process's next enqueue.
+        """
+        for attempt in range(_RELEASE_ATTEMPTS):
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM llm_tickets WHERE id = ?", (ticket,))
+                break
+            except sqlite3.OperationalError:
+                if attempt + 1 == _RELEASE_ATTEMPTS:
+                    increment_counter("llm_scheduler.release_failed")
+                    with self._lock:
+                        self._unreleased.add(ticket)
+                else:
+                    time.sleep(0.05 * 2**attempt)
+        with self._lock:
+            self._wakers.pop(ticket, None)
+            wakers = list(self._wakers.values())
+        for wake in wakers:
+            wake()
+
+    async def _aenqueue(self, priority: Priority) -> tuple[int, bool]:
+        """Run _enqueue() on a worker thread without leaking its ticket on cancellation."""
+        task = asyncio.ensure_future(asyncio.to_thread(self._enqueue, priority))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The insert still commits; drop the ticket as soon as it does.
+            task.add_done_callback(self._release_abandoned)
+            raise
+
+    def _release_abandoned(self, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is None:
+            ticket, _ = task.result()
+            asyncio.get_running_loop().run_in_executor(None, self._release, ticket)
+
+    def _register(self, ticket: int, wake: Callable[[], None]) -> None:
+        with self._lock:
+            self._wakers[ticket] = wake
+
+    def record_deadline_exceeded(self, priority: Priority) -> None:
+        """Count a request that ran out of time, waiting or generating."""
+        increment_counter(f"llm_scheduler.deadline_exceeded.{priority.name.lower()}")
+
+    def _record_wait(self, priority: Priority, started: float) -> None:
+        name = priority.name.lower()
+        increment_counter(f"llm_scheduler.granted.{name}")
+        increment_counter(f"llm_scheduler.wait_ms.{name}", (time.monotonic() - started) * 1000)
+
+    @staticmethod
+    def _next_wait(deadline: float | None) -> float:
+        if deadline is None:
+            return LLM_SCHEDULER_POLL_SECONDS
+        return min(LLM_SCHEDULER_POLL_SECONDS, deadline - time.monotonic())
+
+    @asynccontextmanager
+    async def aslot(self, priority: Priority, *, deadline: float | None = None) -> AsyncIterator[None]:
+        """Hold a model slot for the enclosed async block.
+
+        ``deadline`` (``time.monotonic()`` based) bounds the wait for a slot.
+
+        Raises:
+            QueueFull: the request was shed on arrival.
+            DeadlineExceeded: no slot became free before ``deadline``.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        started = time.monotonic()
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's loop is closed; its ticket is released below.
+                pass
+
+        ticket, granted = await self._aenqueue(priority)
+        try:
+            self._register(ticket, wake)
+            while not granted:
+                timeout = self._next_wait(deadline)
+                if timeout <= 0:
+                    self.record_deadline_exceeded(priority)
+                    raise DeadlineExceeded("timed out waiting for a model slot")
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                granted = await asyncio.to_thread(self._try_grant, ticket)
+            self._record_wait(priority, started)
+            yield
+        finally:
+            # Shielded so a cancellation cannot interrupt the release.
+            await asyncio.shield(asyncio.to_thread(self._release, ticket))
+
+    @contextmanager
+    def slot(self, priority: Priority, *, deadline: float | None = None) -> Iterator[None]:
+        """Blocking counterpart of aslot() for thread-based callers."""
+        event = threading.Event()
+        started = time.monotonic()
+        ticket, granted = self._enqueue(priority)
+        try:
+            self._register(ticket, event.set)
+            while not granted:
+                timeout = self._next_wait(deadline)
+                if timeout <= 0:
+                    self.record_deadline_exceeded(priority)
+                    raise DeadlineExceeded("timed out waiting for a model slot")
+                event.wait(timeout)
+                event.clear()
+                granted = self._try_grant(ticket)
+            self._record_wait(priority, started)
+            yield
+        finally:
+            self._release(ticket)
+
+    def process_stats(self) -> list[dict]:
+        """Live active and waiting tickets per process."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT pid, SUM(active = 1), SUM(active = 0)
+                FROM llm_tickets GROUP BY pid ORDER BY pid
+                """
+            ).fetchall()
+        return [{"pid": pid, "active": int(active), "waiting": int(waiting)} for pid, active, waiting in rows]
+
+
+_SCHEDULER = LLMScheduler()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the scheduler shared by every process on this machine."""
+    return _SCHEDULER
+
+
+def get_scheduler_stats() -> dict:
+    """Live queue state plus per-priority wait, shed and deadline totals."""
+    processes = _SCHEDULER.process_stats()
+    metrics = get_metrics("llm_scheduler.")
+    stats: dict = {
+        "queue_depth": sum(row["waiting"] for row in processes),
+        "active": sum(row["active"] for row in processes),
+        "processes": processes,
+        "priorities": [],
+    }
+    for priority in Priority:
+        name = priority.name.lower()
+        granted = int(metrics.get(f"llm_scheduler.granted.{name}", 0))
+        wait_ms = metrics.get(f"llm_scheduler.wait_ms.{name}", 0.0)
+        stats["priorities"].append(
+            {
+                "priority": name,
+                "granted": granted,
+                "mean_wait_ms": round(wait_ms / granted, 1) if granted else 0.0,
+                "shed": int(metrics.get(f"llm_scheduler.shed.{name}", 0)),
+                "deadline_exceeded": int(metrics.get(f"llm_scheduler.deadline_exceeded.{name}", 0)),
+            }
+        )
+    return stats
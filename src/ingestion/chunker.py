@@ -1,18 +1,38 @@
 """Document chunking utilities."""
 
+from collections.abc import Iterable, Iterator
+
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
+def _build_splitter(chunk_size: int, overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=overlap,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
 def chunk_documents(
     documents: list[Document],
     chunk_size: int = 800,
     overlap: int = 120,
 ) -> list[Document]:
     """Split LangChain documents into overlapping chunks."""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        separators=["\n\n", "\n", ". ", " ", ""],
-    )
-    return splitter.split_documents(documents)
+    return _build_splitter(chunk_size, overlap).split_documents(documents)
+
+
+def iter_chunks(
+    documents: Iterable[Document],
+    chunk_size: int = 800,
+    overlap: int = 120,
+) -> Iterator[Document]:
+    """Lazily split a stream of documents into overlapping chunks.
+
+    Only one source document is held at a time, so this pairs with
+    ``ingestion.loader.iter_documents`` for constant-memory ingestion.
+    """
+    splitter = _build_splitter(chunk_size, overlap)
+    for document in documents:
+        yield from splitter.split_documents([document])
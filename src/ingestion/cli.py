@@ -0,0 +1,55 @@
+"""Command-line entry point for (re)indexing the knowledge base without Streamlit.
+
+Usage:
+    python src/ingestion/cli.py [--reset] [--batch-size 64] [--workers 4]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+_SRC_DIR = Path(__file__).resolve().parents[1]
+if str(_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(_SRC_DIR))
+
+from config import INGEST_BATCH_SIZE, INGEST_MAX_WORKERS
+from ingestion.pipeline import IngestionReport
+from retrieval.vectorstore import refresh_vectorstore_index
+
+
+def _print_progress(report: IngestionReport) -> None:
+    print(
+        f"\r  {report.chunks} chunk(s) embedded in {report.batches} batch(es), "
+        f"{report.failed_batches} failed — {report.chunks_per_second:.1f} chunks/s",
+        end="",
+        flush=True,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reset", action="store_true", help="Delete the vector store and rebuild it from scratch.")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Chunks per embedding request.")
+    parser.add_argument("--workers", type=int, default=INGEST_MAX_WORKERS, help="Concurrent embedding requests.")
+    args = parser.parse_args()
+
+    print("Indexing knowledge base…")
+    summary = refresh_vectorstore_index(
+        reset=args.reset,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        on_progress=_print_progress,
+    )
+    print()
+    print(
+        f"{summary['changed_files']} of {summary['files']} file(s) changed: "
+        f"{summary['added_chunks']} chunk(s) added, {summary['failed_chunks']} failed, "
+        f"{summary['deleted_chunks']} deleted ({summary['chunks_per_second']} chunks/s)."
+    )
+    if summary["failed_files"]:
+        print(f"{summary['failed_files']} file(s) could not be read and will be retried on the next run.")
+    return 1 if summary["failed_chunks"] or summary["failed_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,195 @@
 """Document loading utilities."""
 
+import mmap
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
 
-from langchain_community.document_loaders import TextLoader
 from langchain_core.documents import Document
 
+from config import LOADER_MAX_WORKERS, LOADER_MMAP_THRESHOLD_BYTES, LOADER_SEGMENT_BYTES
 
-def load_text_documents(directory: Path) -> list[Document]:
-    """Load .txt documents from a directory into LangChain documents."""
+
+TEXT_SUFFIXES = {".txt", ".md", ".markdown"}
+HTML_SUFFIXES = {".html", ".htm"}
+PDF_SUFFIXES = {".pdf"}
+SUPPORTED_SUFFIXES = TEXT_SUFFIXES | HTML_SUFFIXES | PDF_SUFFIXES
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collect visible text from an HTML document."""
+
+    _SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+    _BLOCK_TAGS = {"p", "div", "br", "li", "tr", "section", "article", "h1", "h2", "h3", "h4", "h5", "h6"}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._parts: list[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in self._SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self._parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def source_name(file_path: Path, root: Path) -> str:
+    """Return the ``source`` metadata value: the path relative to the KB root."""
+    try:
+        return file_path.relative_to(root).as_posix()
+    except ValueError:
+        return file_path.name
+
+
+def list_source_files(directory: Path, recursive: bool = True) -> list[Path]:
+    """Return supported document files under a directory in a stable order."""
     if not directory.exists():
         return []
+    pattern = "**/*" if recursive else "*"
+    return sorted(
+        path for path in directory.glob(pattern) if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES
+    )
+
+
+def list_text_files(directory: Path) -> list[Path]:
+    """Return the .txt files of a directory in a stable order."""
+    return [path for path in list_source_files(directory, recursive=False) if path.suffix.lower() == ".txt"]
+
+
+def _iter_mmap_segments(file_path: Path, segment_bytes: int) -> Iterator[str]:
+    """Yield a large UTF-8 file in paragraph-aligned segments via mmap.
+
+    Only one segment is decoded at a time, so memory use does not depend on
+    the file size.
+    """
+    with file_path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        size = len(mapped)
+        start = 0
+        while start < size:
+            end = min(size, start + segment_bytes)
+            if end < size:
+                cut = mapped.rfind(b"\n\n", start, end)
+                if cut <= start:
+                    cut = mapped.rfind(b"\n", start, end)
+                if cut > start:
+                    end = cut + 1
+                while end < size and end > start + 1 and (mapped[end] & 0xC0) == 0x80:
+                    end -= 1
+            yield mapped[start:end].decode("utf-8", errors="replace")
+            start = end
+
 
-    documents: list[Document] = []
-    for file_path in sorted(directory.glob("*.txt")):
-        loader = TextLoader(str(file_path), encoding="utf-8")
-        loaded_documents = loader.load()
-        for document in loaded_documents:
-            document.metadata["source"] = file_path.name
-            documents.append(document)
-    return documents
+def _read_pdf_pages(file_path: Path) -> Iterator[tuple[int, str]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(file_path))
+    for page_number, page in enumerate(reader.pages, start=1):
+        yield page_number, page.extract_text() or ""
+
+
+def iter_file_documents(file_path: Path, source: str | None = None) -> Iterator[Document]:
+    """Yield the documents of one file.
+
+    Large text files are memory-mapped and yielded in segments, PDFs page by
+    page, and HTML as extracted visible text.
+    """
+    source = source or file_path.name
+    suffix = file_path.suffix.lower()
+    if suffix in PDF_SUFFIXES:
+        for page_number, text in _read_pdf_pages(file_path):
+            if text.strip():
+                yield Document(page_content=text, metadata={"source": source, "page": page_number})
+        return
+
+    if suffix in HTML_SUFFIXES:
+        extractor = _HTMLTextExtractor()
+        extractor.feed(file_path.read_text(encoding="utf-8", errors="replace"))
+        yield Document(page_content=extractor.text(), metadata={"source": source})
+        return
+
+    if file_path.stat().st_size >= LOADER_MMAP_THRESHOLD_BYTES:
+        for segment in _iter_mmap_segments(file_path, LOADER_SEGMENT_BYTES):
+            yield Document(page_content=segment, metadata={"source": source})
+        return
+
+    yield Document(page_content=file_path.read_text(encoding="utf-8"), metadata={"source": source})
+
+
+def _load_file(file_path: Path, source: str) -> list[Document]:
+    return list(iter_file_documents(file_path, source))
+
+
+def iter_documents(
+    file_paths: Iterable[Path],
+    *,
+    root: Path,
+    max_workers: int = LOADER_MAX_WORKERS,
+    on_error: Callable[[Path, Exception], None] | None = None,
+) -> Iterator[Document]:
+    """Yield documents of many files, reading small files on a thread pool.
+
+    Output order follows ``file_paths``. At most ``2 * max_workers`` small
+    files are buffered ahead of the consumer. Files above the mmap
+    threshold are streamed in segments on the consumer thread instead.
+    When ``on_error`` is given, a file that cannot be read is reported to
+    it and skipped; otherwise the error propagates.
+    """
+    max_in_flight = max(1, max_workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="loader") as executor:
+        pending: deque[tuple[Path, Future | None]] = deque()
+
+        def _drain(limit: int) -> Iterator[Document]:
+            while len(pending) > limit:
+                file_path, future = pending.popleft()
+                try:
+                    if future is None:
+                        yield from iter_file_documents(file_path, source_name(file_path, root))
+                    else:
+                        yield from future.result()
+                except Exception as exc:
+                    if on_error is None:
+                        raise
+                    on_error(file_path, exc)
+
+        for file_path in file_paths:
+            try:
+                size = file_path.stat().st_size
+            except OSError as exc:
+                if on_error is None:
+                    raise
+                on_error(file_path, exc)
+                continue
+            if size >= LOADER_MMAP_THRESHOLD_BYTES:
+                pending.append((file_path, None))
+            else:
+                future = executor.submit(_load_file, file_path, source_name(file_path, root))
+                pending.append((file_path, future))
+            yield from _drain(max_in_flight - 1)
+        yield from _drain(0)
+
+
+def load_text_document(file_path: Path) -> list[Document]:
+    """Load one file into LangChain documents tagged with its file name."""
+    return list(iter_file_documents(file_path))
+
+
+def load_text_documents(directory: Path) -> list[Document]:
+    """Load .txt documents from a directory into LangChain documents."""
+    return list(iter_documents(list_text_files(directory), root=directory))
@@ -0,0 +1,108 @@
+"""Batched, concurrent embedding pipeline for bulk ingestion."""
+
+import itertools
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from config import INGEST_BATCH_SIZE, INGEST_MAX_RETRIES, INGEST_MAX_WORKERS
+
+
+# write_batch(ids, texts, metadatas, embeddings) persists one embedded batch.
+BatchWriter = Callable[[list[str], list[str], list[dict], list[list[float]]], None]
+
+
+@dataclass
+class IngestionReport:
+    """Outcome and throughput of one ingestion run."""
+
+    chunks: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    failed_ids: list[str] = field(default_factory=list)
+    failed_files: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Yield lists of up to ``batch_size`` items without materialising the input."""
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, max(1, batch_size))):
+        yield batch
+
+
+def _embed_with_retry(embeddings: Embeddings, texts: list[str], max_retries: int) -> list[list[float]]:
+    """Embed one batch, retrying with exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(0.5 * 2**attempt)
+    return []
+
+
+def embed_and_store(
+    chunks: Iterable[tuple[str, Document]],
+    *,
+    embeddings: Embeddings,
+    write_batch: BatchWriter,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+    max_retries: int = INGEST_MAX_RETRIES,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> IngestionReport:
+    """Embed ``(id, chunk)`` pairs in concurrent batches and write them in bulk.
+
+    At most ``2 * max_workers`` batches are in flight, so memory stays bounded
+    for arbitrarily long inputs. Writes happen on the calling thread as
+    batches complete. A batch that still fails after ``max_retries`` is
+    recorded in the report instead of aborting the run.
+    """
+    report = IngestionReport()
+    started = time.perf_counter()
+    max_in_flight = max(1, max_workers) * 2
+
+    def _collect(future: Future, batch: list[tuple[str, Document]]) -> None:
+        ids = [chunk_id for chunk_id, _ in batch]
+        try:
+            vectors = future.result()
+            write_batch(
+                ids,
+                [chunk.page_content for _, chunk in batch],
+                [dict(chunk.metadata) for _, chunk in batch],
+                vectors,
+            )
+            report.chunks += len(batch)
+            report.batches += 1
+        except Exception:
+            report.failed_batches += 1
+            report.failed_ids.extend(ids)
+        report.seconds = time.perf_counter() - started
+        if on_progress is not None:
+            on_progress(report)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="embed") as executor:
+        in_flight: dict[Future, list[tuple[str, Document]]] = {}
+        for batch in iter_batches(chunks, batch_size):
+            texts = [chunk.page_content for _, chunk in batch]
+            in_flight[executor.submit(_embed_with_retry, embeddings, texts, max_retries)] = batch
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(future, in_flight.pop(future))
+
+        for future in list(in_flight):
+            _collect(future, in_flight.pop(future))
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,265 @@
+"""Chat and embedding model factories, with a deterministic offline stub backend.
+
+Set ``MODEL_BACKEND=stub`` to run the whole pipeline without an Ollama
+server: embeddings become hashed bags of words and the chat model answers
+from the first context snippet. Useful for benchmarks and CI, not for users.
+
+``get_chat_model`` hands out pooled clients so HTTP connections to Ollama are
+reused, and every request asks Ollama to keep the model resident for
+OLLAMA_KEEP_ALIVE. ``warm_up_models`` loads both models ahead of traffic.
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from analytics.metrics import set_gauge
+from config import (
+    MODEL_BACKEND,
+    OLLAMA_CHAT_MODEL,
+    OLLAMA_EMBEDDING_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    STUB_CHAT_TOKEN_DELAY_SECONDS,
+    STUB_EMBEDDING_SIZE,
+)
+from generation.prompts import estimate_tokens, get_system_prompt
+from retrieval.lexical import tokenize
+
+
+STUB_NO_CONTEXT_ANSWER = "I'm sorry, I don't have enough information on that topic in our documents."
+
+
+class HashingEmbeddings(Embeddings):
+    """Signed feature hashing of BM25 terms into a unit vector (no model needed)."""
+
+    def __init__(self, size: int = STUB_EMBEDDING_SIZE) -> None:
+        self._size = size
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self._size, dtype=np.float32)
+        for token in tokenize(text):
+            digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self._size] += 1.0 if digest >> 63 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+
+class StubChatModel(BaseChatModel):
+    """Deterministic chat model that quotes the first retrieved snippet.
+
+    Streams word by word, optionally sleeping ``token_delay`` seconds per
+    word to imitate generation time, and reports estimated token usage.
+    """
+
+    token_delay: float = STUB_CHAT_TOKEN_DELAY_SECONDS
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @staticmethod
+    def _respond(messages: list[BaseMessage]) -> str:
+        prompt = str(messages[-1].content)
+        if "Context:" not in prompt:
+            return f"Summary of {len(prompt.splitlines())} input lines."
+        context = prompt.split("Context:", 1)[1].split("\n\nQuestion:", 1)[0].strip()
+        snippet_lines = [line for line in context.splitlines() if line.strip() and not line.startswith("[")]
+        if not snippet_lines:
+            return STUB_NO_CONTEXT_ANSWER
+        first_sentence = re.split(r"(?<=[.!?])\s", snippet_lines[0].strip(), maxsplit=1)[0]
+        return f"According to our documents: {first_sentence}"
+
+    def _usage(self, messages: list[BaseMessage], answer: str) -> dict[str, int]:
+        input_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        output_tokens = estimate_tokens(answer)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        answer = self._respond(messages)
+        message = AIMessage(content=answer, usage_metadata=self._usage(messages, answer))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None, **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        answer = self._respond(messages)
+        for word in re.findall(r"\S+\s*", answer):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, answer)))
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _keep_alive_seconds() -> int:
+    """OLLAMA_KEEP_ALIVE in whole seconds, the one form both Ollama clients accept.
+
+    Takes plain seconds ("300", "-1" for forever) or a Go-style duration
+    such as "30m" or "1h30m".
+    """
+    value = str(OLLAMA_KEEP_ALIVE).strip()
+    if re.fullmatch(r"-?\d+", value):
+        return int(value)
+    negative = value.startswith("-")
+    duration = value.lstrip("-")
+    if not duration or _DURATION_PART.sub("", duration):
+        raise ValueError(f"Invalid OLLAMA_KEEP_ALIVE: {OLLAMA_KEEP_ALIVE!r}")
+    seconds = sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in _DURATION_PART.findall(duration))
+    return -1 if negative else round(seconds)
+
+
+def create_chat_model(*, temperature: float = 0.2, **options: Any) -> BaseChatModel:
+    """Return a new chat model for the configured backend.
+
+    Prefer get_chat_model(), which reuses clients and their connections.
+    """
+    if MODEL_BACKEND == "stub":
+        return StubChatModel()
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(model=OLLAMA_CHAT_MODEL, temperature=temperature, keep_alive=_keep_alive_seconds(), **options)
+
+
+def create_embeddings() -> Embeddings:
+    """Return an embeddings client for the configured backend."""
+    if MODEL_BACKEND == "stub":
+        return HashingEmbeddings()
+    from langchain_ollama import OllamaEmbeddings
+
+    return OllamaEmbeddings(model=OLLAMA_EMBEDDING_MODEL, keep_alive=_keep_alive_seconds())
+
+
+# Pooled chat clients. Each ChatOllama owns a sync and an async HTTP client;
+# the sync one is safe to share across threads, but the async one is bound to
+# the event loop it first ran on, so async callers get one instance per loop.
+# In-process chat runs on one long-lived loop (the API server's, or the
+# background loop behind the sync wrappers in generation/chain.py), so in
+# practice each process holds a single async client.
+_CLIENT_LOCK = threading.Lock()
+_SHARED_CHAT_MODELS: dict[float, BaseChatModel] = {}
+_LOOP_CHAT_MODELS: dict[asyncio.AbstractEventLoop, dict[float, BaseChatModel]] = {}
+
+
+def _close_abandoned_clients(models: list[BaseChatModel]) -> None:
+    """Close the HTTP clients of models whose event loop has already closed."""
+    for model in models:
+        async_client = getattr(model, "_async_client", None)
+        if async_client is not None:
+            try:
+                asyncio.run(async_client.close())
+            except Exception:
+                # Connections opened on the dead loop cannot be shut down cleanly.
+                pass
+        sync_client = getattr(model, "_client", None)
+        if sync_client is not None:
+            sync_client.close()
+
+
+def get_chat_model(*, temperature: float = 0.2) -> BaseChatModel:
+    """Return a pooled chat model for the calling context.
+
+    Inside a running event loop the instance is private to that loop and
+    reused for every request on it; elsewhere one instance per temperature
+    is shared by all threads. Clients of loops that have since closed are
+    dropped and closed.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    abandoned: list[BaseChatModel] = []
+    with _CLIENT_LOCK:
+        if loop is not None and loop not in _LOOP_CHAT_MODELS:
+            for closed in [other for other in _LOOP_CHAT_MODELS if other.is_closed()]:
+                abandoned.extend(_LOOP_CHAT_MODELS.pop(closed).values())
+        models = _SHARED_CHAT_MODELS if loop is None else _LOOP_CHAT_MODELS.setdefault(loop, {})
+        model = models.get(temperature)
+        if model is None:
+            model = models[temperature] = create_chat_model(temperature=temperature)
+    if abandoned:
+        # asyncio.run() cannot nest inside the caller's running loop.
+        threading.Thread(
+            target=_close_abandoned_clients, args=(abandoned,), name="chat-client-close", daemon=True
+        ).start()
+    return model
+
+
+async def aclose_chat_models() -> None:
+    """Close the pooled clients of the running loop; call before the loop stops."""
+    with _CLIENT_LOCK:
+        models = list(_LOOP_CHAT_MODELS.pop(asyncio.get_running_loop(), {}).values())
+    for model in models:
+        async_client = getattr(model, "_async_client", None)
+        if async_client is not None:
+            await async_client.close()
+        sync_client = getattr(model, "_client", None)
+        if sync_client is not None:
+            sync_client.close()
+
+
+def warm_up_models() -> dict[str, float]:
+    """Load the chat and embedding models into Ollama and time each request.
+
+    The chat warm-up sends the real system prompt, so the server's prompt
+    cache already holds the static prefix every chat request starts with.
+
+    Returns:
+        Milliseconds taken by each warm-up request.
+    """
+    timings: dict[str, float] = {}
+
+    started = time.perf_counter()
+    create_embeddings().embed_query("warm up")
+    timings["embedding_ms"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    model = create_chat_model(temperature=0.2, num_predict=1)
+    model.invoke([SystemMessage(content=get_system_prompt()), HumanMessage(content="Hello")])
+    timings["chat_ms"] = (time.perf_counter() - started) * 1000
+
+    for name, value in timings.items():
+        set_gauge(f"model_warmup.{name}", value)
+    return timings
+
+
+def unload_models() -> None:
+    """Ask Ollama to evict both models now (used to measure cold starts)."""
+    if MODEL_BACKEND == "stub":
+        return
+    import ollama
+
+    client = ollama.Client()
+    for unload in (
+        lambda: client.generate(model=OLLAMA_CHAT_MODEL, prompt="", keep_alive=0),
+        lambda: client.embed(model=OLLAMA_EMBEDDING_MODEL, input="", keep_alive=0),
+    ):
+        try:
+            unload()
+        except ollama.ResponseError:
+            # Not loaded (or not pulled); either way it is not resident.
+            pass
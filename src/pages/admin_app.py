@@ -1,6 +1,7 @@
 """Standalone Admin app entrypoint."""
 
 import sys
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import streamlit as st
@@ -10,9 +11,21 @@ SRC_DIR = Path(__file__).resolve().parent.parent
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
-from analytics.logger import get_all_queries, get_summary_stats, get_top_questions, init_analytics_db
-from analytics.summarizer import summarize_chat_logs
-from config import RELEVANCE_THRESHOLD, RETRIEVAL_TOP_K_MAX
+from analytics.logger import (
+    get_cached_summary,
+    get_query_volume,
+    get_stage_latency_percentiles,
+    get_summary_stats,
+    get_top_questions,
+    init_analytics_db,
+)
+from analytics.clustering import get_query_clusters, run_clustering_job
+from analytics.metrics import get_metrics
+from analytics.summarizer import summarize_new_chat_logs
+from config import RELEVANCE_THRESHOLD, RERANK_ENABLED, RETRIEVAL_MODE, RETRIEVAL_MODES, RETRIEVAL_TOP_K_MAX
+from generation.router import get_route_stats
+from generation.scheduler import get_scheduler_stats
+from retrieval.vectorstore import refresh_vectorstore_index
 from runtime_settings import load_runtime_settings, save_runtime_settings
 
 
@@ -32,6 +45,64 @@ def _get_top_questions() -> list:
     return get_top_questions(limit=10)
 
 
+@st.cache_data(ttl=30)
+def _get_query_volume(granularity: str) -> list:
+    return get_query_volume(granularity, limit=48 if granularity == "hour" else 30)
+
+
+@st.cache_data(ttl=30)
+def _get_query_clusters() -> list:
+    return get_query_clusters(limit=20)
+
+
+LATENCY_WINDOWS = {
+    "Last hour": timedelta(hours=1),
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "All time": None,
+}
+
+
+@st.cache_data(ttl=30)
+def _get_latency_stats(window: str) -> list:
+    span = LATENCY_WINDOWS[window]
+    since = (datetime.utcnow() - span).isoformat() if span is not None else None
+    return get_stage_latency_percentiles(since)
+
+
+@st.cache_data(ttl=30)
+def _get_answer_cache_stats() -> dict:
+    metrics = get_metrics("answer_cache.")
+    return {
+        "hits": int(metrics.get("answer_cache.hits", 0)),
+        "misses": int(metrics.get("answer_cache.misses", 0)),
+    }
+
+
+@st.cache_data(ttl=30)
+def _get_context_packer_stats() -> dict[str, int]:
+    metrics = get_metrics("context_packer.")
+    return {
+        "saved": int(metrics.get("context_packer.tokens_saved", 0)),
+        "over_budget": int(metrics.get("context_packer.tokens_over_budget", 0)),
+    }
+
+
+@st.cache_data(ttl=30)
+def _get_coalesced_requests() -> int:
+    return int(get_metrics("coalescing.").get("coalescing.collapsed", 0))
+
+
+@st.cache_data(ttl=30)
+def _get_route_stats() -> list:
+    return get_route_stats()
+
+
+def _get_scheduler_stats() -> dict:
+    # Not cached: queue state is read live from the shared slot table.
+    return get_scheduler_stats()
+
+
 def _load_settings_once() -> None:
     """Read settings from disk only on first run of the session."""
     if "admin_settings_loaded" not in st.session_state:
@@ -39,10 +110,14 @@ def _load_settings_once() -> None:
         st.session_state.s_top_k = int(s["retrieval_top_k"])
         st.session_state.s_auto_top_k = bool(s.get("auto_top_k", False))
         st.session_state.s_threshold = float(s.get("relevance_threshold", RELEVANCE_THRESHOLD))
+        st.session_state.s_retrieval_mode = str(s.get("retrieval_mode", RETRIEVAL_MODE))
+        st.session_state.s_rerank = bool(s.get("rerank", RERANK_ENABLED))
         # Snapshot of last-persisted values for change detection in on_change callback
         st.session_state.s_saved_top_k = st.session_state.s_top_k
         st.session_state.s_saved_auto_top_k = st.session_state.s_auto_top_k
         st.session_state.s_saved_threshold = st.session_state.s_threshold
+        st.session_state.s_saved_retrieval_mode = st.session_state.s_retrieval_mode
+        st.session_state.s_saved_rerank = st.session_state.s_rerank
         st.session_state.admin_settings_loaded = True
 
 
@@ -52,21 +127,29 @@ def _save_settings() -> None:
     # s_top_k may not exist when auto mode is on (slider not rendered)
     top_k = RETRIEVAL_TOP_K_MAX if auto else st.session_state.get("s_top_k", st.session_state.s_saved_top_k)
     threshold = st.session_state.get("s_threshold", st.session_state.s_saved_threshold)
+    retrieval_mode = st.session_state.s_retrieval_mode
+    rerank = st.session_state.s_rerank
 
     changed = (
         auto != st.session_state.s_saved_auto_top_k
         or st.session_state.get("s_top_k", st.session_state.s_saved_top_k) != st.session_state.s_saved_top_k
         or st.session_state.get("s_threshold", st.session_state.s_saved_threshold) != st.session_state.s_saved_threshold
+        or retrieval_mode != st.session_state.s_saved_retrieval_mode
+        or rerank != st.session_state.s_saved_rerank
     )
     if changed:
         save_runtime_settings(
             retrieval_top_k=top_k,
             auto_top_k=auto,
             relevance_threshold=threshold,
+            retrieval_mode=retrieval_mode,
+            rerank=rerank,
         )
         st.session_state.s_saved_auto_top_k = auto
         st.session_state.s_saved_top_k = st.session_state.get("s_top_k", st.session_state.s_saved_top_k)
         st.session_state.s_saved_threshold = st.session_state.get("s_threshold", st.session_state.s_saved_threshold)
+        st.session_state.s_saved_retrieval_mode = retrieval_mode
+        st.session_state.s_saved_rerank = rerank
 
 
 def main() -> None:
@@ -82,10 +165,101 @@ def main() -> None:
     col1.metric("Total Queries", stats["total_queries"])
     col2.metric("Unique Queries", stats["unique_queries"])
 
+    cache_stats = _get_answer_cache_stats()
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    hit_rate = f"{cache_stats['hits'] / lookups:.0%}" if lookups else "—"
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Answer Cache Hits", cache_stats["hits"])
+    col2.metric("Answer Cache Misses", cache_stats["misses"])
+    col3.metric("Cache Hit Rate", hit_rate)
+    packer_stats = _get_context_packer_stats()
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "Context Tokens Saved",
+        f"{packer_stats['saved']:,}",
+        help="Prompt tokens avoided by merging overlapping chunks and dropping near-duplicates "
+        "(≈4 characters per token).",
+    )
+    col2.metric(
+        "Context Tokens Over Budget",
+        f"{packer_stats['over_budget']:,}",
+        help="Tokens of retrieved chunks left out because the prompt context budget was full.",
+    )
+    col3.metric(
+        "Coalesced Requests",
+        f"{_get_coalesced_requests():,}",
+        help="Requests that shared the answer of an identical question already in flight "
+        "instead of running retrieval and generation again.",
+    )
+
+    st.subheader("Intent Routing")
+    route_stats = _get_route_stats()
+    if not route_stats:
+        st.info("No routed requests yet.")
+    else:
+        saved_s = sum(row["saved_s"] for row in route_stats)
+        st.metric(
+            "Estimated Time Saved",
+            f"{saved_s:,.1f} s",
+            help="Requests answered from templates, times the difference between their mean latency "
+            "and the mean latency of requests that ran retrieval and generation.",
+        )
+        st.dataframe(route_stats, use_container_width=True, hide_index=True)
+
+    st.subheader("LLM Scheduler")
+    scheduler_stats = _get_scheduler_stats()
+    col1, col2 = st.columns(2)
+    col1.metric("Queue Depth", scheduler_stats["queue_depth"], help="Model requests waiting for a slot.")
+    col2.metric("Active Model Calls", scheduler_stats["active"], help="Across the chat app, admin app and API.")
+    st.caption(
+        "Customer chat is served before background work in every app process. Shed requests and "
+        "missed deadlines were answered with the fallback response."
+    )
+    st.dataframe(scheduler_stats["priorities"], use_container_width=True, hide_index=True)
+    if scheduler_stats["processes"]:
+        st.dataframe(scheduler_stats["processes"], use_container_width=True, hide_index=True)
+
+    st.subheader("Query Volume")
+    granularity = st.radio("Granularity", ["day", "hour"], horizontal=True, key="volume_granularity")
+    volume = _get_query_volume(granularity)
+    if not volume:
+        st.info("No query logs yet.")
+    else:
+        st.line_chart(volume, x=granularity, y=["queries", "unique_queries"])
+
+    st.subheader("Latency by Stage")
+    window = st.selectbox("Time window", list(LATENCY_WINDOWS), index=1, key="latency_window")
+    latency_stats = _get_latency_stats(window)
+    if not latency_stats:
+        st.info("No traced requests in this window yet.")
+    else:
+        st.caption(
+            "embed + search = Chroma/embedding time; ttft and generation = Ollama time. "
+            "ttft and total are measured from the start of the request."
+        )
+        st.dataframe(latency_stats, use_container_width=True, hide_index=True)
+
     st.subheader("RAG Settings")
 
     # Use key= to bind widgets directly to session_state.
     # on_change fires AFTER session_state is updated → no double-click issue.
+    st.selectbox(
+        "Retrieval Mode",
+        options=list(RETRIEVAL_MODES),
+        key="s_retrieval_mode",
+        on_change=_save_settings,
+        help="dense: embedding similarity · lexical: BM25 keyword match (part numbers, clause IDs) · "
+        "hybrid: both, merged with reciprocal rank fusion.",
+    )
+
+    st.toggle(
+        "Rerank",
+        key="s_rerank",
+        on_change=_save_settings,
+        help="Over-fetch candidates and rescore them (embedding cosine + query-term coverage). "
+        "Keeps the best Top-K chunks, or with Auto Top-K the chunks before the largest score drop.",
+    )
+
     st.toggle(
         "Auto Top-K",
         key="s_auto_top_k",
@@ -93,7 +267,12 @@ def main() -> None:
         help="Automatically select chunks above the relevance threshold.",
     )
 
-    if st.session_state.s_auto_top_k:
+    if st.session_state.s_auto_top_k and st.session_state.s_rerank:
+        st.info(
+            f"Auto mode with reranking: rescores up to {RETRIEVAL_TOP_K_MAX} chunks and cuts the list at "
+            "the largest score gap, so no relevance threshold is needed."
+        )
+    elif st.session_state.s_auto_top_k:
         st.info(
             f"Auto mode: searches all {RETRIEVAL_TOP_K_MAX} chunks and keeps those "
             f"above the relevance threshold. Adjust the threshold below."
@@ -119,6 +298,28 @@ def main() -> None:
             help="How many chunks are retrieved for each user question.",
         )
 
+    st.subheader("Knowledge Base Index")
+    st.caption(
+        "Re-index files changed in data/knowledge_base/. Only edited chunks are re-embedded, "
+        "and the chat keeps answering during the refresh."
+    )
+    if st.button("Refresh Index"):
+        with st.spinner("Refreshing knowledge base index…"):
+            try:
+                summary = refresh_vectorstore_index()
+            except Exception as exc:
+                st.error(f"Index refresh failed: {exc}")
+            else:
+                st.success(
+                    f"{summary['changed_files']} of {summary['files']} file(s) changed — "
+                    f"{summary['added_chunks']} chunk(s) added, {summary['deleted_chunks']} removed."
+                )
+                if summary["failed_files"]:
+                    st.warning(
+                        f"{summary['failed_files']} file(s) could not be read; "
+                        "they are retried on the next refresh."
+                    )
+
     st.subheader("Top Asked Questions")
     top_questions = _get_top_questions()
     if not top_questions:
@@ -126,18 +327,53 @@ def main() -> None:
     else:
         st.dataframe(top_questions, use_container_width=True, hide_index=True)
 
+    st.subheader("Question Topics")
+    st.caption(
+        "Semantically similar questions grouped by embedding similarity. "
+        "Updating only embeds questions that are not clustered yet."
+    )
+    if st.button("Update Topics"):
+        progress = st.progress(0.0, text="Clustering questions…")
+        try:
+            result = run_clustering_job(on_progress=lambda fraction, message: progress.progress(fraction, text=message))
+        except Exception as exc:
+            st.error(f"Clustering failed: {exc}")
+        else:
+            st.success(f"{result['new_queries']} new question(s) clustered into {result['clusters']} topic(s).")
+            _get_query_clusters.clear()
+        progress.empty()
+    clusters = _get_query_clusters()
+    if not clusters:
+        st.info("No topics yet. Click “Update Topics” to cluster the logged questions.")
+    else:
+        st.dataframe(clusters, use_container_width=True, hide_index=True)
+
     st.divider()
     st.subheader("AI Service-Improvement Summary")
     st.caption(
-        "Click the button below to let the LLM analyse all chat logs and generate a summary of "
-        "automotive concerns. Small talk, off-topic, and security-injection queries are automatically ignored."
+        "Click the button below to let the LLM analyse the chat logs and generate a summary of "
+        "automotive concerns. Only logs added since the last summary are analysed and merged into it. "
+        "Small talk, off-topic, and security-injection queries are automatically ignored."
     )
+    rebuild = st.checkbox("Rebuild from the full history", key="summary_rebuild")
     if st.button("Generate Summary", type="primary"):
-        with st.spinner("Analysing chat logs… this may take a moment."):
-            all_queries = get_all_queries()
-            summary = summarize_chat_logs(all_queries)
+        progress = st.progress(0.0, text="Analysing chat logs…")
+        summary = summarize_new_chat_logs(
+            rebuild=rebuild,
+            on_progress=lambda fraction, message: progress.progress(fraction, text=message),
+        )
+        progress.empty()
         st.session_state["admin_summary"] = summary
 
+    if "admin_summary" not in st.session_state:
+        cached = get_cached_summary()
+        if cached:
+            st.session_state["admin_summary"] = cached["summary"]
+            st.caption(
+                f"Last summary covers {cached['query_count']} queries "
+                f"(generated {cached['created_at'][:16]} UTC)."
+            )
+
     if "admin_summary" in st.session_state:
         st.markdown(st.session_state["admin_summary"])
 
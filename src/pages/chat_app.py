@@ -1,6 +1,7 @@
 """Standalone Chat app entrypoint."""
 
 import sys
+import threading
 from pathlib import Path
 
 import streamlit as st
@@ -11,8 +12,11 @@ if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 from analytics.logger import init_analytics_db, log_chat_interaction
-from config import RELEVANCE_THRESHOLD, RETRIEVAL_TOP_K, RETRIEVAL_TOP_K_MAX
-from generation.chain import generate_chat_response
+from api.client import ChatApiClient
+from config import CHAT_API_URL, RELEVANCE_THRESHOLD, RERANK_ENABLED, RETRIEVAL_MODE, RETRIEVAL_TOP_K, RETRIEVAL_TOP_K_MAX
+from generation.chain import stream_chat_response, watch_runtime_settings
+from model_backend import warm_up_models
+from retrieval.vectorstore import warm_vectorstore
 from runtime_settings import load_runtime_settings
 import streamlit.components.v1 as components
 
@@ -22,10 +26,33 @@ def _init_db() -> None:
     init_analytics_db()
 
 
-@st.cache_data(ttl=5)
-def _load_settings() -> dict:
-    """Cache settings for 5 s to avoid per-render disk reads."""
-    return load_runtime_settings()
+@st.cache_resource
+def _api_client() -> ChatApiClient:
+    """One pooled HTTP client per server process (used when CHAT_API_URL is set)."""
+    return ChatApiClient(CHAT_API_URL)
+
+
+def _warm_up_models_quietly() -> None:
+    try:
+        warm_up_models()
+    except Exception:
+        # Ollama may still be starting; the first request loads the models instead.
+        pass
+
+
+@st.cache_resource
+def _warm_up() -> None:
+    """Open the shared vector store and load both models once per server process."""
+    if CHAT_API_URL:
+        return
+    watch_runtime_settings()
+    # Loading the chat model can take seconds, so it must not hold up the page.
+    threading.Thread(target=_warm_up_models_quietly, name="model-warmup", daemon=True).start()
+    try:
+        warm_vectorstore()
+    except Exception:
+        # Retrieval reports its own errors per request; do not block the page.
+        pass
 
 
 def _render_sources(sources: list[str], num_chunks: int = 0) -> None:
@@ -106,6 +133,7 @@ def main() -> None:
     st.caption("Customer-facing chat interface.")
 
     _init_db()
+    _warm_up()
 
     with st.sidebar:
         st.subheader("Session")
@@ -116,10 +144,13 @@ def main() -> None:
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    runtime_settings = _load_settings()
+    # Served from memory; the file is only re-read after the admin saves a new version.
+    runtime_settings = load_runtime_settings()
     retrieval_top_k = int(runtime_settings.get("retrieval_top_k", RETRIEVAL_TOP_K))
     auto_top_k = bool(runtime_settings.get("auto_top_k", False))
     relevance_threshold = float(runtime_settings.get("relevance_threshold", RELEVANCE_THRESHOLD))
+    retrieval_mode = str(runtime_settings.get("retrieval_mode", RETRIEVAL_MODE))
+    rerank = bool(runtime_settings.get("rerank", RERANK_ENABLED))
     if auto_top_k:
         retrieval_top_k = RETRIEVAL_TOP_K_MAX
 
@@ -132,20 +163,31 @@ def main() -> None:
         _render_message(user_message)
 
         with st.chat_message("assistant"):
+            placeholder = st.empty()
+            open_stream = _api_client().stream_chat if CHAT_API_URL else stream_chat_response
+            stream = open_stream(
+                prompt,
+                st.session_state.messages,
+                top_k=retrieval_top_k,
+                auto_top_k=auto_top_k,
+                relevance_threshold=relevance_threshold,
+                retrieval_mode=retrieval_mode,
+                rerank=rerank,
+            )
+            tokens = iter(stream)
             with st.spinner("Thinking..."):
-                answer, sources, num_chunks = generate_chat_response(
-                    prompt,
-                    st.session_state.messages,
-                    top_k=retrieval_top_k,
-                    auto_top_k=auto_top_k,
-                    relevance_threshold=relevance_threshold,
-                )
-            st.markdown(answer)
+                partial_answer = next(tokens, "")
+            for token in tokens:
+                partial_answer += token
+                placeholder.markdown(partial_answer + "▌")
+            # The final answer replaces the streamed text (e.g. when the output guard trips).
+            answer, sources, num_chunks = stream.answer, stream.sources, stream.num_chunks
+            placeholder.markdown(answer)
             _render_sources(sources, num_chunks)
 
         assistant_message = {"role": "assistant", "content": answer, "sources": sources, "num_chunks": num_chunks}
         st.session_state.messages.append(assistant_message)
-        log_chat_interaction(query=prompt, answer=answer)
+        log_chat_interaction(query=prompt, answer=answer, trace=getattr(stream, "trace", None))
 
 
 if __name__ == "__main__":
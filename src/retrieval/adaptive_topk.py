@@ -5,3 +5,20 @@ def select_adaptive_topk(similarity_scores: list[float], threshold: float = 0.4,
     """Return how many chunks should be kept based on a score threshold."""
     valid_scores = [score for score in similarity_scores[:max_k] if score >= threshold]
     return len(valid_scores)
+
+
+def select_gap_topk(sorted_scores: list[float], min_k: int = 1, max_k: int = 10, min_gap: float = 0.05) -> int:
+    """Cut a descending score list at its largest gap instead of a fixed threshold.
+
+    Returns the number of leading items to keep: everything before the
+    biggest drop between neighbours (at or after ``min_k``), or all of the
+    first ``max_k`` when no drop reaches ``min_gap``.
+    """
+    scores = sorted_scores[:max_k]
+    if len(scores) <= min_k:
+        return len(scores)
+    gaps = [scores[index - 1] - scores[index] for index in range(min_k, len(scores))]
+    largest = max(range(len(gaps)), key=gaps.__getitem__)
+    if gaps[largest] < min_gap:
+        return len(scores)
+    return min_k + largest
@@ -0,0 +1,192 @@
+"""Persistent LRU cache of query embeddings in front of an Embeddings client."""
+
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from analytics.metrics import increment_counter
+from config import CACHE_DIR, QUERY_EMBEDDING_CACHE_MAX_ENTRIES, QUERY_EMBEDDING_CACHE_SAVE_INTERVAL_SECONDS
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace so trivially different spellings share an entry."""
+    return " ".join(text.split())
+
+
+def cache_path_for(model: str) -> Path:
+    """One cache file per embedding model."""
+    return CACHE_DIR / f"query_embeddings_{re.sub(r'[^A-Za-z0-9_.-]+', '_', model)}.npz"
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Caches query embeddings; ``embed_documents`` passes straight through.
+
+    Chat retrieval goes through ``embed_query``; batch callers use
+    ``embed_queries``, which can also read the cache without adding to it.
+
+    Vectors live in one preallocated float32 matrix (a slot per entry) with
+    an OrderedDict mapping key -> slot for LRU eviction. Keys hash the model
+    name and the normalized text. The cache is written to ``path`` at most
+    every QUERY_EMBEDDING_CACHE_SAVE_INTERVAL_SECONDS (on a background
+    thread) and at exit, and loaded again on start-up. Several processes
+    share the file: each save merges in the entries other processes wrote,
+    so only entries saved by two processes at the same moment can be lost.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        *,
+        model: str,
+        path: Path | None = None,
+        max_entries: int = QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+        save_interval: float = QUERY_EMBEDDING_CACHE_SAVE_INTERVAL_SECONDS,
+    ) -> None:
+        self._embeddings = embeddings
+        self._model = model
+        self._path = path if path is not None else cache_path_for(model)
+        self._max_entries = max(1, max_entries)
+        self._save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._vectors: np.ndarray | None = None
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._load()
+        atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self._model}\0{normalize_query_text(text)}".encode("utf-8")).hexdigest()
+
+    def _read_file(self) -> tuple[list[str], np.ndarray] | None:
+        try:
+            with np.load(self._path, allow_pickle=False) as data:
+                keys = [str(key) for key in data["keys"]]
+                vectors = np.asarray(data["vectors"], dtype=np.float32)
+        except (OSError, KeyError, ValueError):
+            return None
+        if vectors.ndim != 2 or len(vectors) != len(keys):
+            return None
+        return keys, vectors
+
+    def _load(self) -> None:
+        stored = self._read_file()
+        if stored is None:
+            return
+        keys, vectors = stored
+        keys, vectors = keys[-self._max_entries :], vectors[-self._max_entries :]
+        if not keys:
+            return
+        self._vectors = np.zeros((self._max_entries, vectors.shape[1]), dtype=np.float32)
+        self._vectors[: len(keys)] = vectors
+        self._slots = OrderedDict((key, slot) for slot, key in enumerate(keys))
+
+    def save(self) -> None:
+        """Write the cache (least recently used first) atomically."""
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            keys = list(self._slots)
+            vectors = self._vectors[list(self._slots.values())].copy()
+            self._dirty = False
+            self._last_save = time.monotonic()
+        with self._save_lock:
+            keys, vectors = self._merge_with_file(keys, vectors)
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_name(f"{self._path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+            np.savez(tmp_path, keys=np.asarray(keys), vectors=vectors)
+            os.replace(tmp_path, self._path)
+
+    def _merge_with_file(self, keys: list[str], vectors: np.ndarray) -> tuple[list[str], np.ndarray]:
+        """Prepend entries only on disk (written by other processes) as least recently used."""
+        stored = self._read_file()
+        if stored is None or stored[1].shape[1:] != vectors.shape[1:]:
+            return keys, vectors
+        known = set(keys)
+        others = [index for index, key in enumerate(stored[0]) if key not in known]
+        keep = max(0, self._max_entries - len(keys))
+        others = others[len(others) - keep :] if keep else []
+        if not others:
+            return keys, vectors
+        return [stored[0][index] for index in others] + keys, np.concatenate([stored[1][others], vectors])
+
+    def _maybe_save(self) -> None:
+        if time.monotonic() - self._last_save >= self._save_interval:
+            self._last_save = time.monotonic()
+            threading.Thread(target=self.save, name="query-embedding-cache-save", daemon=True).start()
+
+    def _lookup(self, key: str) -> list[float] | None:
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None or self._vectors is None:
+                return None
+            self._slots.move_to_end(key)
+            return self._vectors[slot].tolist()
+
+    def _store(self, key: str, vector: list[float]) -> list[float]:
+        row = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != row.shape[0]:
+                self._vectors = np.zeros((self._max_entries, row.shape[0]), dtype=np.float32)
+                self._slots.clear()
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                if len(self._slots) < self._max_entries:
+                    slot = len(self._slots)
+                else:
+                    _, slot = self._slots.popitem(last=False)
+            self._vectors[slot] = row
+            self._slots[key] = slot
+            self._dirty = True
+        self._maybe_save()
+        # Hits return float32 values; return the same rounding on a miss.
+        return row.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        key = self._key(text)
+        cached = self._lookup(key)
+        if cached is not None:
+            increment_counter("query_embedding_cache.hits")
+            return cached
+        increment_counter("query_embedding_cache.misses")
+        return self._store(key, self._embeddings.embed_query(normalize_query_text(text)))
+
+    def embed_queries(self, texts: list[str], *, remember: bool = True) -> list[list[float]]:
+        """Embed many queries, sending only the cache misses in one batch.
+
+        With ``remember=False`` hits are still used but misses are neither
+        stored nor counted, so bulk jobs with their own store (topic
+        clustering) do not evict the chat's entries.
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [index for index, vector in enumerate(vectors) if vector is None]
+        if remember and len(missing) < len(texts):
+            increment_counter("query_embedding_cache.hits", len(texts) - len(missing))
+        if missing:
+            if remember:
+                increment_counter("query_embedding_cache.misses", len(missing))
+            # Texts that normalize to the same key are embedded once.
+            first = {keys[index]: index for index in reversed(missing)}
+            fresh = self._embeddings.embed_documents([normalize_query_text(texts[index]) for index in first.values()])
+            if remember:
+                fresh = [self._store(key, vector) for key, vector in zip(first, fresh)]
+            embedded = dict(zip(first, fresh))
+            for index in missing:
+                vectors[index] = embedded[keys[index]]
+        return vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embeddings.embed_documents(texts)
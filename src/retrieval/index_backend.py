@@ -0,0 +1,257 @@
+"""Replaceable dense index backends behind one search interface.
+
+Chroma stays the document store in every configuration; a backend only maps
+query vectors to (chunk id, distance) pairs. Distances are squared L2, the
+metric of Chroma's default collection space, so relevance scores and
+thresholds mean the same thing whichever backend is active.
+"""
+
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import VECTORSTORE_DIR
+
+
+FLAT_INDEX_DIR = VECTORSTORE_DIR / "flat_index"
+_META_FILE = "meta.json"
+# Arrays are stamped with the generation named in meta.json, so a reader
+# never pairs the ids of one save with the vectors of another.
+_ARRAY_FILES = ("ids", "vectors", "norms")
+
+# fetch(chunk_ids) loads stored chunks by ID from the document store.
+DocumentFetcher = Callable[[list[str]], dict[str, Document]]
+
+
+def _array_path(directory: Path, name: str, generation: str) -> Path:
+    return directory / f"{name}.{generation}.npy"
+
+
+@dataclass(frozen=True)
+class IndexStats:
+    """Size and load cost of an opened index."""
+
+    backend: str
+    vectors: int
+    dimension: int
+    size_bytes: int
+    load_ms: float
+
+
+class VectorIndexBackend(ABC):
+    """Nearest-neighbour search over stored chunk embeddings."""
+
+    name = "base"
+
+    @abstractmethod
+    def search_batch(self, embeddings: np.ndarray, k: int) -> list[list[tuple[str, float]]]:
+        """Return the ``k`` nearest chunks per query row, closest first."""
+
+    def search_documents_batch(
+        self, embeddings: np.ndarray, k: int, fetch: DocumentFetcher
+    ) -> list[list[tuple[Document, float]]]:
+        """Like search_batch(), with each hit resolved to its stored chunk."""
+        hits = self.search_batch(embeddings, k)
+        documents = fetch([chunk_id for row in hits for chunk_id, _ in row])
+        return [
+            [(documents[chunk_id], distance) for chunk_id, distance in row if chunk_id in documents] for row in hits
+        ]
+
+    def search(self, embedding: list[float] | np.ndarray, k: int) -> list[tuple[str, float]]:
+        """Return the ``k`` nearest chunks to one query vector, closest first."""
+        return self.search_batch(np.asarray(embedding, dtype=np.float32)[None, :], k)[0]
+
+    @abstractmethod
+    def stats(self) -> IndexStats:
+        """Return the size and load cost of the index."""
+
+
+def _directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file()) if path.exists() else 0
+
+
+class ChromaIndex(VectorIndexBackend):
+    """Chroma's persistent HNSW index, queried through the collection."""
+
+    name = "chroma"
+
+    def __init__(self, collection, *, load_ms: float = 0.0) -> None:
+        self._collection = collection
+        self._load_ms = load_ms
+
+    def search_batch(self, embeddings: np.ndarray, k: int) -> list[list[tuple[str, float]]]:
+        if len(embeddings) == 0 or k <= 0:
+            return [[] for _ in embeddings]
+        result = self._collection.query(
+            query_embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            n_results=k,
+            include=["distances"],
+        )
+        return [list(zip(ids, distances)) for ids, distances in zip(result["ids"], result["distances"])]
+
+    def search_documents_batch(
+        self, embeddings: np.ndarray, k: int, fetch: DocumentFetcher
+    ) -> list[list[tuple[Document, float]]]:
+        """Return hits with their chunks from the same query, in one round trip."""
+        if len(embeddings) == 0 or k <= 0:
+            return [[] for _ in embeddings]
+        result = self._collection.query(
+            query_embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            [
+                (Document(page_content=text or "", metadata=metadata or {}), distance)
+                for text, metadata, distance in zip(texts, metadatas, distances)
+            ]
+            for texts, metadatas, distances in zip(result["documents"], result["metadatas"], result["distances"])
+        ]
+
+    def stats(self) -> IndexStats:
+        peek = self._collection.peek(limit=1)
+        embeddings = peek.get("embeddings")
+        dimension = len(embeddings[0]) if embeddings is not None and len(embeddings) else 0
+        return IndexStats(
+            backend=self.name,
+            vectors=self._collection.count(),
+            dimension=dimension,
+            size_bytes=_directory_size(VECTORSTORE_DIR) - _directory_size(FLAT_INDEX_DIR),
+            load_ms=self._load_ms,
+        )
+
+
+class FlatMmapIndex(VectorIndexBackend):
+    """Exact search over a float32 matrix memory-mapped from disk.
+
+    Opening the index maps the chunk ids, vectors and norms without reading
+    them (ids are a fixed-width string array), so load time does not grow
+    with the corpus and every process shares the same page cache. A search
+    is one matrix product against the precomputed squared norms.
+    """
+
+    name = "flat"
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        *,
+        manifest_version: int,
+        size_bytes: int,
+        load_ms: float,
+    ) -> None:
+        self.ids = ids
+        self.manifest_version = manifest_version
+        self._vectors = vectors
+        self._norms = norms
+        self._size_bytes = size_bytes
+        self._load_ms = load_ms
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search_batch(self, embeddings: np.ndarray, k: int) -> list[list[tuple[str, float]]]:
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if len(queries) == 0 or k <= 0 or len(self.ids) == 0:
+            return [[] for _ in queries]
+
+        k = min(k, len(self.ids))
+        distances = self._norms[None, :] - 2.0 * (queries @ self._vectors.T)
+        distances += np.einsum("ij,ij->i", queries, queries)[:, None]
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in zip(distances, nearest):
+            ordered = candidates[np.argsort(row[candidates], kind="stable")]
+            results.append([(str(self.ids[index]), max(0.0, float(row[index]))) for index in ordered])
+        return results
+
+    def stats(self) -> IndexStats:
+        return IndexStats(
+            backend=self.name,
+            vectors=len(self.ids),
+            dimension=int(self._vectors.shape[1]) if self._vectors.ndim == 2 else 0,
+            size_bytes=self._size_bytes,
+            load_ms=self._load_ms,
+        )
+
+    @staticmethod
+    def save(
+        ids: list[str],
+        vectors: np.ndarray,
+        *,
+        manifest_version: int,
+        directory: Path = FLAT_INDEX_DIR,
+    ) -> None:
+        """Write the index as a new generation; open readers keep their old mapping.
+
+        The arrays are written under fresh names first and meta.json, which
+        names the generation, is replaced last, so a load sees either the old
+        or the new index in full. Older generations are removed afterwards,
+        except the previous one, which a concurrent load may still be opening.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not ids:
+            matrix = matrix.reshape(0, matrix.shape[-1] if matrix.ndim == 2 else 0)
+        norms = np.einsum("ij,ij->i", matrix, matrix)
+        id_array = np.asarray(ids, dtype=str) if ids else np.empty(0, dtype="<U1")
+
+        generation = uuid.uuid4().hex
+        for name, array in zip(_ARRAY_FILES, (id_array, matrix, norms)):
+            tmp_path = directory / f"{name}.{generation}.tmp"
+            with tmp_path.open("wb") as handle:
+                np.save(handle, array)
+            os.replace(tmp_path, _array_path(directory, name, generation))
+
+        meta_path = directory / _META_FILE
+        try:
+            previous = json.loads(meta_path.read_text(encoding="utf-8")).get("generation")
+        except (OSError, ValueError):
+            previous = None
+        tmp_path = directory / f"{_META_FILE}.{generation}.tmp"
+        tmp_path.write_text(
+            json.dumps({"generation": generation, "manifest_version": manifest_version}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, meta_path)
+
+        generations = [stamp for stamp in (generation, previous) if stamp]
+        keep = {_array_path(directory, name, stamp) for name in _ARRAY_FILES for stamp in generations}
+        for path in directory.glob("*.npy"):
+            if path not in keep:
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, directory: Path = FLAT_INDEX_DIR) -> "FlatMmapIndex | None":
+        """Map a saved index, or return None when it is missing or inconsistent."""
+        started = time.perf_counter()
+        try:
+            meta = json.loads((directory / _META_FILE).read_text(encoding="utf-8"))
+            generation = str(meta["generation"])
+            paths = [_array_path(directory, name, generation) for name in _ARRAY_FILES]
+            ids, vectors, norms = (np.load(path, mmap_mode="r") for path in paths)
+            size_bytes = sum(path.stat().st_size for path in (*paths, directory / _META_FILE))
+        except (KeyError, OSError, ValueError):
+            return None
+
+        if ids.ndim != 1 or vectors.ndim != 2 or vectors.shape[0] != len(ids) or norms.shape != (len(ids),):
+            return None
+        return cls(
+            ids,
+            vectors,
+            norms,
+            manifest_version=int(meta.get("manifest_version", 0)),
+            size_bytes=size_bytes,
+            load_ms=(time.perf_counter() - started) * 1000,
+        )
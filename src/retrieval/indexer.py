@@ -0,0 +1,74 @@
+"""Content-hash bookkeeping for incremental knowledge base indexing."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+from config import VECTORSTORE_DIR
+
+
+MANIFEST_PATH = VECTORSTORE_DIR / "index_manifest.json"
+
+
+def hash_file(file_path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with file_path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_chunk_id(source: str, content: str, seen: dict[str, int]) -> str:
+    """Return a stable ID derived from a chunk's source and content.
+
+    ``seen`` counts content hashes already issued for this source, so
+    identical chunks get an occurrence suffix and IDs stay unique. An
+    unchanged chunk keeps its ID across re-indexing runs.
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    occurrence = seen.get(content_hash, 0)
+    seen[content_hash] = occurrence + 1
+    suffix = f"-{occurrence}" if occurrence else ""
+    return f"{source}:{content_hash}{suffix}"
+
+
+def build_chunk_ids(source: str, chunks: list[Document]) -> list[str]:
+    """Return stable IDs for all chunks of one source, in order."""
+    seen: dict[str, int] = {}
+    return [make_chunk_id(source, chunk.page_content, seen) for chunk in chunks]
+
+
+def empty_manifest() -> dict:
+    """Return a manifest describing an empty index."""
+    return {"version": 0, "files": {}}
+
+
+def load_manifest() -> dict:
+    """Load the index manifest, or an empty one when missing or unreadable."""
+    if not MANIFEST_PATH.exists():
+        return empty_manifest()
+    try:
+        data = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+        return {"version": int(data.get("version", 0)), "files": dict(data.get("files", {}))}
+    except Exception:
+        return empty_manifest()
+
+
+def save_manifest(manifest: dict) -> None:
+    """Persist the manifest atomically (write to a temp file, then rename)."""
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def manifest_mtime() -> float:
+    """Return the manifest modification time, or 0.0 when it does not exist."""
+    try:
+        return MANIFEST_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
@@ -0,0 +1,150 @@
+"""In-process BM25 lexical index over knowledge base chunks."""
+
+import gzip
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+from config import BM25_B, BM25_K1, VECTORSTORE_DIR
+
+
+LEXICAL_INDEX_PATH = VECTORSTORE_DIR / "lexical_index.json.gz"
+
+# Keeps identifiers such as part numbers ("w-123", "10.5") as single tokens.
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "my", "of", "on", "or", "the", "to", "what", "when", "which", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-case and split text into BM25 terms, dropping common stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over chunk IDs with incremental add/remove.
+
+    Postings map each term to ``{doc_slot: term_frequency}``. Removed chunks
+    free their slot, which is reused by later additions.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B) -> None:
+        self.k1 = k1
+        self.b = b
+        self._doc_ids: list[str | None] = []
+        self._doc_lengths: list[int] = []
+        self._slots: dict[str, int] = {}
+        self._free_slots: list[int] = []
+        self._postings: dict[str, dict[int, int]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._slots
+
+    def add(self, chunk_id: str, text: str) -> None:
+        """Index one chunk, replacing any previous text for the same ID."""
+        if chunk_id in self._slots:
+            self.remove_many([chunk_id])
+
+        term_counts = Counter(tokenize(text))
+        length = sum(term_counts.values())
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._doc_ids[slot] = chunk_id
+            self._doc_lengths[slot] = length
+        else:
+            slot = len(self._doc_ids)
+            self._doc_ids.append(chunk_id)
+            self._doc_lengths.append(length)
+        self._slots[chunk_id] = slot
+        self._total_length += length
+        for term, count in term_counts.items():
+            self._postings.setdefault(term, {})[slot] = count
+
+    def remove_many(self, chunk_ids: list[str]) -> None:
+        """Drop chunks from the index in a single pass over the postings."""
+        slots = {self._slots.pop(chunk_id) for chunk_id in chunk_ids if chunk_id in self._slots}
+        if not slots:
+            return
+
+        for slot in slots:
+            self._total_length -= self._doc_lengths[slot]
+            self._doc_ids[slot] = None
+            self._doc_lengths[slot] = 0
+            self._free_slots.append(slot)
+        for term in list(self._postings):
+            postings = self._postings[term]
+            for slot in slots & postings.keys():
+                del postings[slot]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        """Return up to ``k`` (chunk_id, score) pairs with a positive BM25 score."""
+        doc_count = len(self._slots)
+        if k <= 0 or doc_count == 0:
+            return []
+
+        average_length = self._total_length / doc_count or 1.0
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for slot, frequency in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[slot] / average_length)
+                scores[slot] = scores.get(slot, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self._doc_ids[slot], score) for slot, score in ranked]
+
+    def save(self, path: Path = LEXICAL_INDEX_PATH) -> None:
+        """Persist the index as gzipped JSON, atomically."""
+        live_slots = sorted(self._slots.values())
+        compact_slot = {slot: index for index, slot in enumerate(live_slots)}
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_ids": [self._doc_ids[slot] for slot in live_slots],
+            "doc_lengths": [self._doc_lengths[slot] for slot in live_slots],
+            # term -> flat [slot, tf, slot, tf, ...] list
+            "postings": {
+                term: [value for slot, tf in postings.items() for value in (compact_slot[slot], tf)]
+                for term, postings in self._postings.items()
+            },
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = LEXICAL_INDEX_PATH) -> "BM25Index | None":
+        """Load a persisted index, or return None when missing or unreadable."""
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                payload = json.load(handle)
+        except Exception:
+            return None
+
+        index = cls(k1=payload.get("k1", BM25_K1), b=payload.get("b", BM25_B))
+        index._doc_ids = list(payload["doc_ids"])
+        index._doc_lengths = list(payload["doc_lengths"])
+        index._slots = {chunk_id: slot for slot, chunk_id in enumerate(index._doc_ids)}
+        index._total_length = sum(index._doc_lengths)
+        index._postings = {
+            term: dict(zip(flat[0::2], flat[1::2])) for term, flat in payload["postings"].items()
+        }
+        return index
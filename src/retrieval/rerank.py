@@ -0,0 +1,197 @@
+"""CPU-only reranking of over-fetched retrieval candidates."""
+
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.documents import Document
+
+from analytics.metrics import increment_counter
+from config import (
+    RERANK_CACHE_MAX_ENTRIES,
+    RERANK_CROSS_ENCODER_MODEL,
+    RERANK_DENSE_WEIGHT,
+    RERANK_MIN_GAP,
+)
+from retrieval.adaptive_topk import select_gap_topk
+from retrieval.lexical import tokenize
+
+
+@dataclass
+class Candidate:
+    """A retrieved chunk with its stored embedding (None if unavailable)."""
+
+    chunk_id: str
+    document: Document
+    embedding: np.ndarray | None = None
+
+
+class Reranker(ABC):
+    """Scores (query, candidate) pairs; higher is more relevant."""
+
+    name = "base"
+
+    @abstractmethod
+    def score(self, query: str, query_embedding: np.ndarray, candidates: list[Candidate]) -> np.ndarray:
+        """Return one score per candidate, in candidate order."""
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class CosineOverlapReranker(Reranker):
+    """Weighted sum of embedding cosine and query-term coverage.
+
+    Cosine is computed for all candidates in one matrix-vector product;
+    coverage is the share of query terms (BM25 tokenizer) found in the chunk,
+    which rewards exact matches such as part numbers that embeddings blur.
+    """
+
+    name = "cosine+overlap"
+
+    def __init__(self, dense_weight: float = RERANK_DENSE_WEIGHT) -> None:
+        self._dense_weight = dense_weight
+
+    def score(self, query: str, query_embedding: np.ndarray, candidates: list[Candidate]) -> np.ndarray:
+        dim = query_embedding.shape[0]
+        vectors = np.stack(
+            [
+                candidate.embedding if candidate.embedding is not None else np.zeros(dim, dtype=np.float32)
+                for candidate in candidates
+            ]
+        )
+        cosine = _unit(vectors) @ _unit(query_embedding)
+
+        query_terms = set(tokenize(query))
+        if query_terms:
+            coverage = np.array(
+                [len(query_terms & set(tokenize(c.document.page_content))) / len(query_terms) for c in candidates],
+                dtype=np.float32,
+            )
+        else:
+            coverage = np.zeros(len(candidates), dtype=np.float32)
+        return self._dense_weight * cosine + (1.0 - self._dense_weight) * coverage
+
+
+class CrossEncoderReranker(Reranker):
+    """Local sentence-transformers cross-encoder (optional dependency)."""
+
+    def __init__(self, model_name: str) -> None:
+        from sentence_transformers import CrossEncoder
+
+        self.name = f"cross-encoder:{model_name}"
+        self._model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, query_embedding: np.ndarray, candidates: list[Candidate]) -> np.ndarray:
+        logits = np.asarray(
+            self._model.predict([(query, candidate.document.page_content) for candidate in candidates]),
+            dtype=np.float32,
+        )
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class _PairScoreCache:
+    """Bounded LRU of (reranker, query, chunk) -> score.
+
+    Chunks are keyed by source and content, so entries stay valid across
+    index refreshes: an edited chunk simply gets a new key.
+    """
+
+    def __init__(self, max_entries: int = RERANK_CACHE_MAX_ENTRIES) -> None:
+        self._max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._scores: OrderedDict[tuple[str, str, str], float] = OrderedDict()
+
+    @staticmethod
+    def key(reranker: Reranker, query: str, document: Document) -> tuple[str, str, str]:
+        content = f"{document.metadata.get('source', '')}\0{document.page_content}"
+        return reranker.name, query, hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[tuple[str, str, str]]) -> list[float | None]:
+        with self._lock:
+            found: list[float | None] = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                found.append(score)
+            return found
+
+    def put_many(self, items: list[tuple[tuple[str, str, str], float]]) -> None:
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self._max_entries:
+                self._scores.popitem(last=False)
+
+
+_SCORE_CACHE = _PairScoreCache()
+_RERANKER: Reranker | None = None
+_RERANKER_LOCK = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Return the configured reranker, falling back to cosine+overlap.
+
+    The cross-encoder is used only when RERANK_CROSS_ENCODER_MODEL is set and
+    sentence-transformers can load it; a failed load is counted in the
+    ``rerank.cross_encoder_load_failed`` metric.
+    """
+    global _RERANKER
+    if _RERANKER is None:
+        with _RERANKER_LOCK:
+            if _RERANKER is None:
+                reranker: Reranker = CosineOverlapReranker()
+                if RERANK_CROSS_ENCODER_MODEL:
+                    try:
+                        reranker = CrossEncoderReranker(RERANK_CROSS_ENCODER_MODEL)
+                    except Exception:
+                        increment_counter("rerank.cross_encoder_load_failed")
+                _RERANKER = reranker
+    return _RERANKER
+
+
+def rerank(
+    query: str,
+    query_embedding: list[float],
+    candidates: list[Candidate],
+    *,
+    max_k: int,
+    min_k: int = 1,
+    min_gap: float = RERANK_MIN_GAP,
+    cut_at_gap: bool = True,
+    reranker: Reranker | None = None,
+) -> list[Document]:
+    """Rescore candidates and keep the best ``max_k``.
+
+    With ``cut_at_gap`` the list is further cut at its largest score gap
+    (keeping at least ``min_k``), as auto top-k retrieval does.
+    """
+    if not candidates or max_k <= 0:
+        return []
+    reranker = reranker or get_reranker()
+
+    keys = [_PairScoreCache.key(reranker, query, candidate.document) for candidate in candidates]
+    scores = _SCORE_CACHE.get_many(keys)
+    missing = [index for index, score in enumerate(scores) if score is None]
+    if missing:
+        fresh = reranker.score(
+            query,
+            np.asarray(query_embedding, dtype=np.float32),
+            [candidates[index] for index in missing],
+        )
+        _SCORE_CACHE.put_many([(keys[index], float(score)) for index, score in zip(missing, fresh)])
+        for index, score in zip(missing, fresh):
+            scores[index] = float(score)
+
+    order = sorted(range(len(candidates)), key=lambda index: scores[index], reverse=True)
+    if not cut_at_gap:
+        return [candidates[index].document for index in order[:max_k]]
+    keep = select_gap_topk([scores[index] for index in order], min_k=min_k, max_k=max_k, min_gap=min_gap)
+    return [candidates[index].document for index in order[:keep]]
@@ -1,32 +1,105 @@
 """Vector store wrappers with Chroma + Ollama embeddings."""
 
 import shutil
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
+import numpy as np
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
 
 from config import (
     CHROMA_COLLECTION_NAME,
     CHUNK_OVERLAP,
     CHUNK_SIZE,
+    EMBEDDING_MODEL_NAME,
+    HYBRID_CANDIDATE_MULTIPLIER,
+    INGEST_BATCH_SIZE,
+    INGEST_MAX_WORKERS,
     KNOWLEDGE_BASE_DIR,
-    OLLAMA_EMBEDDING_MODEL,
+    LEXICAL_RELATIVE_THRESHOLD,
+    LOADER_MAX_WORKERS,
+    RERANK_CANDIDATE_MULTIPLIER,
+    RETRIEVAL_MODE,
     RETRIEVAL_TOP_K_MAX,
+    RRF_K,
+    VECTOR_INDEX_BACKEND,
     VECTORSTORE_DIR,
+    VECTORSTORE_RETIRE_GRACE_SECONDS,
 )
-from ingestion.chunker import chunk_documents
-from ingestion.loader import load_text_documents
+from ingestion.chunker import iter_chunks
+from ingestion.loader import iter_documents, list_source_files, source_name
+from ingestion.pipeline import IngestionReport, embed_and_store
+from model_backend import create_embeddings
 from retrieval.adaptive_topk import select_adaptive_topk
+from retrieval.embedding_cache import CachedQueryEmbeddings
+from retrieval.index_backend import ChromaIndex, FlatMmapIndex, IndexStats, VectorIndexBackend
+from retrieval.indexer import hash_file, load_manifest, make_chunk_id, manifest_mtime, save_manifest
+from retrieval.lexical import BM25Index
+from retrieval.rerank import Candidate, rerank
 
 
-def _get_embeddings() -> OllamaEmbeddings:
-    """Return Ollama embeddings client."""
-    return OllamaEmbeddings(model=OLLAMA_EMBEDDING_MODEL)
+# Process-wide handles shared by every caller (Streamlit sessions, scripts).
+# Guarded by _HANDLE_LOCK; rebuilt only after invalidate_vectorstore().
+_HANDLE_LOCK = threading.RLock()
+_EMBEDDINGS: CachedQueryEmbeddings | None = None
+_VECTORSTORE: Chroma | None = None
+# BM25 index over the same chunk IDs; replaced wholesale (never mutated in place).
+_LEXICAL_INDEX: BM25Index | None = None
+# Dense search backend over the same chunk IDs (see VECTOR_INDEX_BACKEND).
+_INDEX_BACKEND: VectorIndexBackend | None = None
+# Time the current Chroma handle took to open, reported by index stats.
+_VECTORSTORE_LOAD_MS = 0.0
+# Bumped whenever the index contents change; caches key on it.
+_INDEX_VERSION = 0
+# Manifest mtime seen when the handle was opened; a change means another
+# process refreshed the index.
+_LOADED_MANIFEST_MTIME = 0.0
+# Serialises index builds and refreshes within this process. Reentrant
+# because a refresh opens the handle itself; always taken before _HANDLE_LOCK.
+_REFRESH_LOCK = threading.RLock()
+
+
+def _get_embeddings() -> CachedQueryEmbeddings:
+    """Return the shared embeddings client, with query embeddings cached on disk."""
+    global _EMBEDDINGS
+    if _EMBEDDINGS is None:
+        with _HANDLE_LOCK:
+            if _EMBEDDINGS is None:
+                _EMBEDDINGS = CachedQueryEmbeddings(
+                    create_embeddings(),
+                    model=EMBEDDING_MODEL_NAME,
+                )
+    return _EMBEDDINGS
+
+
+def embed_query(query: str) -> list[float]:
+    """Embed a query with the shared embeddings client."""
+    return _get_embeddings().embed_query(query)
+
+
+def embed_queries(queries: list[str], *, remember: bool = True) -> list[list[float]]:
+    """Embed a batch of queries through the shared query embedding cache."""
+    return _get_embeddings().embed_queries(queries, remember=remember)
+
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Embed a batch of texts with the shared embeddings client."""
+    return _get_embeddings().embed_documents(texts)
+
+
+def get_index_version() -> int:
+    """Return a number that changes whenever the indexed chunks change."""
+    get_vectorstore()
+    return _INDEX_VERSION
 
 
 def initialize_vectorstore() -> Chroma:
-    """Initialize and return persistent Chroma vector store."""
+    """Initialize and return a new persistent Chroma vector store client."""
     VECTORSTORE_DIR.mkdir(parents=True, exist_ok=True)
     return Chroma(
         collection_name=CHROMA_COLLECTION_NAME,
@@ -35,21 +108,376 @@ def initialize_vectorstore() -> Chroma:
     )
 
 
-def _load_and_chunk_knowledge_base() -> list[Document]:
-    """Load knowledge base files and split into chunks."""
-    documents = load_text_documents(KNOWLEDGE_BASE_DIR)
-    return chunk_documents(documents, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+def _shared_system_client():
+    try:
+        from chromadb.api.shared_system_client import SharedSystemClient
+    except ImportError:
+        from chromadb.api.client import SharedSystemClient
+    return SharedSystemClient
+
+
+def _clear_chroma_client_cache() -> None:
+    """Stop every cached chromadb system; only safe once the store is gone."""
+    _shared_system_client().clear_system_cache()
+
+
+def _detach_chroma_system() -> None:
+    """Make the next open start a fresh chromadb system that re-reads disk.
+
+    chromadb caches one system per persist directory. Handles opened before
+    keep using the detached system, so their in-flight queries finish; it is
+    stopped after VECTORSTORE_RETIRE_GRACE_SECONDS. This relies on private
+    chromadb attributes (see the pin in requirements.txt); when they are
+    missing, every cached system is stopped instead, as a plain reopen would.
+    """
+    client_cls = _shared_system_client()
+    lock = getattr(client_cls, "_refcount_lock", None)
+    systems = getattr(client_cls, "_identifier_to_system", None)
+    refcounts = getattr(client_cls, "_identifier_to_refcount", {})
+    if lock is None or not isinstance(systems, dict):
+        _clear_chroma_client_cache()
+        return
+    try:
+        with lock:
+            identifiers = [
+                identifier
+                for identifier, system in systems.items()
+                if system.settings.persist_directory == str(VECTORSTORE_DIR)
+            ]
+            retired = [systems.pop(identifier) for identifier in identifiers]
+            for identifier in identifiers:
+                refcounts.pop(identifier, None)
+    except (AttributeError, TypeError):
+        _clear_chroma_client_cache()
+        return
+    for system in retired:
+        timer = threading.Timer(VECTORSTORE_RETIRE_GRACE_SECONDS, system.stop)
+        timer.daemon = True
+        timer.start()
+
+
+def invalidate_vectorstore() -> None:
+    """Drop the shared vector store handle so the next caller reopens it."""
+    global _VECTORSTORE, _LEXICAL_INDEX, _INDEX_BACKEND, _INDEX_VERSION
+    with _HANDLE_LOCK:
+        _VECTORSTORE = None
+        _LEXICAL_INDEX = None
+        _INDEX_BACKEND = None
+        _INDEX_VERSION += 1
+
+
+def _reset_vectorstore_dir() -> None:
+    """Delete the persisted store and forget every handle on it."""
+    with _HANDLE_LOCK:
+        invalidate_vectorstore()
+        if VECTORSTORE_DIR.exists():
+            shutil.rmtree(VECTORSTORE_DIR)
+        _clear_chroma_client_cache()
+
+
+def _load_lexical_index(vectorstore: Chroma) -> BM25Index | None:
+    """Return the persisted lexical index if its size agrees with Chroma."""
+    index = BM25Index.load()
+    if index is not None and len(index) == vectorstore._collection.count():
+        return index
+    return None
+
+
+def _build_lexical_index(vectorstore: Chroma) -> BM25Index:
+    """Build a lexical index from the stored chunk texts."""
+    index = BM25Index()
+    stored = vectorstore.get(include=["documents"])
+    for chunk_id, text in zip(stored["ids"], stored["documents"]):
+        index.add(chunk_id, text or "")
+    return index
+
+
+def _load_or_build_lexical_index(vectorstore: Chroma) -> BM25Index:
+    """Return a private copy of the lexical index that matches the store.
+
+    The persisted index is used when its size agrees with Chroma; otherwise
+    it is rebuilt from the stored chunk texts.
+    """
+    index = _load_lexical_index(vectorstore)
+    return index if index is not None else _build_lexical_index(vectorstore)
+
+
+def _publish_lexical_index(index: BM25Index) -> None:
+    """Persist a lexical index and make it the shared one."""
+    global _LEXICAL_INDEX
+    with _HANDLE_LOCK:
+        index.save()
+        _LEXICAL_INDEX = index
+
+
+def _get_lexical_index() -> BM25Index:
+    """Return the shared lexical index, loading or building it on first use."""
+    global _LEXICAL_INDEX
+    vectorstore = get_vectorstore()
+    index = _LEXICAL_INDEX
+    if index is not None:
+        return index
+
+    with _HANDLE_LOCK:
+        if _LEXICAL_INDEX is None:
+            index = _load_lexical_index(vectorstore)
+            if index is not None:
+                _LEXICAL_INDEX = index
+            else:
+                # Missing or stale on disk: persist the rebuild so the next process loads it.
+                _publish_lexical_index(_build_lexical_index(vectorstore))
+        return _LEXICAL_INDEX
+
+
+def _build_flat_index(vectorstore: Chroma, manifest_version: int) -> None:
+    """Export every stored embedding to the memory-mapped flat index."""
+    stored = vectorstore._collection.get(include=["embeddings"])
+    FlatMmapIndex.save(
+        list(stored["ids"]),
+        np.asarray(stored["embeddings"], dtype=np.float32),
+        manifest_version=manifest_version,
+    )
+
+
+def _open_index_backend(vectorstore: Chroma) -> VectorIndexBackend:
+    """Open the configured dense backend, rebuilding a stale flat index once.
+
+    Falls back to Chroma's own index when the flat files cannot be mapped.
+    """
+    if VECTOR_INDEX_BACKEND == "flat":
+        version = load_manifest()["version"]
+        index = FlatMmapIndex.load()
+        if index is None or index.manifest_version != version or len(index) != vectorstore._collection.count():
+            _build_flat_index(vectorstore, version)
+            index = FlatMmapIndex.load()
+        if index is not None:
+            return index
+    return ChromaIndex(vectorstore._collection, load_ms=_VECTORSTORE_LOAD_MS)
+
+
+def _get_index_backend() -> VectorIndexBackend:
+    """Return the shared dense search backend, opening it on first use."""
+    global _INDEX_BACKEND
+    vectorstore = get_vectorstore()
+    backend = _INDEX_BACKEND
+    if backend is not None:
+        return backend
+
+    with _HANDLE_LOCK:
+        if _INDEX_BACKEND is None:
+            _INDEX_BACKEND = _open_index_backend(vectorstore)
+        return _INDEX_BACKEND
+
+
+def get_index_stats() -> IndexStats:
+    """Return size and load time of the active dense index."""
+    return _get_index_backend().stats()
+
+
+def _store_chunks(
+    vectorstore: Chroma,
+    chunks: Iterable[tuple[str, Document]],
+    *,
+    lexical_index: BM25Index | None = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> IngestionReport:
+    """Embed chunks through the batched pipeline and upsert them into Chroma."""
+
+    def _write_batch(
+        batch_ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        vectors: list[list[float]],
+    ) -> None:
+        vectorstore._collection.upsert(ids=batch_ids, documents=texts, metadatas=metadatas, embeddings=vectors)
+        if lexical_index is not None:
+            for chunk_id, text in zip(batch_ids, texts):
+                lexical_index.add(chunk_id, text)
+
+    return embed_and_store(
+        chunks,
+        embeddings=_get_embeddings(),
+        write_batch=_write_batch,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        on_progress=on_progress,
+    )
 
 
 def upsert_documents_to_vectorstore(documents: list[Document], reset_collection: bool = False) -> Chroma:
-    """Embed and upsert LangChain documents to Chroma."""
-    if reset_collection and VECTORSTORE_DIR.exists():
-        shutil.rmtree(VECTORSTORE_DIR)
+    """Embed and upsert LangChain documents to Chroma.
 
-    vectorstore = initialize_vectorstore()
-    if documents:
-        vectorstore.add_documents(documents)
-    return vectorstore
+    The resulting store becomes the shared handle returned by get_vectorstore().
+    Prefer refresh_vectorstore_index() for knowledge base updates; a reset
+    deletes the whole store and its manifest.
+    """
+    global _VECTORSTORE, _INDEX_BACKEND, _INDEX_VERSION, _LOADED_MANIFEST_MTIME
+    with _HANDLE_LOCK:
+        if reset_collection:
+            _reset_vectorstore_dir()
+
+        vectorstore = _VECTORSTORE if _VECTORSTORE is not None else initialize_vectorstore()
+        if documents:
+            lexical_index = _load_or_build_lexical_index(vectorstore)
+            _store_chunks(
+                vectorstore,
+                ((str(uuid.uuid4()), document) for document in documents),
+                lexical_index=lexical_index,
+            )
+            _publish_lexical_index(lexical_index)
+            _INDEX_BACKEND = None
+            _INDEX_VERSION += 1
+        _VECTORSTORE = vectorstore
+        _LOADED_MANIFEST_MTIME = manifest_mtime()
+        return vectorstore
+
+
+def _plan_incremental_refresh(
+    vectorstore: Chroma,
+    *,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> tuple[dict, BM25Index, dict[str, int | float]]:
+    """Sync the store with the knowledge base files and return the new manifest.
+
+    Only chunks whose stable ID is not yet stored are embedded. New chunks are
+    written before stale ones are deleted, so a concurrent query never sees
+    a source with no chunks at all. If any batch fails, stale chunks are
+    kept and the next refresh retries the affected files. A file that
+    cannot be read keeps its previous chunks and is retried next time too.
+    The lexical index is updated on a private copy that the caller publishes.
+
+    Returns:
+        (new_manifest, updated lexical index, summary counts)
+    """
+    manifest = load_manifest()
+    existing_ids = set(vectorstore.get(include=[])["ids"])
+    lexical_index = _load_or_build_lexical_index(vectorstore)
+
+    file_paths = list_source_files(KNOWLEDGE_BASE_DIR)
+    with ThreadPoolExecutor(max_workers=LOADER_MAX_WORKERS, thread_name_prefix="hash") as executor:
+        file_hashes = list(executor.map(hash_file, file_paths))
+
+    files: dict[str, dict] = {}
+    changed_paths = []
+    for file_path, file_hash in zip(file_paths, file_hashes):
+        source = source_name(file_path, KNOWLEDGE_BASE_DIR)
+        previous = manifest["files"].get(source)
+        if (
+            previous is not None
+            and previous.get("file_hash") == file_hash
+            and existing_ids.issuperset(previous.get("chunk_ids", []))
+        ):
+            files[source] = previous
+            continue
+        changed_paths.append(file_path)
+        files[source] = {"file_hash": file_hash, "chunk_ids": []}
+
+    failed_sources: list[str] = []
+
+    def _skip_file(file_path: Path, exc: Exception) -> None:
+        failed_sources.append(source_name(file_path, KNOWLEDGE_BASE_DIR))
+
+    def _new_chunks() -> Iterator[tuple[str, Document]]:
+        """Stream chunks of changed files that are not stored yet, recording all IDs."""
+        seen: dict[str, dict[str, int]] = {}
+        documents = iter_documents(changed_paths, root=KNOWLEDGE_BASE_DIR, on_error=_skip_file)
+        for chunk in iter_chunks(documents, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+            source = chunk.metadata["source"]
+            chunk_id = make_chunk_id(source, chunk.page_content, seen.setdefault(source, {}))
+            files[source]["chunk_ids"].append(chunk_id)
+            if chunk_id not in existing_ids:
+                yield chunk_id, chunk
+
+    report = _store_chunks(
+        vectorstore,
+        _new_chunks(),
+        lexical_index=lexical_index,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        on_progress=on_progress,
+    )
+    report.failed_files.extend(failed_sources)
+    for source in failed_sources:
+        # Not recorded as indexed, so the next refresh reads the file again.
+        previous = manifest["files"].get(source)
+        if previous is None:
+            files.pop(source, None)
+        else:
+            files[source] = previous
+
+    desired_ids = {chunk_id for entry in files.values() for chunk_id in entry["chunk_ids"]}
+    stale_ids = sorted(existing_ids - desired_ids)
+
+    if report.failed_batches:
+        stale_ids = []
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+        lexical_index.remove_many(stale_ids)
+
+    changed = bool(report.chunks or stale_ids or set(files) != set(manifest["files"]))
+    new_manifest = {"version": manifest["version"] + int(changed), "files": files}
+    summary = {
+        "files": len(files),
+        "changed_files": len(changed_paths),
+        "added_chunks": report.chunks,
+        "failed_chunks": len(report.failed_ids),
+        "failed_files": len(report.failed_files),
+        "deleted_chunks": len(stale_ids),
+        "chunks_per_second": round(report.chunks_per_second, 1),
+    }
+    return new_manifest, lexical_index, summary
+
+
+def refresh_vectorstore_index(
+    *,
+    reset: bool = False,
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_workers: int = INGEST_MAX_WORKERS,
+    on_progress: Callable[[IngestionReport], None] | None = None,
+) -> dict[str, int | float]:
+    """Incrementally re-index the knowledge base while queries keep running.
+
+    Unchanged files are skipped by content hash, and only new or edited
+    chunks are re-embedded. Vectors of removed chunks are deleted by ID.
+    The shared handle stays open throughout. ``reset=True`` deletes the
+    store first and rebuilds it from scratch.
+
+    Returns:
+        Counts of files seen and changed, chunks added, failed and deleted,
+        and embedding throughput in chunks per second.
+    """
+    global _VECTORSTORE, _INDEX_BACKEND, _INDEX_VERSION, _LOADED_MANIFEST_MTIME
+    with _REFRESH_LOCK:
+        if reset:
+            with _HANDLE_LOCK:
+                _reset_vectorstore_dir()
+                vectorstore = initialize_vectorstore()
+        else:
+            vectorstore = get_vectorstore()
+
+        new_manifest, lexical_index, summary = _plan_incremental_refresh(
+            vectorstore,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            on_progress=on_progress,
+        )
+        changed = bool(reset or summary["added_chunks"] or summary["deleted_chunks"])
+        if changed and VECTOR_INDEX_BACKEND == "flat":
+            # Written before the manifest so other processes reopen onto it.
+            _build_flat_index(vectorstore, new_manifest["version"])
+        with _HANDLE_LOCK:
+            _publish_lexical_index(lexical_index)
+            save_manifest(new_manifest)
+            _VECTORSTORE = vectorstore
+            _LOADED_MANIFEST_MTIME = manifest_mtime()
+            if changed:
+                _INDEX_BACKEND = None
+                _INDEX_VERSION += 1
+    return summary
 
 
 def ensure_vectorstore_indexed() -> Chroma:
@@ -58,40 +486,245 @@ def ensure_vectorstore_indexed() -> Chroma:
     if vectorstore._collection.count() > 0:
         return vectorstore
 
-    chunks = _load_and_chunk_knowledge_base()
-    return upsert_documents_to_vectorstore(chunks)
+    with _REFRESH_LOCK:
+        # Another thread may have built the index while this one waited.
+        if vectorstore._collection.count() == 0:
+            new_manifest, lexical_index, _ = _plan_incremental_refresh(vectorstore)
+            _publish_lexical_index(lexical_index)
+            save_manifest(new_manifest)
+    return vectorstore
+
+
+def get_vectorstore() -> Chroma:
+    """Return the shared, indexed vector store, opening it on first use.
+
+    The handle is reopened when another process has refreshed the index.
+    While a refresh runs in this process the current handle keeps being
+    served; it is reopened on a later call once the refresh is done.
+    """
+    vectorstore = _VECTORSTORE
+    if vectorstore is not None and manifest_mtime() == _LOADED_MANIFEST_MTIME:
+        return vectorstore
+
+    if vectorstore is None:
+        _REFRESH_LOCK.acquire()
+    elif not _REFRESH_LOCK.acquire(blocking=False):
+        return vectorstore
+    try:
+        return _reopen_vectorstore()
+    finally:
+        _REFRESH_LOCK.release()
+
+
+def _reopen_vectorstore() -> Chroma:
+    """Open or reopen the shared handle; the caller holds _REFRESH_LOCK."""
+    global _VECTORSTORE, _LEXICAL_INDEX, _INDEX_BACKEND, _INDEX_VERSION, _LOADED_MANIFEST_MTIME
+    global _VECTORSTORE_LOAD_MS
+    with _HANDLE_LOCK:
+        if _VECTORSTORE is not None and manifest_mtime() != _LOADED_MANIFEST_MTIME:
+            _VECTORSTORE = None
+            _LEXICAL_INDEX = None
+            _INDEX_BACKEND = None
+            _INDEX_VERSION += 1
+            _detach_chroma_system()
+        if _VECTORSTORE is None:
+            started = time.perf_counter()
+            _VECTORSTORE = ensure_vectorstore_indexed()
+            _VECTORSTORE_LOAD_MS = (time.perf_counter() - started) * 1000
+            _LOADED_MANIFEST_MTIME = manifest_mtime()
+        return _VECTORSTORE
+
+
+def warm_vectorstore() -> int:
+    """Open the shared vector store and dense index ahead of the first query.
+
+    Returns:
+        Number of indexed chunks.
+    """
+    _get_index_backend()
+    return get_vectorstore()._collection.count()
+
+
+def _documents_by_id(chunk_ids: list[str]) -> dict[str, Document]:
+    """Fetch stored chunks by ID from Chroma, the document store for every backend."""
+    if not chunk_ids:
+        return {}
+    stored = get_vectorstore()._collection.get(ids=list(dict.fromkeys(chunk_ids)), include=["documents", "metadatas"])
+    return {
+        chunk_id: Document(page_content=text or "", metadata=metadata or {})
+        for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+    }
+
+
+def _dense_search_batch(query_embeddings: list[list[float]], k: int) -> list[list[tuple[Document, float]]]:
+    """Vector search per query returning (document, relevance score in [0, 1]) pairs."""
+    relevance_score_fn = get_vectorstore()._select_relevance_score_fn()
+    hits = _get_index_backend().search_documents_batch(
+        np.asarray(query_embeddings, dtype=np.float32), k, _documents_by_id
+    )
+    return [[(document, relevance_score_fn(distance)) for document, distance in row] for row in hits]
+
 
+def _dense_search(query_embedding: list[float], k: int) -> list[tuple[Document, float]]:
+    """Vector search returning (document, relevance score in [0, 1]) pairs."""
+    return _dense_search_batch([query_embedding], k)[0]
 
-def query_vectorstore(query: str, top_k: int) -> list[Document]:
-    """Run similarity search against vector store."""
+
+def _document_key(document: Document) -> tuple[str, str]:
+    return document.metadata.get("source", ""), document.page_content
+
+
+def _lexical_hits(query: str, k: int, min_relative_score: float = 0.0) -> list[tuple[str, Document]]:
+    """Return BM25 hits as (chunk id, document) pairs, best first.
+
+    Hits scoring below ``min_relative_score`` times the best score are dropped.
+    """
+    hits = _get_lexical_index().search(query, k)
+    if not hits:
+        return []
+    cutoff = hits[0][1] * min_relative_score
+    hits = [(chunk_id, score) for chunk_id, score in hits if score >= cutoff]
+
+    by_id = _documents_by_id([chunk_id for chunk_id, _ in hits])
+    return [(chunk_id, by_id[chunk_id]) for chunk_id, _ in hits if chunk_id in by_id]
+
+
+def _lexical_search(query: str, k: int, min_relative_score: float = 0.0) -> list[Document]:
+    """Return BM25 hits as documents, best first."""
+    return [document for _, document in _lexical_hits(query, k, min_relative_score)]
+
+
+def _rerank_candidates(query: str, query_embedding: list[float], k: int, mode: str) -> list[Candidate]:
+    """Over-fetch up to ``k`` candidates per retriever, with their stored embeddings.
+
+    Dense and BM25 hits are resolved in one Chroma lookup that also returns
+    the vectors the reranker scores against.
+    """
+    chunk_ids: list[str] = []
+    if mode != "lexical":
+        chunk_ids.extend(chunk_id for chunk_id, _ in _get_index_backend().search(query_embedding, k))
+    if mode != "dense":
+        chunk_ids.extend(chunk_id for chunk_id, _ in _get_lexical_index().search(query, k))
+    chunk_ids = list(dict.fromkeys(chunk_ids))
+    if not chunk_ids:
+        return []
+
+    stored = get_vectorstore()._collection.get(ids=chunk_ids, include=["documents", "metadatas", "embeddings"])
+    by_id = {
+        chunk_id: Candidate(
+            chunk_id=chunk_id,
+            document=Document(page_content=text or "", metadata=metadata or {}),
+            embedding=np.asarray(embedding, dtype=np.float32) if embedding is not None else None,
+        )
+        for chunk_id, text, metadata, embedding in zip(
+            stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+        )
+    }
+    return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
+
+
+def _reciprocal_rank_fusion(ranked_lists: list[list[Document]], k: int = RRF_K) -> list[Document]:
+    """Merge ranked result lists by summing 1 / (k + rank) per document."""
+    scores: dict[tuple[str, str], float] = {}
+    documents: dict[tuple[str, str], Document] = {}
+    for ranked in ranked_lists:
+        for rank, document in enumerate(ranked, start=1):
+            key = _document_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, document)
+    ordered = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [documents[key] for key in ordered]
+
+
+def query_vectorstore(
+    query: str,
+    top_k: int,
+    query_embedding: list[float] | None = None,
+    mode: str = RETRIEVAL_MODE,
+    use_rerank: bool = False,
+) -> list[Document]:
+    """Run dense, lexical (BM25) or hybrid search against the vector store.
+
+    Pass ``query_embedding`` when the caller has already embedded ``query``.
+    Hybrid mode over-fetches from both retrievers and merges them with
+    reciprocal rank fusion. With ``use_rerank`` the candidates are
+    over-fetched and rescored, and the best ``top_k`` are kept.
+    """
     if top_k <= 0:
         return []
 
-    vectorstore = ensure_vectorstore_indexed()
-    return vectorstore.similarity_search(query, k=top_k)
+    if use_rerank:
+        embedding = query_embedding if query_embedding is not None else embed_query(query)
+        candidates = min(RETRIEVAL_TOP_K_MAX, top_k * RERANK_CANDIDATE_MULTIPLIER)
+        return rerank(
+            query, embedding, _rerank_candidates(query, embedding, candidates, mode), max_k=top_k, cut_at_gap=False
+        )
+
+    if mode == "lexical":
+        return _lexical_search(query, top_k)
+
+    embedding = query_embedding if query_embedding is not None else embed_query(query)
+    if mode != "hybrid":
+        return [document for document, _ in _dense_search(embedding, top_k)]
+
+    candidates = min(RETRIEVAL_TOP_K_MAX, top_k * HYBRID_CANDIDATE_MULTIPLIER)
+    dense = [document for document, _ in _dense_search(embedding, candidates)]
+    lexical = _lexical_search(query, candidates)
+    return _reciprocal_rank_fusion([dense, lexical])[:top_k]
 
 
 def query_vectorstore_adaptive(
     query: str,
     max_top_k: int,
     relevance_threshold: float = 0.4,
+    query_embedding: list[float] | None = None,
+    mode: str = RETRIEVAL_MODE,
+    use_rerank: bool = False,
 ) -> list[Document]:
-    """Fetch up to max_top_k chunks and return those above the relevance threshold."""
+    """Fetch up to max_top_k chunks and return those above the relevance threshold.
+
+    The threshold applies to dense relevance scores. Lexical mode keeps BM25
+    hits within LEXICAL_RELATIVE_THRESHOLD of the best score; hybrid mode
+    fuses both filtered lists. With ``use_rerank`` the static threshold is
+    replaced by the reranker's score-gap cut-off.
+    """
     if max_top_k <= 0:
         return []
 
-    vectorstore = ensure_vectorstore_indexed()
     bounded_max_k = max(1, min(RETRIEVAL_TOP_K_MAX, max_top_k))
+    if use_rerank:
+        embedding = query_embedding if query_embedding is not None else embed_query(query)
+        return rerank(query, embedding, _rerank_candidates(query, embedding, bounded_max_k, mode), max_k=bounded_max_k)
+    if mode == "lexical":
+        return _lexical_search(query, bounded_max_k, LEXICAL_RELATIVE_THRESHOLD)
 
-    scored = vectorstore.similarity_search_with_relevance_scores(query, k=bounded_max_k)
-    if not scored:
-        return []
+    embedding = query_embedding if query_embedding is not None else embed_query(query)
+    scored = _dense_search(embedding, bounded_max_k)
+
+    dense: list[Document] = []
+    if scored:
+        scores = [score for _, score in scored]
+        adaptive_k = select_adaptive_topk(
+            similarity_scores=scores,
+            threshold=relevance_threshold,
+            max_k=bounded_max_k,
+        )
+        dense = [document for document, _ in scored[:adaptive_k]]
+
+    if mode != "hybrid":
+        return dense
+
+    lexical = _lexical_search(query, bounded_max_k, LEXICAL_RELATIVE_THRESHOLD)
+    return _reciprocal_rank_fusion([dense, lexical])[:bounded_max_k]
 
-    scores = [score for _, score in scored]
-    adaptive_k = select_adaptive_topk(
-        similarity_scores=scores,
-        threshold=relevance_threshold,
-        max_k=bounded_max_k,
-    )
 
-    return [document for document, _ in scored[:adaptive_k]]
+def query_vectorstore_batch(
+    queries: list[str],
+    top_k: int,
+    query_embeddings: list[list[float]] | None = None,
+) -> list[list[Document]]:
+    """Dense search for several queries in one backend call, results in query order."""
+    if top_k <= 0 or not queries:
+        return [[] for _ in queries]
+    embeddings = query_embeddings if query_embeddings is not None else embed_queries(queries)
+    return [[document for document, _ in scored] for scored in _dense_search_batch(embeddings, top_k)]
@@ -1,33 +1,199 @@
-"""Runtime settings persistence shared by standalone Streamlit apps."""
+"""Runtime settings persistence shared by standalone Streamlit apps.
+
+Settings live in one JSON file carrying a version number that every save
+increments. The file is replaced atomically, and each process keeps the
+parsed settings in memory, re-reading them only when the file changes.
+A watcher thread notices saves from other processes and calls subscribers,
+so caches that depend on the settings can be dropped immediately.
+"""
 
 import json
+import os
+import threading
+import time
+from collections.abc import Callable
 from pathlib import Path
 
-from config import ANALYTICS_DIR, RELEVANCE_THRESHOLD, RETRIEVAL_TOP_K, RETRIEVAL_TOP_K_MAX
+from config import (
+    ANALYTICS_DIR,
+    RELEVANCE_THRESHOLD,
+    RERANK_ENABLED,
+    RETRIEVAL_MODE,
+    RETRIEVAL_MODES,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_TOP_K_MAX,
+    RUNTIME_SETTINGS_WATCH_INTERVAL_SECONDS,
+)
 
 
 SETTINGS_PATH = ANALYTICS_DIR / "runtime_settings.json"
 
+SettingsListener = Callable[[dict[str, int | bool | float | str]], None]
+
 
-def _default_settings() -> dict[str, int | bool | float]:
-    return {"retrieval_top_k": RETRIEVAL_TOP_K, "auto_top_k": False, "relevance_threshold": RELEVANCE_THRESHOLD}
+def _default_settings() -> dict[str, int | bool | float | str]:
+    return {
+        "retrieval_top_k": RETRIEVAL_TOP_K,
+        "auto_top_k": False,
+        "relevance_threshold": RELEVANCE_THRESHOLD,
+        "retrieval_mode": RETRIEVAL_MODE,
+        "rerank": RERANK_ENABLED,
+    }
 
 
-def load_runtime_settings() -> dict[str, int | bool]:
-    """Load persisted runtime settings with safe defaults."""
-    if not SETTINGS_PATH.exists():
-        return _default_settings()
+def _normalize_mode(mode: object) -> str:
+    return mode if mode in RETRIEVAL_MODES else RETRIEVAL_MODE
 
+
+def _read_settings(path: Path) -> tuple[int, dict[str, int | bool | float | str]]:
+    """Parse the settings file into (version, settings) with safe defaults."""
     try:
-        data = json.loads(SETTINGS_PATH.read_text(encoding="utf-8"))
+        data = json.loads(path.read_text(encoding="utf-8"))
+        version = int(data.get("version", 0))
         value = int(data.get("retrieval_top_k", RETRIEVAL_TOP_K))
         value = max(1, min(RETRIEVAL_TOP_K_MAX, value))
         auto_top_k = bool(data.get("auto_top_k", False))
         threshold = float(data.get("relevance_threshold", RELEVANCE_THRESHOLD))
         threshold = max(0.0, min(0.2, threshold))
-        return {"retrieval_top_k": value, "auto_top_k": auto_top_k, "relevance_threshold": threshold}
+        mode = _normalize_mode(data.get("retrieval_mode", RETRIEVAL_MODE))
+        rerank = bool(data.get("rerank", RERANK_ENABLED))
+        return version, {
+            "retrieval_top_k": value,
+            "auto_top_k": auto_top_k,
+            "relevance_threshold": threshold,
+            "retrieval_mode": mode,
+            "rerank": rerank,
+        }
     except Exception:
-        return _default_settings()
+        return 0, _default_settings()
+
+
+class RuntimeSettingsStore:
+    """In-memory view of the settings file, refreshed when the file changes.
+
+    A change is detected from the file's inode, size and mtime, which a
+    stat call returns without reading the file; saves always replace the
+    file, so the inode changes even when the mtime resolution is coarse.
+    """
+
+    def __init__(self, path: Path = SETTINGS_PATH) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._signature: tuple[int, int, int] | None = None
+        self._version = 0
+        self._settings = _default_settings()
+        self._notified: tuple[int, dict] = (0, dict(self._settings))
+        self._listeners: list[SettingsListener] = []
+        self._watcher: threading.Thread | None = None
+
+    @property
+    def version(self) -> int:
+        self.refresh()
+        return self._version
+
+    def _stat_signature(self) -> tuple[int, int, int] | None:
+        try:
+            stat = self._path.stat()
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """Reload the settings if the file changed; returns True on a new version."""
+        signature = self._stat_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._signature = signature
+                if signature is None:
+                    self._version, self._settings = 0, _default_settings()
+                else:
+                    self._version, self._settings = _read_settings(self._path)
+        return self._notify()
+
+    def _notify(self) -> bool:
+        with self._lock:
+            # Settings are compared too, so a hand edit that keeps the version still propagates.
+            if (self._version, self._settings) == self._notified:
+                return False
+            settings = dict(self._settings)
+            self._notified = (self._version, settings)
+            listeners = list(self._listeners)
+        # Listeners run outside the lock so they may read the store themselves.
+        for listener in listeners:
+            try:
+                listener(dict(settings))
+            except Exception:
+                # One faulty listener must not stop the others.
+                pass
+        return True
+
+    def get(self) -> dict[str, int | bool | float | str]:
+        """Return a copy of the current settings."""
+        self.refresh()
+        with self._lock:
+            return dict(self._settings)
+
+    def save(self, settings: dict[str, int | bool | float | str]) -> int:
+        """Write ``settings`` as the next version and return that version."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            current, _ = _read_settings(self._path)
+            version = max(current, self._version) + 1
+            tmp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(
+                json.dumps({"version": version, **settings}, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, self._path)
+        self.refresh()
+        return version
+
+    def subscribe(self, listener: SettingsListener) -> Callable[[], None]:
+        """Call ``listener`` with the new settings after every later change.
+
+        Starts the watcher thread on first use. Returns an unsubscribe function.
+        """
+        self.refresh()
+        with self._lock:
+            self._listeners.append(listener)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="runtime-settings-watcher", daemon=True)
+                self._watcher.start()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(RUNTIME_SETTINGS_WATCH_INTERVAL_SECONDS)
+            self.refresh()
+
+
+_STORE = RuntimeSettingsStore()
+
+
+def get_settings_store() -> RuntimeSettingsStore:
+    """Return the process-wide runtime settings store."""
+    return _STORE
+
+
+def load_runtime_settings() -> dict[str, int | bool | float | str]:
+    """Return the current runtime settings; reads the file only after a change."""
+    return _STORE.get()
+
+
+def get_runtime_settings_version() -> int:
+    """Return the version of the current settings (0 before the first save)."""
+    return _STORE.version
+
+
+def subscribe_runtime_settings(listener: SettingsListener) -> Callable[[], None]:
+    """Register ``listener`` for settings changes from this or any other process."""
+    return _STORE.subscribe(listener)
 
 
 def save_runtime_settings(
@@ -35,16 +201,18 @@ def save_runtime_settings(
     retrieval_top_k: int,
     auto_top_k: bool = False,
     relevance_threshold: float = RELEVANCE_THRESHOLD,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    rerank: bool = RERANK_ENABLED,
 ) -> None:
     """Persist runtime settings for cross-app usage."""
-    ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
     value = max(1, min(RETRIEVAL_TOP_K_MAX, int(retrieval_top_k)))
     threshold = max(0.0, min(0.2, float(relevance_threshold)))
-    SETTINGS_PATH.write_text(
-        json.dumps(
-            {"retrieval_top_k": value, "auto_top_k": bool(auto_top_k), "relevance_threshold": threshold},
-            ensure_ascii=False,
-            indent=2,
-        ),
-        encoding="utf-8",
+    _STORE.save(
+        {
+            "retrieval_top_k": value,
+            "auto_top_k": bool(auto_top_k),
+            "relevance_threshold": threshold,
+            "retrieval_mode": _normalize_mode(retrieval_mode),
+            "rerank": bool(rerank),
+        }
     )
@@ -0,0 +1,12 @@
+"""Shared test setup: import from src/ and run on the offline stub backend."""
+
+import os
+import sys
+from pathlib import Path
+
+# Must be set before config is imported; keeps tests away from Ollama and the real data.
+os.environ.setdefault("MODEL_BACKEND", "stub")
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,30 @@
+"""Tests for the semantic answer cache."""
+
+from generation.answer_cache import CachedAnswer, SemanticAnswerCache
+
+
+def _answer(text: str) -> CachedAnswer:
+    return CachedAnswer(answer=text, sources=[], num_chunks=0)
+
+
+def test_entries_only_match_their_own_fingerprint():
+    cache = SemanticAnswerCache(max_entries=4)
+    cache.store([1.0, 0.0], ("v1",), _answer("old"))
+    cache.store([1.0, 0.0], ("v2",), _answer("new"))
+
+    assert cache.lookup([1.0, 0.0], ("v2",)).answer == "new"
+    # A request still running under the old fingerprint does not wipe the new entries.
+    assert cache.lookup([1.0, 0.0], ("v1",)).answer == "old"
+    assert cache.lookup([1.0, 0.0], ("v2",)).answer == "new"
+    assert cache.lookup([1.0, 0.0], ("v3",)) is None
+
+
+def test_outdated_entries_are_evicted_first():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store([1.0, 0.0], ("v1",), _answer("old"))
+    cache.store([0.0, 1.0], ("v2",), _answer("a"))
+    cache.lookup([0.0, 1.0], ("v2",))
+    cache.store([1.0, 0.0], ("v2",), _answer("b"))
+
+    assert len(cache) == 2
+    assert cache.lookup([1.0, 0.0], ("v1",)) is None
@@ -0,0 +1,41 @@
+"""Tests for the chat API client."""
+
+import httpx
+
+from api.client import LLM_UNREACHABLE_MESSAGE, ChatApiClient
+
+
+def _client(body: str) -> ChatApiClient:
+    client = ChatApiClient(base_url="http://chat.test")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text=body))
+    client._http = httpx.Client(base_url="http://chat.test", transport=transport)
+    return client
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def test_stream_cut_before_done_keeps_the_streamed_text():
+    body = _sse("token", '{"text": "Opening "}') + _sse("token", '{"text": "hours"}')
+    stream = _client(body).stream_chat("When are you open?", [])
+
+    assert list(stream) == ["Opening ", "hours"]
+    assert stream.answer == "Opening hours"
+
+
+def test_empty_stream_without_done_reports_the_failure():
+    stream = _client("").stream_chat("When are you open?", [])
+
+    assert list(stream) == []
+    assert stream.answer == LLM_UNREACHABLE_MESSAGE
+
+
+def test_done_event_sets_the_final_answer():
+    body = _sse("token", '{"text": "draft"}') + _sse(
+        "done", '{"answer": "final", "sources": ["a.pdf"], "num_chunks": 1}'
+    )
+    stream = _client(body).stream_chat("When are you open?", [])
+
+    assert list(stream) == ["draft"]
+    assert (stream.answer, stream.sources, stream.num_chunks) == ("final", ["a.pdf"], 1)
@@ -0,0 +1,63 @@
+"""Tests for chat pipeline start-up behaviour."""
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+from generation import chain
+from generation.answer_cache import CachedAnswer, get_answer_cache
+
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def test_importing_the_chain_starts_no_settings_watcher():
+    script = (
+        "import threading\n"
+        "import generation.chain\n"
+        "print(sorted(thread.name for thread in threading.enumerate()))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    assert "runtime-settings-watcher" not in result.stdout
+
+
+def test_watching_settings_clears_cached_answers(monkeypatch):
+    listeners = []
+
+    def subscribe(listener):
+        listeners.append(listener)
+        return lambda: None
+
+    monkeypatch.setattr(chain, "subscribe_runtime_settings", subscribe)
+    cache = get_answer_cache()
+    cache.store([1.0, 0.0], ("v1",), CachedAnswer(answer="old", sources=[], num_chunks=0))
+
+    chain.watch_runtime_settings()
+    listeners[0]({"retrieval_top_k": 3})
+
+    assert len(cache) == 0
+
+
+def test_failed_cache_fingerprint_yields_the_error_message(monkeypatch):
+    def fail():
+        raise OSError("manifest unreadable")
+
+    monkeypatch.setattr(chain, "get_index_version", fail)
+    monkeypatch.setattr(chain, "ROUTER_ENABLED", False)
+    counted = []
+    monkeypatch.setattr(chain, "increment_counter", lambda name, value=1: counted.append(name))
+    stream = chain.AsyncChatStream(
+        "What are the library opening hours?",
+        top_k=4,
+        auto_top_k=False,
+        relevance_threshold=0.0,
+        retrieval_mode="dense",
+    )
+
+    async def collect():
+        return [text async for text in stream]
+
+    assert asyncio.run(collect()) == [chain.LLM_ERROR_MESSAGE]
+    assert stream.answer == chain.LLM_ERROR_MESSAGE
+    assert "answer_cache.fingerprint_failed" in counted
@@ -0,0 +1,26 @@
+"""Tests for the clustering-side query embedding store."""
+
+import sqlite3
+
+from analytics import clustering
+from retrieval import vectorstore
+
+
+def test_clustered_queries_are_embedded_once_and_kept(tmp_path, monkeypatch):
+    calls = []
+
+    def embed_queries(queries, *, remember=True):
+        calls.append((list(queries), remember))
+        return [[float(len(query)), 1.0] for query in queries]
+
+    monkeypatch.setattr(vectorstore, "embed_queries", embed_queries)
+    conn = sqlite3.connect(tmp_path / "analytics.db")
+    clustering._ensure_cluster_tables(conn)
+
+    first = clustering._embed_with_cache(conn, ["brake noise", "oil change"])
+    second = clustering._embed_with_cache(conn, ["oil change", "brake noise"])
+
+    assert calls == [(["brake noise", "oil change"], False)]
+    assert (first[[1, 0]] == second).all()
+    clustering._ensure_cluster_tables(conn)
+    assert conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0] == 2
@@ -0,0 +1,104 @@
+"""Request coalescing when the leader or a follower stops reading."""
+
+import asyncio
+
+import pytest
+
+import generation.chain as chain
+from generation.coalescing import get_request_coalescer
+
+WORDS = ["Warranty ", "lasts ", "three ", "years ", "or ", "100,000 ", "km."]
+
+
+@pytest.fixture
+def slow_model(monkeypatch):
+    """Replace the chat model with a slow fake that records calls and aborts."""
+    calls = {"started": 0, "finished": 0, "aborted": 0}
+
+    async def fake_stream(*, inspector, **kwargs):
+        calls["started"] += 1
+        try:
+            for word in WORDS:
+                await asyncio.sleep(0.02)
+                inspector.feed(word)
+                yield word
+        except (asyncio.CancelledError, GeneratorExit):
+            calls["aborted"] += 1
+            raise
+        calls["finished"] += 1
+
+    monkeypatch.setattr(chain, "_astream_chat_model", fake_stream)
+    return calls
+
+
+async def _consume(question, received=None):
+    stream = chain.astream_chat_response(question, [])
+    async for text in stream:
+        if received is not None:
+            received.append(text)
+    return stream
+
+
+async def _first_chunk(received):
+    while not received:
+        await asyncio.sleep(0.005)
+
+
+def test_follower_gets_full_answer_when_leader_is_cancelled(slow_model):
+    question = "How long is the standard vehicle warranty, leader leaves?"
+
+    async def scenario():
+        leader_received = []
+        leader = asyncio.create_task(_consume(question, leader_received))
+        await _first_chunk(leader_received)
+        follower = asyncio.create_task(_consume(question))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        stream = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return stream
+
+    stream = asyncio.run(scenario())
+    assert stream.coalesced
+    assert stream.answer != chain.LLM_ERROR_MESSAGE
+    assert slow_model == {"started": 1, "finished": 1, "aborted": 0}
+    assert len(get_request_coalescer()) == 0
+
+
+def test_leader_finishes_when_follower_is_cancelled(slow_model):
+    question = "How long is the standard vehicle warranty, follower leaves?"
+
+    async def scenario():
+        leader_received = []
+        leader = asyncio.create_task(_consume(question, leader_received))
+        await _first_chunk(leader_received)
+        follower = asyncio.create_task(_consume(question))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader, leader_received
+
+    stream, received = asyncio.run(scenario())
+    assert not stream.coalesced
+    assert "".join(received) == "".join(WORDS)
+    assert slow_model == {"started": 1, "finished": 1, "aborted": 0}
+
+
+def test_model_call_is_aborted_when_every_consumer_leaves(slow_model):
+    question = "How long is the standard vehicle warranty, everyone leaves?"
+
+    async def scenario():
+        received = []
+        consumer = asyncio.create_task(_consume(question, received))
+        await _first_chunk(received)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert slow_model["aborted"] == 1
+    assert slow_model["finished"] == 0
+    assert len(get_request_coalescer()) == 0
@@ -0,0 +1,34 @@
+"""Tests for packing retrieved chunks into the prompt context."""
+
+from langchain_core.documents import Document
+
+from generation.context_packer import pack_context
+from generation.prompts import estimate_tokens
+
+
+def _doc(text: str, source: str = "a.txt") -> Document:
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_budget_truncation_is_not_counted_as_saved():
+    chunks = [_doc("brake fluid " * 20, "a.txt"), _doc("tyre rotation " * 20, "b.txt")]
+    budget = estimate_tokens(chunks[0].page_content.strip())
+
+    packed = pack_context(chunks, token_budget=budget)
+
+    assert packed.tokens_saved == 0
+    assert packed.tokens_over_budget == estimate_tokens(chunks[1].page_content.strip())
+    assert packed.over_budget == 1
+
+
+def test_duplicates_and_merges_count_as_saved():
+    first = "Change the engine oil every 10000 km. Use the grade listed in the manual."
+    follow = "Use the grade listed in the manual. Check the level monthly."
+    chunks = [_doc(first), _doc(follow), _doc(first, "copy.txt")]
+
+    packed = pack_context(chunks, token_budget=1000)
+
+    assert packed.merged == 1 and packed.duplicates == 1
+    assert packed.tokens_over_budget == 0
+    merged_extra = packed.tokens - estimate_tokens(first)
+    assert packed.tokens_saved == estimate_tokens(follow) - merged_extra + estimate_tokens(first)
@@ -0,0 +1,60 @@
+"""Tests for the shared query embedding cache."""
+
+from langchain_core.embeddings import Embeddings
+
+from retrieval.embedding_cache import CachedQueryEmbeddings
+
+
+class _CountingEmbeddings(Embeddings):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_batch_and_single_queries_share_entries(tmp_path):
+    inner = _CountingEmbeddings()
+    cache = CachedQueryEmbeddings(inner, model="test", path=tmp_path / "cache.npz")
+
+    single = cache.embed_query("brake  noise")
+    batch = cache.embed_queries(["brake noise", "oil change", "oil change "])
+
+    assert batch[0] == single
+    assert batch[1] == batch[2]
+    # The batch only embeds the miss, once and in a single request.
+    assert inner.calls == [["brake noise"], ["oil change"]]
+    assert cache.embed_query("oil change") == batch[1]
+    assert len(inner.calls) == 2
+
+
+def test_queries_embedded_without_remember_are_not_stored(tmp_path):
+    inner = _CountingEmbeddings()
+    cache = CachedQueryEmbeddings(inner, model="test", path=tmp_path / "cache.npz")
+    chat = cache.embed_query("brake noise")
+
+    vectors = cache.embed_queries(["brake noise", "oil change"], remember=False)
+
+    assert vectors[0] == chat
+    assert inner.calls == [["brake noise"], ["oil change"]]
+    assert len(cache) == 1
+
+
+def test_saves_from_several_processes_merge(tmp_path):
+    path = tmp_path / "cache.npz"
+    first = CachedQueryEmbeddings(_CountingEmbeddings(), model="test", path=path, max_entries=3)
+    second = CachedQueryEmbeddings(_CountingEmbeddings(), model="test", path=path, max_entries=3)
+    first.embed_query("brake noise")
+    second.embed_query("oil change")
+    second.embed_query("wiper blades")
+
+    first.save()
+    second.save()
+
+    reloaded = CachedQueryEmbeddings(_CountingEmbeddings(), model="test", path=path, max_entries=3)
+    assert len(reloaded) == 3
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,51 @@
+"""Follow-up detection and standalone retrieval queries."""
+
+import pytest
+
+from generation.history import is_follow_up, standalone_query
+
+
+SERVICE_WINDOW = [
+    {"role": "user", "content": "How often should I service my car?"},
+    {"role": "assistant", "content": "Every 15,000 km or once a year."},
+]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "and for EVs?",
+        "What about the battery?",
+        "Does it cover paint?",
+        "How much does that cost?",
+        "how much?",
+        "for electric vehicles?",
+        "Why?",
+        "Are those included?",
+    ],
+)
+def test_follow_ups(text):
+    assert is_follow_up(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "What is the warranty?",
+        "Warranty duration?",
+        "Tell me about charging",
+        "How do I order?",
+        "Contact customer support",
+        "What documents do I need to bring when I pick up the new vehicle from a dealer?",
+    ],
+)
+def test_new_questions_are_not_follow_ups(text):
+    assert not is_follow_up(text)
+
+
+def test_short_new_question_is_not_merged_with_previous_turn():
+    assert standalone_query("What is the warranty?", SERVICE_WINDOW) == "What is the warranty?"
+
+
+def test_follow_up_is_condensed_with_previous_question():
+    assert standalone_query("and for EVs?", SERVICE_WINDOW) == "How often should I service my car for EVs?"
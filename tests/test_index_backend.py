@@ -0,0 +1,82 @@
+"""Tests for the dense index backends."""
+
+import json
+
+import numpy as np
+import pytest
+
+from retrieval.index_backend import ChromaIndex, FlatMmapIndex, VectorIndexBackend
+
+
+def _save(directory, ids, seed):
+    vectors = np.random.default_rng(seed).random((len(ids), 4), dtype=np.float32)
+    FlatMmapIndex.save(ids, vectors, manifest_version=seed, directory=directory)
+    return vectors
+
+
+def test_flat_index_loads_the_latest_generation(tmp_path):
+    _save(tmp_path, ["a", "b"], 1)
+    _save(tmp_path, ["a", "b", "c"], 2)
+    vectors = _save(tmp_path, ["c"], 3)
+
+    index = FlatMmapIndex.load(tmp_path)
+
+    assert list(index.ids) == ["c"] and index.manifest_version == 3
+    assert np.array_equal(np.asarray(index._vectors), vectors)
+    # The current and the previous generation are kept, older ones removed.
+    assert len(list(tmp_path.glob("*.npy"))) == 6
+
+
+def test_flat_index_never_mixes_generations(tmp_path):
+    _save(tmp_path, ["a", "b"], 1)
+    meta = json.loads((tmp_path / "meta.json").read_text(encoding="utf-8"))
+    _save(tmp_path, ["a", "b"], 2)
+    # A reader holding the old meta.json still maps the old arrays, not the new ones.
+    (tmp_path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    assert FlatMmapIndex.load(tmp_path).manifest_version == 1
+
+    meta["generation"] = "missing"
+    (tmp_path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+    assert FlatMmapIndex.load(tmp_path) is None
+
+
+class _FakeCollection:
+    def __init__(self) -> None:
+        self.queries = []
+
+    def query(self, *, query_embeddings, n_results, include):
+        self.queries.append(include)
+        return {
+            "ids": [["a"]],
+            "documents": [["Check the oil."]],
+            "metadatas": [[{"source": "oil.txt"}]],
+            "distances": [[0.25]],
+        }
+
+
+def test_chroma_index_returns_documents_from_one_query():
+    collection = _FakeCollection()
+
+    def fetch(chunk_ids):
+        raise AssertionError("documents should come with the query")
+
+    hits = ChromaIndex(collection).search_documents_batch(np.zeros((1, 4), dtype=np.float32), 1, fetch)
+
+    [[(document, distance)]] = hits
+    assert (document.page_content, document.metadata, distance) == ("Check the oil.", {"source": "oil.txt"}, 0.25)
+    assert collection.queries == [["documents", "metadatas", "distances"]]
+
+
+def test_backends_must_implement_search_and_stats():
+    with pytest.raises(TypeError):
+        VectorIndexBackend()
+
+
+def test_flat_index_search_returns_string_ids(tmp_path):
+    vectors = np.eye(3, dtype=np.float32)
+    FlatMmapIndex.save(["a", "bb", "ccc"], vectors, manifest_version=1, directory=tmp_path)
+
+    hits = FlatMmapIndex.load(tmp_path).search(vectors[1], 2)
+
+    assert hits[0] == ("bb", 0.0) and type(hits[0][0]) is str
+    assert len(FlatMmapIndex.load(tmp_path)) == 3
@@ -0,0 +1,27 @@
+"""Tests for loading knowledge base files."""
+
+import pytest
+
+from ingestion.loader import iter_documents
+
+
+def _write_files(tmp_path):
+    (tmp_path / "a.txt").write_text("Check the tyre pressure monthly.", encoding="utf-8")
+    (tmp_path / "b.txt").write_bytes(b"\xff\xfe not utf-8")
+    (tmp_path / "c.txt").write_text("Replace wiper blades every year.", encoding="utf-8")
+    return [tmp_path / name for name in ("a.txt", "b.txt", "c.txt")]
+
+
+def test_unreadable_file_is_reported_and_skipped(tmp_path):
+    failed = []
+    documents = list(
+        iter_documents(_write_files(tmp_path), root=tmp_path, on_error=lambda path, exc: failed.append(path.name))
+    )
+
+    assert [document.metadata["source"] for document in documents] == ["a.txt", "c.txt"]
+    assert failed == ["b.txt"]
+
+
+def test_unreadable_file_raises_without_error_handler(tmp_path):
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_documents(_write_files(tmp_path), root=tmp_path))
@@ -0,0 +1,21 @@
+"""Tests for buffered runtime metrics."""
+
+import threading
+import time
+
+from analytics import metrics
+
+
+def test_recording_never_flushes_on_the_caller_thread(monkeypatch):
+    flushed_on = []
+    monkeypatch.setattr(metrics, "METRICS_FLUSH_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(metrics, "_FLUSHER", None)
+    monkeypatch.setattr(metrics, "flush_metrics", lambda: flushed_on.append(threading.current_thread().name))
+
+    metrics.increment_counter("test.counter")
+    metrics.set_gauge("test.gauge", 1.0)
+    deadline = time.monotonic() + 2
+    while not flushed_on and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert flushed_on and set(flushed_on) == {"metrics-flusher"}
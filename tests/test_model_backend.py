@@ -0,0 +1,47 @@
+"""Model client construction and keep-alive parsing."""
+
+import pytest
+
+import model_backend
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"),
+    [("30m", 1800), ("1h30m", 5400), ("90s", 90), ("300", 300), ("-1", -1), ("-1m", -1), ("0", 0)],
+)
+def test_keep_alive_seconds(monkeypatch, value, seconds):
+    monkeypatch.setattr(model_backend, "OLLAMA_KEEP_ALIVE", value)
+    assert model_backend._keep_alive_seconds() == seconds
+
+
+@pytest.mark.parametrize("value", ["", "soon", "30x", "m"])
+def test_keep_alive_rejects_garbage(monkeypatch, value):
+    monkeypatch.setattr(model_backend, "OLLAMA_KEEP_ALIVE", value)
+    with pytest.raises(ValueError):
+        model_backend._keep_alive_seconds()
+
+
+def test_ollama_clients_build_with_default_config(monkeypatch):
+    # Building the clients validates their fields without contacting the server.
+    monkeypatch.setattr(model_backend, "MODEL_BACKEND", "ollama")
+    monkeypatch.setattr(model_backend, "OLLAMA_KEEP_ALIVE", "30m")
+    assert model_backend.create_embeddings().keep_alive == 1800
+    assert model_backend.create_chat_model(temperature=0.2).keep_alive == 1800
+
+
+def test_sync_requests_share_one_pooled_chat_model(monkeypatch):
+    from generation.chain import generate_chat_response, stream_chat_response
+
+    built = []
+    create_chat_model = model_backend.create_chat_model
+
+    def counting_create_chat_model(**kwargs):
+        built.append(kwargs)
+        return create_chat_model(**kwargs)
+
+    monkeypatch.setattr(model_backend, "create_chat_model", counting_create_chat_model)
+    monkeypatch.setattr(model_backend, "_LOOP_CHAT_MODELS", {})
+    for question in ("How long is the warranty?", "How often should I service my car?"):
+        assert "".join(stream_chat_response(question, [], use_cache=False))
+        assert generate_chat_response(question, [], use_cache=False)[0]
+    assert len(built) == 1
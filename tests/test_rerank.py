@@ -0,0 +1,53 @@
+"""Tests for reranking retrieval candidates."""
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from retrieval import rerank as rerank_module
+from retrieval.rerank import Candidate, Reranker, rerank
+
+
+class _FixedReranker(Reranker):
+    name = "fixed"
+
+    def __init__(self, scores: dict[str, float]) -> None:
+        self._scores = scores
+
+    def score(self, query, query_embedding, candidates):
+        return np.array([self._scores[candidate.chunk_id] for candidate in candidates], dtype=np.float32)
+
+
+def _candidates(*chunk_ids: str) -> list[Candidate]:
+    return [Candidate(chunk_id=chunk_id, document=Document(page_content=f"chunk {chunk_id}")) for chunk_id in chunk_ids]
+
+
+def test_reranker_requires_score():
+    with pytest.raises(TypeError):
+        Reranker()
+
+
+def test_gap_cut_applies_only_when_requested():
+    reranker = _FixedReranker({"a": 0.9, "b": 0.85, "c": 0.2, "d": 0.1})
+    candidates = _candidates("a", "b", "c", "d")
+
+    cut = rerank("gap query", [1.0], candidates, max_k=3, reranker=reranker)
+    fixed = rerank("gap query", [1.0], candidates, max_k=3, cut_at_gap=False, reranker=reranker)
+
+    assert [document.page_content for document in cut] == ["chunk a", "chunk b"]
+    assert [document.page_content for document in fixed] == ["chunk a", "chunk b", "chunk c"]
+
+
+def test_failed_cross_encoder_load_is_counted(monkeypatch):
+    counted = []
+
+    def fail(model_name):
+        raise OSError("model not found")
+
+    monkeypatch.setattr(rerank_module, "_RERANKER", None)
+    monkeypatch.setattr(rerank_module, "RERANK_CROSS_ENCODER_MODEL", "missing-model")
+    monkeypatch.setattr(rerank_module, "CrossEncoderReranker", fail)
+    monkeypatch.setattr(rerank_module, "increment_counter", counted.append)
+
+    assert rerank_module.get_reranker().name == "cosine+overlap"
+    assert counted == ["rerank.cross_encoder_load_failed"]
@@ -0,0 +1,45 @@
+"""Intent routing of the curated testcases and of automotive look-alikes."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from generation.router import RAG_ROUTE, route_query
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+from run_testcases import parse_testcases  # noqa: E402
+
+
+CATEGORY_ROUTES = {
+    "SML": "smalltalk",
+    "CRI": "crisis",
+    "SEC": "injection",
+    "OOT": "off_topic",
+    "RAG+": RAG_ROUTE,
+    "RAG-": RAG_ROUTE,
+}
+
+# Ordinary customer questions that share wording with crisis or injection patterns.
+AUTOMOTIVE_QUESTIONS = [
+    "My car can't go on the motorway after the update",
+    "Does the EV warranty have no limitations on mileage?",
+    "Can I drive without restrictions after the first service?",
+    "You are now my favourite dealer, when does my order arrive?",
+    "What are the exact instructions for pairing my phone with the infotainment system?",
+    "How do I disable safety alerts for the parking sensors on my vehicle?",
+    "Are there no rules about towing with the SUV?",
+    "Pretend to be a new customer: what does the first service cost?",
+    "My battery is dead and the car can't go on, who do I call?",
+    "Hi, how long is the warranty?",
+]
+
+
+@pytest.mark.parametrize("case", parse_testcases(), ids=lambda case: case.question[:40])
+def test_testcases_route_by_category(case):
+    assert route_query(case.question).name == CATEGORY_ROUTES[case.category]
+
+
+@pytest.mark.parametrize("question", AUTOMOTIVE_QUESTIONS)
+def test_automotive_questions_take_rag_route(question):
+    assert route_query(question).name == RAG_ROUTE
@@ -0,0 +1,169 @@
+"""Cross-process admission and priority order of the LLM scheduler."""
+
+import asyncio
+import multiprocessing
+import sqlite3
+import time
+from contextlib import ExitStack, contextmanager
+
+import pytest
+
+from generation import scheduler as scheduler_module
+from generation.scheduler import DeadlineExceeded, LLMScheduler, Priority, QueueFull
+
+_FORK = multiprocessing.get_context("fork")
+
+
+def _take_slot(db_path, priority, hold_seconds, granted_at):
+    scheduler = LLMScheduler(max_concurrency=1, db_path=db_path)
+    with scheduler.slot(Priority(priority)):
+        granted_at.value = time.monotonic()
+        time.sleep(hold_seconds)
+
+
+def _wait_for_queue(scheduler, depth, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while scheduler.queue_depth < depth:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.01)
+
+
+def test_chat_in_another_process_overtakes_queued_background(tmp_path):
+    db_path = tmp_path / "scheduler.db"
+    scheduler = LLMScheduler(max_concurrency=1, db_path=db_path)
+    background_at = _FORK.Value("d", 0.0)
+    chat_at = _FORK.Value("d", 0.0)
+
+    with scheduler.slot(Priority.BACKGROUND):
+        background = _FORK.Process(target=_take_slot, args=(db_path, Priority.BACKGROUND, 0.0, background_at))
+        background.start()
+        _wait_for_queue(scheduler, 1)
+        chat = _FORK.Process(target=_take_slot, args=(db_path, Priority.CHAT, 0.2, chat_at))
+        chat.start()
+        _wait_for_queue(scheduler, 2)
+    background.join(5)
+    chat.join(5)
+
+    assert chat_at.value and background_at.value
+    assert chat_at.value < background_at.value
+    assert scheduler.active == scheduler.queue_depth == 0
+
+
+def test_queue_depth_is_shared_between_processes(tmp_path):
+    db_path = tmp_path / "scheduler.db"
+    scheduler = LLMScheduler(max_concurrency=1, max_queue_depth=1, db_path=db_path)
+    granted_at = _FORK.Value("d", 0.0)
+
+    with scheduler.slot(Priority.CHAT):
+        waiter = _FORK.Process(target=_take_slot, args=(db_path, Priority.CHAT, 0.0, granted_at))
+        waiter.start()
+        _wait_for_queue(scheduler, 1)
+        with pytest.raises(QueueFull):
+            with scheduler.slot(Priority.CHAT):
+                pass
+    waiter.join(5)
+    assert granted_at.value
+
+
+def test_slots_of_dead_processes_are_reclaimed(tmp_path):
+    db_path = tmp_path / "scheduler.db"
+    scheduler = LLMScheduler(max_concurrency=1, db_path=db_path)
+    holder = _FORK.Process(target=_take_slot, args=(db_path, Priority.CHAT, 60.0, _FORK.Value("d", 0.0)))
+    holder.start()
+    while scheduler.active < 1:
+        time.sleep(0.01)
+    holder.kill()
+    holder.join(5)
+
+    with scheduler.slot(Priority.CHAT, deadline=time.monotonic() + 2.0):
+        assert scheduler.active == 1
+
+
+def test_background_leaves_the_last_slot_to_chat(tmp_path):
+    scheduler = LLMScheduler(max_concurrency=4, db_path=tmp_path / "scheduler.db")
+
+    with ExitStack() as stack:
+        for _ in range(3):
+            stack.enter_context(scheduler.slot(Priority.BACKGROUND))
+        with pytest.raises(DeadlineExceeded):
+            with scheduler.slot(Priority.BACKGROUND, deadline=time.monotonic() + 0.2):
+                pass
+        with scheduler.slot(Priority.CHAT, deadline=time.monotonic() + 0.2):
+            assert scheduler.active == 4
+
+
+def test_single_slot_is_not_reserved(tmp_path):
+    scheduler = LLMScheduler(max_concurrency=1, db_path=tmp_path / "scheduler.db")
+
+    with scheduler.slot(Priority.BACKGROUND, deadline=time.monotonic() + 0.2):
+        assert scheduler.active == 1
+
+
+def test_locked_database_does_not_stall_the_event_loop(tmp_path):
+    db_path = tmp_path / "scheduler.db"
+    scheduler = LLMScheduler(max_concurrency=1, db_path=db_path)
+    assert scheduler.active == 0
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+
+    async def main() -> int:
+        ticks = 0
+
+        async def take_slot() -> None:
+            async with scheduler.aslot(Priority.CHAT):
+                pass
+
+        task = asyncio.create_task(take_slot())
+        asyncio.get_running_loop().call_later(0.3, blocker.rollback)
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        await task
+        return ticks
+
+    assert asyncio.run(main()) >= 10
+    assert scheduler.active == scheduler.queue_depth == 0
+
+
+def test_failed_release_is_retried_by_the_next_enqueue(tmp_path, monkeypatch):
+    scheduler = LLMScheduler(max_concurrency=1, db_path=tmp_path / "scheduler.db")
+    monkeypatch.setattr(scheduler_module, "_RELEASE_ATTEMPTS", 2)
+    connect = scheduler._connect
+
+    @contextmanager
+    def locked():
+        raise sqlite3.OperationalError("database is locked")
+        yield
+
+    with scheduler.slot(Priority.CHAT):
+        monkeypatch.setattr(scheduler, "_connect", locked)
+    monkeypatch.setattr(scheduler, "_connect", connect)
+    assert scheduler.active == 1
+
+    with scheduler.slot(Priority.CHAT, deadline=time.monotonic() + 0.2):
+        assert scheduler.active == 1
+    assert scheduler.active == 0
+
+
+def test_cancelled_enqueue_does_not_leak_its_ticket(tmp_path):
+    db_path = tmp_path / "scheduler.db"
+    scheduler = LLMScheduler(max_concurrency=1, db_path=db_path)
+    assert scheduler.active == 0
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute("BEGIN EXCLUSIVE")
+
+    async def main() -> None:
+        async def take_slot() -> None:
+            async with scheduler.aslot(Priority.CHAT):
+                await asyncio.sleep(60)
+
+        task = asyncio.create_task(take_slot())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        blocker.rollback()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.5)
+
+    asyncio.run(main())
+    assert scheduler.active == scheduler.queue_depth == 0
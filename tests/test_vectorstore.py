@@ -0,0 +1,134 @@
+"""Tests for building and sharing the vector store indexes."""
+
+import threading
+import time
+
+from retrieval import vectorstore
+from retrieval.lexical import BM25Index
+
+
+class _FakeCollection:
+    def __init__(self, ids: list[str]) -> None:
+        self._ids = ids
+
+    def count(self) -> int:
+        return len(self._ids)
+
+
+class _FakeStore:
+    def __init__(self, texts: dict[str, str]) -> None:
+        self._texts = texts
+        self._collection = _FakeCollection(list(texts))
+
+    def get(self, include: list[str]) -> dict:
+        return {"ids": list(self._texts), "documents": list(self._texts.values())}
+
+
+def test_stale_lexical_index_is_rebuilt_and_persisted(tmp_path, monkeypatch):
+    path = tmp_path / "lexical_index.json.gz"
+    stale = BM25Index()
+    stale.add("a", "brake pads")
+    stale.save(path)
+
+    store = _FakeStore({"a": "brake pads", "b": "engine oil change"})
+    monkeypatch.setattr(vectorstore, "get_vectorstore", lambda: store)
+    monkeypatch.setattr(vectorstore, "_LEXICAL_INDEX", None)
+    save, load = BM25Index.save, BM25Index.load
+    monkeypatch.setattr(BM25Index, "save", lambda self: save(self, path))
+    monkeypatch.setattr(BM25Index, "load", classmethod(lambda cls: load(path)))
+
+    index = vectorstore._get_lexical_index()
+
+    assert len(index) == 2
+    assert len(load(path)) == 2
+
+
+def test_concurrent_first_use_builds_the_index_once(monkeypatch):
+    store = _FakeStore({})
+    builds = []
+
+    def plan(vectorstore):
+        builds.append(1)
+        time.sleep(0.05)
+        vectorstore._collection._ids.append("a")
+        return {"version": 1}, BM25Index(), {}
+
+    monkeypatch.setattr(vectorstore, "initialize_vectorstore", lambda: store)
+    monkeypatch.setattr(vectorstore, "_plan_incremental_refresh", plan)
+    monkeypatch.setattr(vectorstore, "_publish_lexical_index", lambda index: None)
+    monkeypatch.setattr(vectorstore, "save_manifest", lambda manifest: None)
+
+    threads = [threading.Thread(target=vectorstore.ensure_vectorstore_indexed) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+
+
+class _FakeSystem:
+    def __init__(self, persist_directory: str) -> None:
+        self.settings = type("Settings", (), {"persist_directory": persist_directory})()
+        self.stopped = False
+
+    def stop(self) -> None:
+        self.stopped = True
+
+
+def test_detach_retires_only_this_stores_system(monkeypatch):
+    ours, other = _FakeSystem(str(vectorstore.VECTORSTORE_DIR)), _FakeSystem("/elsewhere")
+
+    class Client:
+        _refcount_lock = threading.Lock()
+        _identifier_to_system = {"ours": ours, "other": other}
+        _identifier_to_refcount = {"ours": 2, "other": 1}
+
+    monkeypatch.setattr(vectorstore, "_shared_system_client", lambda: Client)
+    monkeypatch.setattr(vectorstore, "VECTORSTORE_RETIRE_GRACE_SECONDS", 0.0)
+
+    vectorstore._detach_chroma_system()
+    time.sleep(0.1)
+
+    assert Client._identifier_to_system == {"other": other}
+    assert Client._identifier_to_refcount == {"other": 1}
+    assert ours.stopped and not other.stopped
+
+
+def test_detach_falls_back_to_clearing_the_cache_without_internals(monkeypatch):
+    cleared = []
+
+    class Client:
+        @staticmethod
+        def clear_system_cache() -> None:
+            cleared.append(True)
+
+    monkeypatch.setattr(vectorstore, "_shared_system_client", lambda: Client)
+
+    vectorstore._detach_chroma_system()
+
+    assert cleared == [True]
+
+
+def test_queries_keep_the_current_handle_while_a_refresh_runs(monkeypatch):
+    current = object()
+    monkeypatch.setattr(vectorstore, "_VECTORSTORE", current)
+    monkeypatch.setattr(vectorstore, "_LOADED_MANIFEST_MTIME", 1.0)
+    monkeypatch.setattr(vectorstore, "manifest_mtime", lambda: 2.0)
+    refreshing, done = threading.Event(), threading.Event()
+
+    def refresh() -> None:
+        with vectorstore._REFRESH_LOCK:
+            refreshing.set()
+            done.wait(5)
+
+    refresher = threading.Thread(target=refresh)
+    refresher.start()
+    refreshing.wait(5)
+    try:
+        started = time.monotonic()
+        assert vectorstore.get_vectorstore() is current
+        assert time.monotonic() - started < 0.5
+    finally:
+        done.set()
+        refresher.join()
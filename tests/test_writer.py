@@ -0,0 +1,41 @@
+"""Tests for the background chat log writer."""
+
+import threading
+import time
+
+from analytics.writer import ChatLogRow, ChatLogWriter
+
+
+def test_dropped_rows_are_counted_exactly_across_threads(tmp_path, monkeypatch):
+    writer = ChatLogWriter(tmp_path / "chat_logs.db", max_queue_size=1, enqueue_timeout=0)
+    # Without the writer thread nothing drains the queue, so all but one row is dropped.
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    row = ChatLogRow(query="q", answer="a", created_at="2026-10-17T10:00:00")
+
+    def submit_many() -> None:
+        for _ in range(500):
+            writer.submit(row)
+
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writer.dropped == 8 * 500 - 1
+
+
+def test_flush_and_close_give_up_when_the_queue_stays_full(tmp_path):
+    writer = ChatLogWriter(tmp_path / "chat_logs.db", max_queue_size=1, enqueue_timeout=0)
+    # A live thread that never drains the queue stands in for a stalled writer.
+    release = threading.Event()
+    writer._thread = threading.Thread(target=release.wait, daemon=True)
+    writer._thread.start()
+    writer._queue.put(ChatLogRow(query="q", answer="a", created_at="2026-10-17T10:00:00"))
+
+    started = time.monotonic()
+    assert writer.flush(timeout=0.1) is False
+    writer.close(timeout=0.1)
+    release.set()
+
+    assert time.monotonic() - started < 2